@@ -0,0 +1,44 @@
+# aggregate_cache.py
+"""Cache of computed data tables and statistics, stamped with the user's data generation.
+
+db.generation() counts each user's committed writes, so an entry is only reused while the
+generation it was built from is still current: no invalidation hooks, and a write racing with a
+build can't leave stale text behind. Entries also expire after a TTL and the least recently
+used go first beyond a fixed count. Used from the event loop only, so there is no locking.
+"""
+
+import time
+from collections import OrderedDict
+
+import metrics
+from config import AGGREGATE_CACHE_ENTRIES, AGGREGATE_CACHE_TTL
+
+
+class AggregateCache:
+    def __init__(self, max_entries=AGGREGATE_CACHE_ENTRIES, ttl=AGGREGATE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (tenant, key) -> (generation, expires, value), least recently used first
+
+    def get(self, tenant, key, generation):
+        """Returns the value stored for key under this generation, or None."""
+        entry = self._entries.get((tuple(tenant), key))
+        command = key[0]
+        if entry is None or entry[0] != generation or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[(tuple(tenant), key)]
+            metrics.inc('aggregate_cache_requests_total', command=command, result='miss')
+            return None
+        self._entries.move_to_end((tuple(tenant), key))
+        metrics.inc('aggregate_cache_requests_total', command=command, result='hit')
+        return entry[2]
+
+    def put(self, tenant, key, generation, value):
+        """Stores the value built from data at `generation`, replacing any older one for the key."""
+        self._entries[(tuple(tenant), key)] = (generation, time.monotonic() + self.ttl, value)
+        self._entries.move_to_end((tuple(tenant), key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+cache = AggregateCache()
@@ -0,0 +1,303 @@
+# alerts.py
+"""Blood pressure alerts evaluated as readings change, instead of in a daily scan of every user.
+
+Each user keeps only their alert window: the daily aggregates of their last ALERT_WINDOW_DAYS days
+with data. Writes through db.py report the days they touched; days older than a full window are
+ignored, the others are re-read (a few daily_stats rows) and patched into the window. Alerts then go
+through a queue that sends at most SEND_BURST messages per SEND_PERIOD seconds. An alert holds the
+user's own readings, so it is sent to them by direct message; the alert channel only selects the
+server whose users are monitored.
+"""
+
+import asyncio
+import io
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+
+import discord
+
+import db
+import metrics
+from async_db import run_read, list_tenants
+from charts import ChartSpec, render
+from config import (ALERT_HIGH_SYS, ALERT_HIGH_DIA, ALERT_LOW_SYS, ALERT_LOW_DIA, ALERT_WINDOW_DAYS, ALERT_MIN_DAYS,
+                    ALERT_REPEAT_HOURS)
+from utils import logger
+
+# Discord allows about 5 messages per 5 seconds per channel; staying under it avoids 429 retries
+SEND_BURST = 5
+SEND_PERIOD = 5.0
+SEND_ATTEMPTS = 3
+
+HYPERTENSION = 'HYPERTENSION'
+HYPOTENSION = 'HYPOTENSION'
+EMOJI = {HYPERTENSION: '⚠️', HYPOTENSION: '🩺'}
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    high_sys: float = ALERT_HIGH_SYS
+    high_dia: float = ALERT_HIGH_DIA
+    low_sys: float = ALERT_LOW_SYS
+    low_dia: float = ALERT_LOW_DIA
+
+    def classify(self, avg_sys, avg_dia):
+        """Returns HYPERTENSION (S or D above the high limits), HYPOTENSION (S and D below the low ones) or None."""
+        if avg_sys > self.high_sys or avg_dia > self.high_dia:
+            return HYPERTENSION
+        if avg_sys < self.low_sys and avg_dia < self.low_dia:
+            return HYPOTENSION
+        return None
+
+
+@dataclass
+class Alert:
+    tenant: tuple
+    kind: str
+    avg_sys: float
+    avg_dia: float
+    days: list  # ISO days of the window, oldest first, with their daily means below
+    systolic: list
+    diastolic: list
+
+
+@dataclass
+class _UserWindow:
+    """One user's alert window: {ISO day: (readings, sum_sys, sum_dia)} for at most window_days days."""
+    days: dict = field(default_factory=dict)
+    alerted: str = None  # Type of the last alert sent while the window stayed out of range
+    alerted_at: float = 0.0
+
+    def oldest(self):
+        return min(self.days)
+
+
+class AlertEngine:
+    def __init__(self, thresholds=None, window_days=ALERT_WINDOW_DAYS, min_days=ALERT_MIN_DAYS,
+                 repeat_hours=ALERT_REPEAT_HOURS):
+        self.thresholds = thresholds or Thresholds()
+        self.window_days = max(1, window_days)
+        self.min_days = max(1, min(min_days, self.window_days))
+        self.repeat_seconds = repeat_hours * 3600
+        self._windows = {}  # tenant -> _UserWindow
+        self._pending = {}  # tenant -> ISO days written since the evaluation loop last ran
+        self._lock = threading.Lock()
+        # The write loop and the daily check_all can evaluate one tenant on two reader threads at once
+        self._tenant_locks = {}  # tenant -> Lock held while its window is loaded, patched and classified
+        self._guild_id = None
+        self._loop = None
+        self._wake = None
+        self._tasks = []
+        self.queue = None
+
+    # --- WINDOW STATE (database reader threads) ---
+    def _affects(self, window, days):
+        """Whether a write to `days` can change the window (days older than a full window can't)."""
+        return window is None or len(window.days) < self.window_days or max(days) >= window.oldest()
+
+    def _load(self, tenant):
+        rows = db.recent_daily_sums(tenant, self.window_days)
+        if rows is None:
+            raise LookupError
+        return {day: (readings, sum_sys, sum_dia) for day, readings, sum_sys, sum_dia in rows}
+
+    def _patch(self, tenant, window, days):
+        """Re-reads the touched days and merges them into the window, reloading it if a day drops out."""
+        rows = db.daily_slot_sums(tenant, days)
+        if rows is None:
+            raise LookupError
+        totals = {}
+        for day, _, readings, sum_sys, sum_dia in rows:
+            count, s, d = totals.get(day, (0, 0, 0))
+            totals[day] = (count + readings, s + sum_sys, d + sum_dia)
+
+        merged = dict(window.days)
+        full = len(merged) >= self.window_days
+        oldest = window.oldest() if merged else None
+        for day in days:
+            if day in totals and (not full or day >= oldest):
+                merged[day] = totals[day]
+            elif day not in totals and merged.pop(day, None) is not None and full:
+                # An emptied day leaves room for an older day the window doesn't hold
+                return self._load(tenant)
+        return dict(sorted(merged.items())[-self.window_days:])
+
+    def evaluate(self, tenant, days=None, now=None):
+        """Brings the tenant's window up to date after a write to `days` and returns an Alert to send, or None.
+
+        days=None (re)loads the window from scratch. Runs on a database reader thread; returns None
+        if the database could not be read. Evaluations of one tenant run one at a time, so a reload can't
+        overwrite a newer patch and a repeated alert is only sent once.
+        """
+        tenant = tuple(tenant)
+        with self._lock:
+            tenant_lock = self._tenant_locks.setdefault(tenant, threading.Lock())
+        with tenant_lock:
+            return self._evaluate(tenant, days, now)
+
+    def _evaluate(self, tenant, days, now):
+        window = self._windows.get(tenant)
+        if days is not None and not self._affects(window, days):
+            metrics.inc('alert_evaluations_total', result='skipped')
+            return None
+        metrics.inc('alert_evaluations_total', result='evaluated')
+
+        try:
+            state = self._load(tenant) if window is None or days is None else self._patch(tenant, window, days)
+        except LookupError:
+            return None
+        if window is None:
+            window = self._windows.setdefault(tenant, _UserWindow())
+        window.days = state
+
+        ordered = sorted(state.items())
+        if len(ordered) < self.min_days:
+            window.alerted = None
+            return None
+        means = [(sum_sys / readings, sum_dia / readings) for _, (readings, sum_sys, sum_dia) in ordered]
+        avg_sys = sum(s for s, _ in means) / len(means)
+        avg_dia = sum(d for _, d in means) / len(means)
+
+        kind = self.thresholds.classify(avg_sys, avg_dia)
+        now = time.monotonic() if now is None else now
+        if kind is None:
+            window.alerted = None
+            logger.info(f"✅ Average {avg_sys:.1f}/{avg_dia:.1f} of user {tenant[1]} is within target.")
+            return None
+        if kind == window.alerted and now - window.alerted_at < self.repeat_seconds:
+            return None
+        window.alerted, window.alerted_at = kind, now
+        return Alert(tenant, kind, avg_sys, avg_dia, [day for day, _ in ordered],
+                     [s for s, _ in means], [d for _, d in means])
+
+    # --- EVENT LOOP SIDE ---
+    def on_write(self, tenant, days):
+        """Write listener (database writer thread): queues the touched days for the evaluation loop."""
+        tenant = tuple(tenant)
+        if self._loop is None or tenant[0] != self._guild_id:
+            return
+        with self._lock:
+            self._pending.setdefault(tenant, set()).update(days)
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _evaluate_loop(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for tenant, days in pending.items():
+                try:
+                    alert = await run_read(self.evaluate, tenant, days)
+                    if alert is not None:
+                        self.queue.put(alert)
+                except Exception as e:
+                    logger.error(f"❌ Error evaluating alert for user {tenant[1]}: {e}")
+
+    async def check_all(self):
+        """Re-reads every window of the alert channel's server and queues the alerts due (daily re-check)."""
+        if self.queue is None:
+            return
+        for tenant in await list_tenants(self._guild_id):
+            alert = await run_read(self.evaluate, tenant)
+            if alert is not None:
+                self.queue.put(alert)
+
+    def start(self, channel):
+        """Starts evaluating writes of the channel's server and sending its members their alerts (once)."""
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._guild_id = channel.guild.id
+        self.queue = AlertQueue(channel.guild)
+        self._tasks = [asyncio.create_task(self._evaluate_loop()), asyncio.create_task(self.queue.run())]
+        logger.info(f"🔔 Alert engine started for channel {channel.id}")
+
+
+class AlertQueue:
+    """Sends alerts to the guild's members by direct message in order, within Discord's rate limit.
+
+    A user has at most one alert waiting: a newer one replaces it, so a burst of edits yields one message.
+    """
+
+    def __init__(self, guild, burst=SEND_BURST, period=SEND_PERIOD):
+        self.guild = guild
+        self.burst = burst
+        self.period = period
+        self._alerts = OrderedDict()  # tenant -> Alert
+        self._ready = asyncio.Event()
+        self._sent_at = []  # Send times within the last period
+
+    def put(self, alert):
+        self._alerts[alert.tenant] = alert
+        self._ready.set()
+
+    async def _wait_for_slot(self):
+        while True:
+            now = time.monotonic()
+            self._sent_at = [t for t in self._sent_at if now - t < self.period]
+            if len(self._sent_at) < self.burst:
+                self._sent_at.append(now)
+                return
+            await asyncio.sleep(self.period - (now - self._sent_at[0]))
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._alerts:
+                _, alert = self._alerts.popitem(last=False)
+                await self._deliver(alert)
+
+    async def _deliver(self, alert):
+        for attempt in range(1, SEND_ATTEMPTS + 1):
+            await self._wait_for_slot()
+            try:
+                member = self.guild.get_member(alert.tenant[1]) or await self.guild.fetch_member(alert.tenant[1])
+                await send_alert(member, alert)
+                metrics.inc('alerts_total', kind=alert.kind, status='sent')
+                return
+            except discord.HTTPException as e:
+                if e.status != 429 or attempt == SEND_ATTEMPTS:
+                    # 403: the user doesn't accept direct messages from server members; 404: they left the server
+                    logger.warning(f"⚠️ Could not send alert to user {alert.tenant[1]}: {e}")
+                    break
+                retry_after = getattr(e, 'retry_after', None) or self.period
+                logger.warning(f"⚠️ Alert rate limited, retrying in {retry_after:.1f}s")
+                await asyncio.sleep(retry_after)
+            except Exception as e:
+                logger.error(f"❌ Error sending alert for user {alert.tenant[1]}: {e}")
+                break
+        metrics.inc('alerts_total', kind=alert.kind, status='failed')
+
+
+async def send_alert(recipient, alert):
+    """Sends an alert with its window's chart to `recipient`, the user it is about (or any messageable)."""
+    png = await render(ChartSpec(
+        title=f'{len(alert.days)}-Day Blood Pressure Trend - {alert.kind} ALERT',
+        days=[date.fromisoformat(day) for day in alert.days],
+        systolic=alert.systolic,
+        diastolic=alert.diastolic,
+        interval=2,
+        figsize=(10, 6),
+        reference_lines=(),
+        tight_bbox=True,
+    ))
+
+    emoji = EMOJI[alert.kind]
+    metrics.inc('upload_bytes_total', len(png), kind='alert')
+    await recipient.send(
+        f"{emoji} **BLOOD PRESSURE ALERT - {alert.kind}** {emoji}\n\n"
+        f"Your average over the last {len(alert.days)} days is: "
+        f"**{alert.avg_sys:.1f}/{alert.avg_dia:.1f}** mmHg\n\n",
+        file=discord.File(io.BytesIO(png), filename="bp_alert.png")
+    )
+    logger.info(f"✅ {alert.kind} alert sent")
+
+
+engine = AlertEngine()
+db.add_write_listener(engine.on_write)
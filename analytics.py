@@ -0,0 +1,217 @@
+# analytics.py
+"""Rolling blood pressure analytics over per-user NumPy arrays of daily aggregates.
+
+Each user's history is held as per-day, per-slot reading counts and pressure sums, loaded once from
+daily_stats. Writes through db.py only mark the touched days; the next request re-reads just those
+days and patches the arrays in place. Window statistics then slice at most 90 days of the arrays,
+so their cost doesn't depend on how long the history is.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+import db
+
+WINDOWS = (7, 30, 90)
+SLOTS = {'morning': 0, 'afternoon': 1, 'night': 2}
+MORNING, NIGHT = SLOTS['morning'], SLOTS['night']
+MAX_USERS = 256  # Users whose arrays are kept in memory, least recently used evicted first
+FULL_RELOAD_DAYS = 500  # More touched days than this (e.g. after an import) reload the user whole
+
+
+def epoch_days(iso_days):
+    """Converts ISO 'YYYY-MM-DD' strings (or dates) into integer days since 1970-01-01."""
+    return np.array(iso_days, dtype='datetime64[D]').astype(np.int64)
+
+
+@dataclass
+class WindowStats:
+    """Statistics of the daily means in one window; pressure values are (systolic, diastolic) arrays."""
+    days: int  # Days with at least one reading
+    readings: int
+    mean: np.ndarray
+    sd: np.ndarray  # Standard deviation of the daily means (NaN with fewer than 2 days)
+    arv: np.ndarray  # Average real variability: mean absolute change between consecutive days with data
+    morning_night: np.ndarray  # Mean morning minus night difference on days with both (NaN if none)
+
+
+class UserSeries:
+    """Per-day, per-slot counts and (systolic, diastolic) sums for one user, indexed from `origin`."""
+
+    def __init__(self, rows):
+        days = epoch_days([row[0] for row in rows]) if rows else np.zeros(0, dtype=np.int64)
+        self.origin = int(days[0]) if len(days) else 0
+        self.length = 0
+        self.counts = np.zeros((0, 3))
+        self.sums = np.zeros((0, 3, 2))
+        self._assign(days, rows)
+
+    def _grow(self, length):
+        if length > len(self.counts):
+            capacity = max(length, 2 * len(self.counts), 64)
+            self.counts = np.concatenate([self.counts, np.zeros((capacity - len(self.counts), 3))])
+            self.sums = np.concatenate([self.sums, np.zeros((capacity - len(self.sums), 3, 2))])
+        self.length = max(self.length, length)
+
+    def _assign(self, days, rows):
+        if not rows:
+            return
+        index = days - self.origin
+        self._grow(int(index.max()) + 1)
+        slots = np.array([SLOTS.get(row[1], 1) for row in rows])
+        values = np.array([row[2:] for row in rows], dtype=float)
+        self.counts[index, slots] = values[:, 0]
+        self.sums[index, slots] = values[:, 1:]
+
+    def covers(self, days):
+        """Whether every epoch day in `days` can be patched in place (none precedes the origin)."""
+        return not self.length or int(np.min(days)) >= self.origin
+
+    def patch(self, days, rows):
+        """Replaces the aggregates of epoch `days` with `rows` (which hold only those days)."""
+        if not self.length:
+            self.origin = int(np.min(days))
+        index = days - self.origin
+        index = index[index < self.length]
+        self.counts[index] = 0
+        self.sums[index] = 0
+        self._assign(epoch_days([row[0] for row in rows]) if rows else days[:0], rows)
+
+    def windows(self, spans):
+        """Returns a WindowStats (or None without data) for each (end_day, days) span, in order.
+
+        Every span is answered from prefix sums over one slice covering all of them, so asking for
+        several windows costs about the same as asking for one.
+        """
+        ends = np.array([end for end, _ in spans]) - self.origin + 1
+        starts = ends - np.array([days for _, days in spans])
+        lo, hi = max(int(starts.min()), 0), min(int(ends.max()), self.length)
+        if hi <= lo:
+            return [None] * len(spans)
+        a, b = np.clip(starts, lo, hi) - lo, np.clip(ends, lo, hi) - lo
+        counts, sums = self.counts[lo:hi], self.sums[lo:hi]
+
+        # Per day: readings, daily mean and morning-minus-night difference (zero where undefined)
+        day_counts = counts.sum(axis=1)
+        valid = day_counts > 0
+        daily = sums.sum(axis=1) / np.maximum(day_counts, 1)[:, None]
+        both = (counts[:, MORNING] > 0) & (counts[:, NIGHT] > 0)
+        gap = (sums[:, MORNING] / np.maximum(counts[:, MORNING], 1)[:, None] -
+               sums[:, NIGHT] / np.maximum(counts[:, NIGHT], 1)[:, None]) * both[:, None]
+
+        def prefix(values):
+            return np.concatenate([np.zeros((1, *values.shape[1:])), np.cumsum(values, axis=0)])
+
+        c_days, c_readings, c_both = prefix(valid), prefix(day_counts), prefix(both)
+        c_sum, c_sq, c_gap = prefix(daily * valid[:, None]), prefix(daily ** 2 * valid[:, None]), prefix(gap)
+        # Consecutive days with data: compact the valid days, then prefix-sum their absolute changes
+        c_change = prefix(np.abs(np.diff(daily[valid], axis=0)))
+
+        n = (c_days[b] - c_days[a]).astype(int)
+        both_days = c_both[b] - c_both[a]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (c_sum[b] - c_sum[a]) / n[:, None]
+            var = (c_sq[b] - c_sq[a] - n[:, None] * mean ** 2) / (n[:, None] - 1)
+            first, last = c_days[a].astype(int), np.maximum(c_days[b].astype(int) - 1, c_days[a].astype(int))
+            arv = (c_change[last] - c_change[first]) / (n[:, None] - 1)
+            morning_night = (c_gap[b] - c_gap[a]) / both_days[:, None]
+
+        readings = c_readings[b] - c_readings[a]
+        return [WindowStats(days=int(n[i]), readings=int(readings[i]), mean=mean[i],
+                            sd=np.sqrt(np.maximum(var[i], 0)) if n[i] > 1 else np.full(2, np.nan),
+                            arv=arv[i] if n[i] > 1 else np.full(2, np.nan), morning_night=morning_night[i])
+                if n[i] else None for i in range(len(spans))]
+
+
+class AnalyticsEngine:
+    def __init__(self, max_users=MAX_USERS):
+        self.max_users = max_users
+        self._series = OrderedDict()  # tenant -> UserSeries, least recently used first
+        self._dirty = {}  # tenant -> ISO days written since its series was last refreshed
+        self._loading = {}  # tenant -> Event set once its in-flight load or patch is stored
+        # Invalidation arrives on the database writer thread, requests on the reader threads
+        self._lock = threading.Lock()
+
+    def invalidate_days(self, tenant, days):
+        """Write listener: marks days of a cached (or loading) tenant for refresh."""
+        tenant = tuple(tenant)
+        with self._lock:
+            if tenant in self._series or tenant in self._loading:
+                self._dirty.setdefault(tenant, set()).update(days)
+
+    def _refresh(self, tenant):
+        """Returns the tenant's up-to-date series, loading or patching it; None if the database failed.
+
+        As in series_store, other requests for a tenant wait for its in-flight refresh rather than reading
+        the series before the patch lands.
+        """
+        while True:
+            with self._lock:
+                loading = self._loading.get(tenant)
+                if loading is None:
+                    series = self._series.get(tenant)
+                    dirty = self._dirty.pop(tenant, None)
+                    if series is not None and not dirty:
+                        self._series.move_to_end(tenant)
+                        return series
+                    loading = self._loading[tenant] = threading.Event()
+                    break
+            loading.wait()
+
+        try:
+            return self._fetch(tenant, series, dirty)
+        finally:
+            with self._lock:
+                del self._loading[tenant]
+            loading.set()
+
+    def _fetch(self, tenant, series, dirty):
+        """Patches the dirty days into the tenant's cached series, or loads them whole, and stores the result."""
+        try:
+            if series is not None and len(dirty) <= FULL_RELOAD_DAYS and series.covers(epoch_days(sorted(dirty))):
+                rows = db.daily_slot_sums(tenant, dirty)
+                if rows is None:
+                    raise LookupError
+                with self._lock:
+                    series.patch(epoch_days(sorted(dirty)), rows)
+            else:
+                rows = db.daily_slot_sums(tenant)
+                if rows is None:
+                    raise LookupError
+                series = UserSeries(rows)
+        except LookupError:
+            with self._lock:
+                if dirty:
+                    self._dirty.setdefault(tenant, set()).update(dirty)
+            return None
+
+        with self._lock:
+            self._series[tenant] = series
+            self._series.move_to_end(tenant)
+            while len(self._series) > self.max_users:
+                evicted, _ = self._series.popitem(last=False)
+                self._dirty.pop(evicted, None)
+        return series
+
+    def report(self, tenant, end_day, windows=WINDOWS):
+        """Returns {window: (current, previous)} WindowStats (or None) for windows ending at `end_day`.
+
+        `previous` is the window of the same length just before the current one. Returns None if the
+        database could not be read. Runs on a database reader thread.
+        """
+        series = self._refresh(tuple(tenant))
+        if series is None:
+            return None
+
+        end = int(epoch_days([end_day])[0])
+        spans = [(end, days) for days in windows] + [(end - days, days) for days in windows]
+        with self._lock:
+            stats = series.windows(spans)
+        return {days: (stats[i], stats[i + len(windows)]) for i, days in enumerate(windows)}
+
+
+engine = AnalyticsEngine()
+db.add_write_listener(engine.invalidate_days)
@@ -0,0 +1,118 @@
+# async_db.py
+"""Awaitable versions of the db.py functions for use inside command handlers.
+
+Every call is handed to a database worker thread, so a slow query or a disk fsync never
+stalls the discord.py event loop. Writes go through a single worker, which keeps them
+serialized; reads run on one worker per pooled read connection (WAL lets them overlap writes).
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import backup
+import db
+from config import DB_READ_POOL_SIZE
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+_read_executor = ThreadPoolExecutor(max_workers=max(1, DB_READ_POOL_SIZE), thread_name_prefix='db-reader')
+
+
+async def run(func, *args, **kwargs):
+    """Runs a blocking database function on the writer thread and awaits its result."""
+    loop = asyncio.get_running_loop()
+    # The caller's context travels along, so log lines keep the command's correlation ID
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def run_read(func, *args, **kwargs):
+    """Runs a read-only database function on a reader thread and awaits its result."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_read_executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def setup_db():
+    return await run(db.setup_db)
+
+
+async def query_records(tenant, *args, **kwargs):
+    return await run_read(db.query_records, tenant, *args, **kwargs)
+
+
+async def history_page(tenant, limit, before=None, after=None):
+    return await run_read(db.history_page, tenant, limit, before, after)
+
+
+async def monthly_slot_sums(tenant, start=None, end=None):
+    return await run_read(db.monthly_slot_sums, tenant, start, end)
+
+
+async def pressure_histogram(tenant, start=None, end=None):
+    return await run_read(db.pressure_histogram, tenant, start, end)
+
+
+async def list_tenants(guild_id=None):
+    return await run_read(db.list_tenants, guild_id)
+
+
+async def save_data(tenant, day, slot, sys, dia):
+    return await run(db.save_data, tenant, day, slot, sys, dia)
+
+
+async def insert_records(tenant, rows):
+    return await run(db.insert_records, tenant, rows)
+
+
+async def update_data(tenant, day, slot, sys, dia):
+    return await run(db.update_data, tenant, day, slot, sys, dia)
+
+
+async def get_record(tenant, day, slot):
+    return await run_read(db.get_record, tenant, day, slot)
+
+
+async def delete_record(tenant, record_id):
+    return await run(db.delete_record, tenant, record_id)
+
+
+async def undo_last(tenant):
+    return await run(db.undo_last, tenant)
+
+
+async def rebuild_daily_stats():
+    return await run(db.rebuild_daily_stats)
+
+
+async def load_jobs():
+    return await run_read(db.load_jobs)
+
+
+async def save_job(kind, tenant, key, channel_id, timezone, at_time, weekday, next_run):
+    return await run(db.save_job, kind, tenant, key, channel_id, timezone, at_time, weekday, next_run)
+
+
+async def delete_jobs(kind, tenant, key=None):
+    return await run(db.delete_jobs, kind, tenant, key)
+
+
+async def set_job_runs(runs):
+    return await run(db.set_job_runs, runs)
+
+
+async def backup_database():
+    # Not on the writer: the copy reads its own snapshot and must not hold up saves
+    return await asyncio.to_thread(backup.create_backup)
+
+
+async def verify_backup(path):
+    return await asyncio.to_thread(backup.verify_backup, path)
+
+
+def shutdown():
+    """Waits for queued database work to finish, stops the workers and closes the connections."""
+    _read_executor.shutdown(wait=True)
+    _executor.shutdown(wait=True)
+    db.close_connections()
@@ -0,0 +1,243 @@
+# backup.py
+"""Online database backups with the SQLite backup API, gzip compression, checksums and tiered retention.
+
+The copy is taken from a dedicated connection holding one read transaction, so it is a consistent
+snapshot while WAL keeps the bot's writer running. Pages are copied in steps with a short pause in
+between to leave disk bandwidth for the bot.
+
+Usage: python backup.py verify [backup_file]
+       python backup.py restore <backup_file> <target.db>
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import db
+from config import BACKUP_DIR, BACKUP_KEEP_DAILY, BACKUP_KEEP_WEEKLY, BACKUP_KEEP_MONTHLY
+from utils import logger
+
+PAGES_PER_STEP = 1024
+STEP_PAUSE = 0.005  # Seconds between steps
+COMPRESS_LEVEL = 1  # Level 6 is ~3x slower for ~15% smaller files
+COPY_CHUNK = 1024 * 1024
+
+# backup_YYYYmmdd_HHMMSS.db.gz, plus plain .db copies made by older versions
+BACKUP_NAME = re.compile(r'^backup_(\d{8}_\d{6})\.db(\.gz)?$')
+
+
+class _HashingWriter:
+    """File wrapper computing the SHA-256 of everything written through it."""
+
+    def __init__(self, file):
+        self.file = file
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+
+def _checksum_path(path):
+    return f"{path}.sha256"
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(COPY_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _snapshot(target_path):
+    """Copies the live database into target_path page by page, from a single read snapshot."""
+    source = sqlite3.connect(db.DB_NAME, isolation_level=None)
+    target = sqlite3.connect(target_path)
+    try:
+        # Holding a read transaction pins the snapshot: writes made meanwhile by the bot neither
+        # block on the copy nor force it to start over
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=PAGES_PER_STEP, progress=lambda status, remaining, total: time.sleep(STEP_PAUSE))
+        source.execute("COMMIT")
+    finally:
+        target.close()
+        source.close()
+
+
+def create_backup(directory=BACKUP_DIR):
+    """Writes a compressed, checksummed backup and applies retention. Returns its path or None."""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db.gz"
+        path = os.path.join(directory, name)
+
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            snapshot_path = os.path.join(tmp, 'snapshot.db')
+            _snapshot(snapshot_path)
+
+            partial_path = os.path.join(tmp, name)
+            with open(partial_path, 'wb') as raw:
+                hashing = _HashingWriter(raw)
+                with gzip.GzipFile(filename='snapshot.db', mode='wb', fileobj=hashing,
+                                   compresslevel=COMPRESS_LEVEL) as compressed, open(snapshot_path, 'rb') as f:
+                    shutil.copyfileobj(f, compressed, COPY_CHUNK)
+                raw.flush()
+                os.fsync(raw.fileno())
+
+            # The checksum is written first: a backup file never exists without one
+            with open(_checksum_path(path), 'w') as f:
+                f.write(f"{hashing.digest.hexdigest()}  {name}\n")
+            os.replace(partial_path, path)
+
+        logger.info(f"💾 Backup created: {path}")
+        apply_retention(directory)
+        return path
+
+    except Exception as e:
+        logger.error(f"❌ Error creating backup: {e}")
+        return None
+
+
+def expired_backups(names, keep_daily=BACKUP_KEEP_DAILY, keep_weekly=BACKUP_KEEP_WEEKLY,
+                    keep_monthly=BACKUP_KEEP_MONTHLY):
+    """Returns the backup file names that fall outside every retention tier.
+
+    The newest backup of each of the last keep_daily days, keep_weekly ISO weeks and keep_monthly
+    months is kept. Timestamps come from the file names, so no file is stat'ed.
+    """
+    stamped = []
+    for name in names:
+        match = BACKUP_NAME.match(name)
+        if match:
+            stamped.append((datetime.strptime(match.group(1), '%Y%m%d_%H%M%S'), name))
+    stamped.sort(reverse=True)
+
+    keep = set()
+    tiers = ((keep_daily, lambda t: t.date()),
+             (keep_weekly, lambda t: t.isocalendar()[:2]),
+             (keep_monthly, lambda t: (t.year, t.month)))
+    for limit, period_of in tiers:
+        seen = set()
+        for stamp, name in stamped:
+            period = period_of(stamp)
+            if period not in seen and len(seen) < limit:
+                seen.add(period)
+                keep.add(name)
+
+    return [name for _, name in stamped if name not in keep]
+
+
+def apply_retention(directory=BACKUP_DIR):
+    """Deletes backups (and their checksum files) that no retention tier keeps."""
+    try:
+        for name in expired_backups(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            os.remove(path)
+            if os.path.exists(_checksum_path(path)):
+                os.remove(_checksum_path(path))
+            logger.info(f"🧹 Old backup deleted: {name}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not clean old backups: {e}")
+
+
+def latest_backup(directory=BACKUP_DIR):
+    """Returns the path of the newest backup, or None if there is none."""
+    try:
+        names = sorted((name for name in os.listdir(directory) if BACKUP_NAME.match(name)),
+                       key=lambda name: BACKUP_NAME.match(name).group(1))
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, names[-1]) if names else None
+
+
+def _unpack(path, target_path):
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as src, open(target_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+    else:
+        shutil.copyfile(path, target_path)
+
+
+def _check_database(path):
+    """Returns (ok, detail) after an integrity check of an unpacked backup."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if result != 'ok':
+            return False, f"integrity check failed: {result}"
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        rows = conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        return True, f"schema v{version}, {rows} records"
+    finally:
+        conn.close()
+
+
+def verify_backup(path):
+    """Checks a backup's checksum, unpacks it to a temp file and runs an integrity check.
+
+    Returns (ok, detail).
+    """
+    try:
+        checksum_file = _checksum_path(path)
+        if os.path.exists(checksum_file):
+            with open(checksum_file) as f:
+                expected = f.read().split()[0]
+            if _file_sha256(path) != expected:
+                return False, "checksum mismatch"
+        elif path.endswith('.gz'):
+            return False, "checksum file missing"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            restored = os.path.join(tmp, 'restored.db')
+            _unpack(path, restored)
+            return _check_database(restored)
+
+    except Exception as e:
+        logger.error(f"❌ Error verifying backup {path}: {e}")
+        return False, str(e)
+
+
+def restore_backup(path, target_path):
+    """Verifies a backup and unpacks it to target_path, which must not exist yet. Returns (ok, detail)."""
+    if os.path.exists(target_path):
+        return False, f"{target_path} already exists"
+
+    ok, detail = verify_backup(path)
+    if not ok:
+        return False, detail
+
+    partial_path = f"{target_path}.partial"
+    _unpack(path, partial_path)
+    os.replace(partial_path, target_path)
+    logger.info(f"♻️ Backup restored: {path} -> {target_path}")
+    return True, detail
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 2 and sys.argv[1] == 'verify':
+        backup_path = sys.argv[2] if len(sys.argv) > 2 else latest_backup()
+        if backup_path is None:
+            print("❌ No backups found.")
+            sys.exit(1)
+        ok, detail = verify_backup(backup_path)
+    elif len(sys.argv) == 4 and sys.argv[1] == 'restore':
+        backup_path = sys.argv[2]
+        ok, detail = restore_backup(backup_path, sys.argv[3])
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+    print(f"{'✅' if ok else '❌'} {backup_path}: {detail}")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,48 @@
+# benchmarks/bench_analytics.py
+"""Per-user cost of the !trend/!variability report: first load, warm calls and refresh after a write.
+
+Usage: python -m benchmarks.bench_analytics [years ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+import analytics
+import db
+from benchmarks.suite import synthetic
+
+READINGS_PER_YEAR = 900
+
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    years = [int(arg) for arg in sys.argv[1:]] or [1, 5, 20]
+    today = date.today()
+    print(f"{'years':>6} {'readings':>9} {'first load us':>14} {'warm us':>9} {'after write us':>15}")
+    for count in years:
+        readings = count * READINGS_PER_YEAR
+        synthetic.READINGS_PER_USER = readings  # One user holding the whole history
+        with tempfile.TemporaryDirectory() as tmp:
+            synthetic.populate(os.path.join(tmp, 'bench.db'), readings)
+            engine = analytics.AnalyticsEngine()
+            db.add_write_listener(engine.invalidate_days)
+
+            first = timed(lambda: engine.report(synthetic.SUBJECT, today))
+            warm = timed(lambda: engine.report(synthetic.SUBJECT, today), repeat=1000)
+            db.save_data(synthetic.SUBJECT, today, 'morning', 130, 85)
+            after_write = timed(lambda: engine.report(synthetic.SUBJECT, today))
+            db.close_connections()
+        print(f"{count:>6} {readings:>9} {first:>14.0f} {warm:>9.0f} {after_write:>15.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_async_db.py
+"""Measures command latency and event-loop lag under concurrent load, sync db vs async_db.
+
+Usage: python -m benchmarks.bench_async_db [rows] [concurrent_commands]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+import async_db
+import db
+from benchmarks.bench_query import TENANT, populate
+from utils import days_window
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000
+
+
+async def heartbeat(lags, stop, interval=0.01):
+    """Stands in for the gateway heartbeat: records how late each tick fires."""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def command(use_async, latencies, start):
+    """One !register-like command; latency counts from when all commands arrived together."""
+    if use_async:
+        await async_db.query_records(TENANT, start=days_window(30), aggregation='daily')
+        await async_db.save_data(TENANT, date.today(), 'morning', 120, 80)
+    else:
+        db.query_records(TENANT, start=days_window(30), aggregation='daily')
+        db.save_data(TENANT, date.today(), 'morning', 120, 80)
+    latencies.append(time.perf_counter() - start)
+
+
+async def run(use_async, concurrency):
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(command(use_async, latencies, start) for _ in range(concurrency)))
+    stop.set()
+    await ticker
+    return latencies, lags or [0.0]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        populate(os.path.join(tmp, 'bench.db'), rows)
+        print(f"{rows} rows, {concurrency} concurrent commands")
+        print(f"{'mode':<8} {'cmd p50':>9} {'cmd p99':>9} {'lag p50':>9} {'lag p99':>9} {'lag max':>9}  (ms)")
+        for mode, use_async in (('sync', False), ('async', True)):
+            latencies, lags = asyncio.run(run(use_async, concurrency))
+            print(f"{mode:<8} {percentile(latencies, 50):>9.2f} {percentile(latencies, 99):>9.2f} "
+                  f"{statistics.median(lags) * 1000:>9.2f} {percentile(lags, 99):>9.2f} {max(lags) * 1000:>9.2f}")
+    async_db.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/bench_charts.py
+"""Per-chart render time: a new figure per chart (render_chart) versus a reused template (render_template).
+
+Both run in this process, as a render worker would; the template is built before timing starts, so
+its timings are charts whose texts fit the current margins (a re-fit costs about one new figure).
+Usage: python -m benchmarks.bench_charts [repeat]
+"""
+
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import charts
+from charts import ChartSpec
+
+
+def specs():
+    rng = np.random.default_rng(0)
+
+    def series(days, title, **layout):
+        start = date.today() - timedelta(days=days - 1)
+        return ChartSpec(title=title, days=[start + timedelta(days=i) for i in range(days)],
+                         systolic=np.round(rng.normal(128, 10, days), 1).tolist(),
+                         diastolic=np.round(rng.normal(82, 7, days), 1).tolist(), **layout)
+
+    return {
+        'graph_30': series(30, 'Blood Pressure Trend - Last 30 Days (Daily Averages)', interval=3, alpha=0.8,
+                           tight_bbox=True),
+        'graph_month': series(31, 'Blood Pressure Trend (10/25)', interval=2),
+        'graph_year': series(365, 'Blood Pressure Trend (25)', date_format='%b', locator='month'),
+        'alert': series(10, '10-Day Blood Pressure Trend - HYPERTENSION ALERT', interval=2, figsize=(10, 6),
+                        reference_lines=(), tight_bbox=True),
+    }
+
+
+def timed(func, spec, repeat):
+    """Best of `repeat` runs in ms, so other load on the machine doesn't skew the comparison."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(spec)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"{'chart':<12} {'new figure ms':>14} {'template ms':>12} {'speedup':>8} {'new figure KB':>14} "
+          f"{'template KB':>12}")
+    for name, spec in specs().items():
+        charts.render_chart(spec)  # Imports and font caches warm for both paths
+        charts.render_template(spec)
+        old = timed(charts.render_chart, spec, repeat)
+        new = timed(charts.render_template, spec, repeat)
+        print(f"{name:<12} {old:>14.1f} {new:>12.1f} {old / new:>7.1f}x "
+              f"{len(charts.render_chart(spec)) / 1024:>14.0f} {len(charts.render_template(spec)) / 1024:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
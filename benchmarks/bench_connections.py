@@ -0,0 +1,77 @@
+# benchmarks/bench_connections.py
+"""Inserts and point reads per second: connect-per-call (rollback journal) vs pooled WAL connections.
+
+Usage: python -m benchmarks.bench_connections [operations]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import db
+
+SLOTS = ('morning', 'afternoon', 'night')
+TENANT = (1, 1)
+
+
+def legacy_save(path, day, slot, sys_, dia):
+    """The pre-pool save_data: fresh connection, default journal, commit, close."""
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO records (day, time_slot, systolic, diastolic) VALUES (?, ?, ?, ?)",
+                 (db.day_key(day), slot, sys_, dia))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get(path, day, slot):
+    conn = sqlite3.connect(path)
+    record = conn.execute("SELECT systolic, diastolic FROM records WHERE day = ? AND time_slot = ?",
+                          (db.day_key(day), slot)).fetchone()
+    conn.close()
+    return record
+
+
+def rate(func, operations):
+    start = time.perf_counter()
+    for i in range(operations):
+        func(i)
+    return operations / (time.perf_counter() - start)
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    first_day = date(2020, 1, 1)
+
+    def day(i):
+        return first_day + timedelta(days=i // 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("CREATE TABLE records (id INTEGER PRIMARY KEY AUTOINCREMENT, day TEXT, time_slot TEXT, "
+                     "systolic INTEGER, diastolic INTEGER, record_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("CREATE INDEX idx_records_day_slot ON records (day, time_slot, systolic, diastolic)")
+        conn.close()
+
+        db.DB_NAME = os.path.join(tmp, 'pooled.db')
+        db.setup_db()
+
+        results = {
+            'legacy': (rate(lambda i: legacy_save(legacy_path, day(i), SLOTS[i % 3], 120, 80), operations),
+                       rate(lambda i: legacy_get(legacy_path, day(i), SLOTS[i % 3]), operations)),
+            'pooled': (rate(lambda i: db.save_data(TENANT, day(i), SLOTS[i % 3], 120, 80), operations),
+                       rate(lambda i: db.get_record(TENANT, day(i), SLOTS[i % 3]), operations)),
+        }
+        db.close_connections()
+
+    print(f"{operations} operations each")
+    print(f"{'mode':<8} {'inserts/s':>12} {'reads/s':>12}")
+    for mode, (inserts, reads) in results.items():
+        print(f"{mode:<8} {inserts:>12.0f} {reads:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
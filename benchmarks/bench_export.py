@@ -0,0 +1,77 @@
+# benchmarks/bench_export.py
+"""Peak Python memory and time of the old DataFrame export vs the streaming exporter.
+
+Usage: python -m benchmarks.bench_export [rows ...]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import db
+from exporter import export_records, parquet_available
+from importer import CsvImport
+from benchmarks.bench_import import make_csv
+
+TENANT = (1, 1)
+
+
+def legacy_export():
+    """The pre-streaming !export: full DataFrame, a copy, a StringIO and an encoded BytesIO."""
+    df = db.query_records(TENANT)
+    export_df = df.copy()
+    export_df['Date'] = export_df['day'].dt.strftime('%d-%m-%y')
+    export_df['Time_of_Record'] = pd.to_datetime(export_df['record_date']).dt.strftime('%H:%M:%S')
+    export_df['Time_Slot'] = export_df['time_slot'].map({'morning': 'm', 'afternoon': 'a', 'night': 'n'})
+    export_df = export_df[['Date', 'Time_Slot', 'systolic', 'diastolic', 'Time_of_Record']]
+    buffer = io.StringIO()
+    export_df.to_csv(buffer, index=False)
+    return len(io.BytesIO(buffer.getvalue().encode('utf-8')).getvalue())
+
+
+def streaming_export(fmt, compress):
+    export = export_records(TENANT, 'bench', fmt, compress)
+    size = sum(file.seek(0, os.SEEK_END) for _, file in export.parts)
+    export.close()
+    return size
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000]
+    modes = [('legacy csv', legacy_export), ('stream csv', streaming_export, 'csv', False),
+             ('stream csv.gz', streaming_export, 'csv', True)]
+    if parquet_available():
+        modes.append(('stream parquet', streaming_export, 'parquet', True))
+
+    print(f"{'rows':>8} {'mode':<15} {'file MB':>8} {'time s':>8} {'peak MB':>8}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_NAME = os.path.join(tmp, 'bench.db')
+            db.setup_db()
+            csv_import = CsvImport(make_csv(rows))
+            while batch := csv_import.next_batch():
+                db.insert_records(TENANT, batch)
+
+            for label, func, *args in modes:
+                size, elapsed, peak = measure(func, *args)
+                print(f"{rows:>8} {label:<15} {size / 1e6:>8.2f} {elapsed:>8.2f} {peak / 1e6:>8.1f}")
+            db.close_connections()
+
+
+if __name__ == '__main__':
+    main()
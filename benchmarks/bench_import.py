@@ -0,0 +1,52 @@
+# benchmarks/bench_import.py
+"""Times parsing and batched insertion of a large CSV in the !export format, as !import does.
+
+Usage: python -m benchmarks.bench_import [rows]
+"""
+
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import db
+from importer import CsvImport
+
+TENANT = (1, 1)
+
+
+def make_csv(rows):
+    out = io.StringIO()
+    out.write("Date,Time_Slot,Systolic,Diastolic,Time_of_Record\n")
+    first_day = date(2000, 1, 1)
+    for i in range(rows):
+        day = first_day + timedelta(days=i // 3)
+        out.write(f"{day.strftime('%d-%m-%y')},{'man'[i % 3]},{random.randint(100, 160)},"
+                  f"{random.randint(60, 100)},{7 + 5 * (i % 3):02d}:30:00\n")
+    return out.getvalue().encode('utf-8')
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = make_csv(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'bench.db')
+        db.setup_db()
+
+        start = time.perf_counter()
+        csv_import = CsvImport(data)
+        accepted = 0
+        while batch := csv_import.next_batch():
+            accepted += db.insert_records(TENANT, batch)
+        elapsed = time.perf_counter() - start
+        db.close_connections()
+
+    print(f"{rows} rows ({len(data) / 1e6:.1f} MB): accepted {accepted}, rejected {csv_import.rejected} "
+          f"in {elapsed:.2f} s ({accepted / elapsed:.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_query.py
+"""Compares the old load-everything path with SQL pushdown as the records table grows.
+
+Usage: python -m benchmarks.bench_query [rows ...]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import db
+from utils import days_window
+
+SLOTS = ('morning', 'afternoon', 'night')
+TENANT = (1, 1)
+
+
+def _reading(i, today):
+    # The benchmarked user always holds a year of three readings a day; extra rows belong to
+    # thousands of other users and to older history, so only the table grows
+    if i < 3 * 365:
+        tenant, offset = TENANT, i // 3
+    else:
+        tenant, offset = (1, random.randint(2, 10_000)), random.randint(0, 9000)
+    return (*tenant, db.day_key(today - timedelta(days=offset)), SLOTS[i % 3],
+            random.randint(100, 160), random.randint(60, 100))
+
+
+def populate(path, rows):
+    """Fills a fresh database with `rows` readings."""
+    db.DB_NAME = path
+    db.setup_db()
+    today = date.today()
+    conn = sqlite3.connect(path)
+    # Random other users can draw the same day and slot twice; one reading per slot is kept
+    conn.executemany(
+        "INSERT OR IGNORE INTO records (guild_id, user_id, day, time_slot, systolic, diastolic) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (_reading(i, today) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def old_graph_7():
+    df = db.load_data(TENANT)
+    df = df[df['day'] >= days_window(7).strftime('%Y-%m-%d')]
+    return df.groupby('day')[['systolic', 'diastolic']].mean()
+
+
+def new_graph_7():
+    return db.query_records(TENANT, start=days_window(7), aggregation='daily')
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    print(f"{'rows':>10} {'load_data+filter (ms)':>22} {'query_records (ms)':>20}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            populate(os.path.join(tmp, 'bench.db'), rows)
+            print(f"{rows:>10} {best_of(old_graph_7):>22.2f} {best_of(new_graph_7):>20.2f}")
+
+
+if __name__ == '__main__':
+    main()
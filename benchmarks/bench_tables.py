@@ -0,0 +1,55 @@
+# benchmarks/bench_tables.py
+"""Per-row cost of formatting a daily averages table: iterrows + strftime versus tables.py columns.
+
+Usage: python -m benchmarks.bench_tables [days ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import tables
+
+
+def iterrows_table(df):
+    lines = []
+    for _, row in df.iterrows():
+        date_str = row['day'].strftime('%d-%m-%y')
+        lines.append(f"{date_str:<12} {row['systolic']:<10} {row['diastolic']:<10}")
+    return lines
+
+
+def column_table(days, systolic, diastolic):
+    return tables.concat(tables.left(tables.format_days(days), 12), ' ',
+                         tables.left(tables.format_decimal(systolic), 10), ' ',
+                         tables.left(tables.format_decimal(diastolic), 10)).tolist()
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [31, 366, 3660]
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>6} {'iterrows us/row':>16} {'tables us/row':>14} {'speedup':>8}")
+    for rows in sizes:
+        days = np.datetime64('2020-01-01') + np.arange(rows)
+        systolic = np.round(rng.normal(128, 10, rows), 1)
+        diastolic = np.round(rng.normal(82, 7, rows), 1)
+        df = pd.DataFrame({'day': pd.to_datetime(days), 'systolic': systolic, 'diastolic': diastolic})
+        assert iterrows_table(df) == column_table(days, systolic, diastolic)
+
+        repeat = max(1, 20000 // rows)
+        old = timed(lambda: iterrows_table(df), repeat) / rows * 1e6
+        new = timed(lambda: column_table(days, systolic, diastolic), repeat) / rows * 1e6
+        print(f"{rows:>6} {old:>16.2f} {new:>14.2f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
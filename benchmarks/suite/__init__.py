@@ -0,0 +1 @@
+"""Benchmark suite driving every command path against synthetic histories. Run: python -m benchmarks.suite"""
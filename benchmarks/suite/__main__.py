@@ -0,0 +1,122 @@
+# benchmarks/suite/__main__.py
+"""Benchmarks every command path on synthetic histories and saves the results as JSON.
+
+Usage: python -m benchmarks.suite [--sizes 1000 100000 10000000] [--scenarios graph_30 total ...]
+                                  [--repeat 3] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.suite.scenarios import SCENARIOS
+from benchmarks.suite.synthetic import populate
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_SIZES = (1_000, 100_000, 10_000_000)
+REGRESSION_THRESHOLD = 1.2  # Flag a scenario when its time or scan cost grows by 20%
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(path, name, repeat, workdir):
+    """Runs one scenario in a fresh interpreter and returns its per-run measurements."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, GRAPH_CACHE_MEMORY_MB='0', GRAPH_CACHE_DIR='')
+    # The worker runs inside the temp dir and sets up logging there; this process never calls setup_logging(),
+    # so populating the database logs nothing to a file in the repo
+    result = subprocess.run([sys.executable, '-m', 'benchmarks.suite.worker', path, name, str(repeat)],
+                            cwd=workdir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    """First run is cold (new process, empty caches); the rest are warm."""
+    warm = runs[1:] or runs
+    return {
+        'cold_ms': runs[0]['wall_ms'],
+        'warm_ms': min(run['wall_ms'] for run in warm),
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+        'sql_statements': runs[-1]['sql_statements'],
+        'vm_steps': runs[-1]['vm_steps'],
+        'messages': runs[-1]['messages'],
+        'output_bytes': runs[-1]['output_bytes'],
+        'runs': runs,
+    }
+
+
+def compare(results, baseline):
+    """Prints scenarios whose warm time or scan cost regressed against a saved baseline."""
+    regressions = 0
+    for size, entry in results['sizes'].items():
+        old_entry = baseline.get('sizes', {}).get(size)
+        if not old_entry:
+            continue
+        for name, new in entry['scenarios'].items():
+            old = old_entry['scenarios'].get(name)
+            if not old:
+                continue
+            for metric in ('warm_ms', 'vm_steps', 'peak_rss_mb'):
+                if old[metric] and new[metric] / old[metric] > REGRESSION_THRESHOLD:
+                    regressions += 1
+                    print(f"⚠️ {size} rows {name}: {metric} {old[metric]} -> {new[metric]}")
+    print(f"{regressions} regression(s) against {baseline.get('revision') or 'baseline'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=f"bench_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    args = parser.parse_args()
+
+    results = {
+        'revision': git_revision(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': {},
+    }
+
+    print(f"{'rows':>10} {'scenario':<12} {'cold ms':>9} {'warm ms':>9} {'peak MB':>8} {'sql':>5} {'vm steps':>12}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            start = time.perf_counter()
+            tenants = populate(path, size)
+            entry = {'users': len(tenants), 'populate_s': round(time.perf_counter() - start, 2), 'scenarios': {}}
+            results['sizes'][str(size)] = entry
+
+            for name in args.scenarios:
+                summary = summarize(run_scenario(path, name, args.repeat, tmp))
+                entry['scenarios'][name] = summary
+                print(f"{size:>10} {name:<12} {summary['cold_ms']:>9.1f} {summary['warm_ms']:>9.1f} "
+                      f"{summary['peak_rss_mb']:>8.1f} {summary['sql_statements']:>5} {summary['vm_steps']:>12}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            sys.exit(1 if compare(results, json.load(f)) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/suite/fake_discord.py
+"""Minimal stand-ins for the discord.py objects the cogs touch, capturing everything they send."""
+
+import asyncio
+from dataclasses import dataclass, field
+
+
+@dataclass
+class FakeGuild:
+    id: int
+    filesize_limit: int = 25 * 1024 * 1024
+
+
+@dataclass
+class FakeUser:
+    id: int
+
+    def __str__(self):
+        return f"user-{self.id}"
+
+
+@dataclass
+class FakeMessage:
+    attachments: list = field(default_factory=list)
+
+    async def add_reaction(self, emoji):
+        pass
+
+
+class FakeChannel:
+    """Channel (and context) whose send() records messages instead of calling Discord."""
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.sent = []  # (content, attachment bytes)
+
+    async def send(self, content=None, *, file=None, embed=None, **kwargs):
+        size = 0
+        if file is not None:
+            size = len(file.fp.read())
+        self.sent.append((content or '', size))
+        return FakeMessage()
+
+    @property
+    def output_bytes(self):
+        return sum(len(content.encode('utf-8')) + size for content, size in self.sent)
+
+
+class FakeContext(FakeChannel):
+    def __init__(self, tenant):
+        guild_id, user_id = tenant
+        super().__init__(FakeGuild(guild_id) if guild_id else None)
+        self.author = FakeUser(user_id)
+        self.message = FakeMessage()
+
+
+class FakeBot:
+    """Answers the few bot calls cogs make; confirmations always time out."""
+
+    async def wait_for(self, event, *, timeout=None, check=None):
+        raise asyncio.TimeoutError
+
+    async def is_owner(self, user):
+        return True
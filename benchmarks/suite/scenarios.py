@@ -0,0 +1,80 @@
+# benchmarks/suite/scenarios.py
+"""The command paths the suite measures, each driven through the real cog code with a fake ctx."""
+
+import alerts
+import async_db
+import charts
+import db
+from benchmarks.suite.fake_discord import FakeBot, FakeChannel, FakeGuild
+from benchmarks.suite.synthetic import SUBJECT
+from commands.analytics_commands import AnalyticsCommands
+from commands.data_commands import DataCommands
+from commands.graph_commands import GraphCommands
+from commands.record_commands import RecordCommands
+from utils import get_local_time
+
+
+class Cogs:
+    """One instance of every cog, sharing a fake bot."""
+
+    def __init__(self):
+        bot = FakeBot()
+        self.data = DataCommands(bot)
+        self.graph = GraphCommands(bot)
+        self.record = RecordCommands(bot)
+        self.analytics = AnalyticsCommands(bot)
+
+    def close(self):
+        async_db.shutdown()
+        charts.renderer.shutdown()
+
+
+def _this_month():
+    return get_local_time().strftime('%m-%y')
+
+
+def _this_year():
+    return get_local_time().strftime('%y')
+
+
+async def alert_scan(ctx, cogs):
+    """Evaluates every user of the subject's guild from scratch and sends their alerts (the old daily job)."""
+    engine = alerts.AlertEngine()
+    channel = FakeChannel(FakeGuild(SUBJECT[0]))
+    for tenant in await async_db.list_tenants(channel.guild.id):
+        alert = await async_db.run_read(engine.evaluate, tenant)
+        if alert is not None:
+            await alerts.send_alert(channel, alert)
+    ctx.sent.extend(channel.sent)
+
+
+_write_engine = alerts.AlertEngine(repeat_hours=0)
+
+
+async def alert_on_write(ctx, cogs):
+    """What a new reading for today costs the alert engine (the first run also loads the window)."""
+    channel = FakeChannel(FakeGuild(SUBJECT[0]))
+    alert = await async_db.run_read(_write_engine.evaluate, SUBJECT, {db.day_key(get_local_time().date())})
+    if alert is not None:
+        await alerts.send_alert(channel, alert)
+    ctx.sent.extend(channel.sent)
+
+
+SCENARIOS = {
+    'load_data': lambda ctx, cogs: async_db.run_read(db.load_data, SUBJECT),
+    'last': lambda ctx, cogs: cogs.record.show_last.callback(cogs.record, ctx, 5),
+    'history': lambda ctx, cogs: cogs.record.show_history.callback(cogs.record, ctx),
+    'data_30': lambda ctx, cogs: cogs.data._generate_data_table(ctx, 30),
+    'data_year': lambda ctx, cogs: cogs.data._generate_period_data_table(ctx, 'year', _this_year()),
+    'total': lambda ctx, cogs: cogs.data.total_stats.callback(cogs.data, ctx),
+    'graph_30': lambda ctx, cogs: cogs.graph.daily_graph.callback(cogs.graph, ctx, 30),
+    'graph_m_30': lambda ctx, cogs: cogs.graph._generate_slot_graph_days(ctx, 'morning', 30),
+    'graph_month': lambda ctx, cogs: cogs.graph._generate_period_graph(ctx, 'month', _this_month()),
+    'graph_year': lambda ctx, cogs: cogs.graph._generate_period_graph(ctx, 'year', _this_year()),
+    'export': lambda ctx, cogs: cogs.record.export_data.callback(cogs.record, ctx),
+    'export_gz': lambda ctx, cogs: cogs.record.export_data.callback(cogs.record, ctx, 'gz'),
+    'trend': lambda ctx, cogs: cogs.analytics.trend.callback(cogs.analytics, ctx),
+    'variability': lambda ctx, cogs: cogs.analytics.variability.callback(cogs.analytics, ctx),
+    'alert_scan': alert_scan,
+    'alert_on_write': alert_on_write,
+}
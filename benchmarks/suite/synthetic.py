@@ -0,0 +1,102 @@
+# benchmarks/suite/synthetic.py
+"""Realistic synthetic blood-pressure histories written into a bot database.
+
+Every user gets a baseline pressure, a slow drift and a seasonal swing, slot-dependent offsets,
+measurement noise, an uneven slot mix (mornings are logged most, afternoons least) and gaps of
+days to weeks without readings. Histories end today, as live data does.
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+import numpy as np
+
+import db
+
+SLOTS = ('morning', 'afternoon', 'night')
+SLOT_PROBABILITY = np.array([0.9, 0.35, 0.7])  # Chance a slot is logged on a day with readings
+SLOT_OFFSET = np.array([[4.0, 3.0], [0.0, 0.0], [-3.0, -2.0]])  # Morning surge, night dip (sys, dia)
+SLOT_HOUR = np.array([8, 14, 22])
+GAP_START_PROBABILITY = 0.015  # Chance a gap starts on any day
+GAP_DAYS = (2, 30)
+ACTIVE_DAYS = 60  # Every user logged recently, so windowed commands and alerts have data to work on
+
+READINGS_PER_USER = 3000  # About three years of history each
+USERS_PER_GUILD = 100
+SUBJECT = (1, 1)  # The tenant every command is run as; always the first and longest history
+
+
+def tenants(readings):
+    """Returns [(tenant, readings)] splitting `readings` over as many users as a realistic history needs."""
+    result = []
+    remaining = readings
+    index = 0
+    while remaining > 0:
+        count = min(READINGS_PER_USER, remaining)
+        result.append(((1 + index // USERS_PER_GUILD, 1 + index % USERS_PER_GUILD), count))
+        remaining -= count
+        index += 1
+    return result
+
+
+def user_history(rng, count, today):
+    """Generates `count` readings as (day, slot, sys, dia, record_date) tuples ending today."""
+    baseline = np.array([rng.normal(128, 10), rng.normal(82, 7)])
+    drift = rng.normal(0, 4, size=2) / 365  # mmHg per day
+    season = rng.uniform(2, 5)
+
+    rows = []
+    day_offset = 0
+    while len(rows) < count:
+        # Build one chunk of days at a time, newest first, with every slot decision vectorized
+        offsets = day_offset + np.arange(256)
+        active = np.ones(len(offsets), dtype=bool)
+        for start in np.nonzero(rng.random(len(offsets)) < GAP_START_PROBABILITY)[0]:
+            active[start:start + int(rng.integers(*GAP_DAYS))] = False
+        active[offsets < ACTIVE_DAYS] = True
+        logged = (rng.random((len(offsets), 3)) < SLOT_PROBABILITY) & active[:, None]
+        day_idx, slot_idx = np.nonzero(logged)
+        days_ago = offsets[day_idx]
+        trend = baseline - np.outer(days_ago, drift)
+        seasonal = season * np.sin(2 * np.pi * days_ago / 365)[:, None]
+        values = trend + seasonal + SLOT_OFFSET[slot_idx] + rng.normal(0, [9, 6], size=(len(day_idx), 2))
+        systolic = np.clip(values[:, 0], 85, 220).round().astype(int)
+        diastolic = np.clip(values[:, 1], 50, 130).round().astype(int)
+        minutes = rng.integers(0, 60, size=len(day_idx))
+
+        for ago, slot, sys_, dia, minute in zip(days_ago.tolist(), slot_idx.tolist(), systolic.tolist(),
+                                                diastolic.tolist(), minutes.tolist()):
+            day = db.day_key(today - timedelta(days=ago))
+            rows.append((day, SLOTS[slot], sys_, dia, f"{day} {SLOT_HOUR[slot]:02d}:{minute:02d}:00"))
+            if len(rows) == count:
+                break
+        day_offset += len(offsets)
+    return rows
+
+
+def populate(path, readings, seed=0):
+    """Creates a database at `path` holding `readings` synthetic readings. Returns the tenant list."""
+    db.DB_NAME = path
+    db.setup_db()
+    db.close_connections()
+
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    plan = tenants(readings)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    try:
+        for (guild_id, user_id), count in plan:
+            # Triggers keep daily_stats in step, as they do for live writes
+            conn.executemany(
+                "INSERT INTO records (guild_id, user_id, day, time_slot, systolic, diastolic, record_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((guild_id, user_id, *row) for row in user_history(rng, count, today))
+            )
+            conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return [tenant for tenant, _ in plan]
@@ -0,0 +1,126 @@
+# benchmarks/suite/worker.py
+"""Runs one scenario against an existing database and prints its measurements as JSON.
+
+Each scenario runs in a fresh process so peak RSS and caches belong to that command alone.
+Usage: python -m benchmarks.suite.worker <db_path> <scenario> [repeat]
+"""
+
+import asyncio
+import json
+import resource
+import sys
+import threading
+import time
+
+import db
+from log_pipeline import setup_logging
+from benchmarks.suite.scenarios import SCENARIOS, Cogs
+from benchmarks.suite.fake_discord import FakeContext
+from benchmarks.suite.synthetic import SUBJECT
+
+PROGRESS_INTERVAL = 100  # SQLite VM instructions between progress callbacks
+
+
+class SqlCounters:
+    """Counts statements and VM instructions on every connection db.py opens.
+
+    SQLite does not report rows scanned to Python; VM instructions grow with the rows a
+    statement visits, so they serve as the scan-cost measure.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.vm_steps = 0
+        self._lock = threading.Lock()
+
+    def _on_statement(self, sql):
+        with self._lock:
+            self.statements += 1
+
+    def _on_progress(self):
+        with self._lock:
+            self.vm_steps += PROGRESS_INTERVAL
+        return 0
+
+    def install(self):
+        connect = db.ConnectionManager._connect
+
+        def instrumented(manager):
+            conn = connect(manager)
+            conn.set_trace_callback(self._on_statement)
+            conn.set_progress_handler(self._on_progress, PROGRESS_INTERVAL)
+            return conn
+
+        db.ConnectionManager._connect = instrumented
+
+    def snapshot(self):
+        with self._lock:
+            return self.statements, self.vm_steps
+
+
+def _rss_mb(field):
+    """Current (VmRSS) or peak (VmHWM) resident set size from /proc, in MB."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1]) / 1024
+    raise OSError(field)
+
+
+def _reset_peak_rss():
+    """Resets VmHWM so the next peak belongs to the next run only (Linux); False if unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb(resettable):
+    if resettable:
+        return _rss_mb('VmHWM')
+    # ru_maxrss is in KB on Linux, bytes on macOS, and never resets
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+async def run(path, name, repeat):
+    counters = SqlCounters()
+    counters.install()
+    db.DB_NAME = path
+    cogs = Cogs()
+    scenario = SCENARIOS[name]
+
+    runs = []
+    for _ in range(repeat):
+        ctx = FakeContext(SUBJECT)
+        resettable = _reset_peak_rss()
+        statements, vm_steps = counters.snapshot()
+        start = time.perf_counter()
+        await scenario(ctx, cogs)
+        wall = time.perf_counter() - start
+        after_statements, after_vm_steps = counters.snapshot()
+        runs.append({
+            'wall_ms': round(wall * 1000, 2),
+            'peak_rss_mb': round(peak_rss_mb(resettable), 1),
+            'sql_statements': after_statements - statements,
+            'vm_steps': after_vm_steps - vm_steps,
+            'messages': len(ctx.sent),
+            'output_bytes': ctx.output_bytes,
+        })
+    cogs.close()
+    return runs
+
+
+def main():
+    path, name = sys.argv[1], sys.argv[2]
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    # Started from the temp dir by the suite, so the log file is written there
+    setup_logging()
+    runs = asyncio.run(run(path, name, repeat))
+    print(json.dumps(runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+# charts.py
+"""Blood pressure chart rendering off the event loop.
+
+Figures are built with the object-oriented Figure/Agg API (no pyplot global state) inside a
+process pool, and only the PNG bytes travel back to the cogs. Each worker keeps one prebuilt
+figure per chart layout (ChartTemplate): its axes, lines, reference lines and legend are made
+once, and later charts of that layout only swap the line data, title and ticks, so a render is
+a single draw; margins are only re-fitted when the title or tick labels change size.
+"""
+
+import asyncio
+import io
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import matplotlib.dates as mdates
+from PIL import Image
+
+import metrics
+from config import RENDER_WORKERS, RENDER_QUEUE_LIMIT, CHART_PALETTE_COLORS
+
+COLOR_SYS = '#FF6B6B'
+COLOR_DIA = '#4ECDC4'
+REFERENCE_COLOR = '#FF4444'  # Color rojo para las líneas de referencia
+DPI = 150
+TIGHT_PAD = 0.3  # Figure padding of tight_bbox charts, which used to be cropped with bbox_inches='tight'
+MARGIN_STEP = 4  # Pixels a title or tick label may grow or shrink before a template re-fits its margins
+WIDTH_CACHE_SIZE = 4096  # Measured label widths a template keeps before starting over
+
+
+class RenderQueueFull(Exception):
+    """Raised when too many charts are already waiting to be rendered."""
+
+
+@dataclass
+class ChartSpec:
+    """Everything a worker needs to draw a systolic/diastolic line chart."""
+    title: str
+    days: list
+    systolic: list
+    diastolic: list
+    date_format: str = '%d %b'
+    locator: str = 'day'  # 'day' or 'month'
+    interval: int = 1
+    figsize: tuple = (12, 6)
+    reference_lines: tuple = (140, 90)
+    alpha: float = None
+    tight_bbox: bool = False
+
+
+def render_chart(spec):
+    """Draws a chart on a new figure and returns it as PNG bytes.
+
+    The reference the templates are measured against (benchmarks/bench_charts.py); workers use render_template.
+    """
+    fig = Figure(figsize=spec.figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    ax.plot(spec.days, spec.systolic, marker='o', linestyle='-', label='Systolic', alpha=spec.alpha,
+            color=COLOR_SYS, linewidth=2.5, markersize=6)
+    ax.plot(spec.days, spec.diastolic, marker='s', linestyle='-', label='Diastolic', alpha=spec.alpha,
+            color=COLOR_DIA, linewidth=2.5, markersize=6)
+
+    for y in spec.reference_lines:
+        ax.axhline(y=y, color=REFERENCE_COLOR, linestyle='--', alpha=0.7, linewidth=1)
+
+    ax.set_title(spec.title, fontsize=14, fontweight='bold')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Pressure (mmHg)')
+    ax.legend()
+    ax.grid(False)  # Grid desactivado
+    ax.tick_params(axis='x', rotation=45)
+
+    ax.xaxis.set_major_formatter(mdates.DateFormatter(spec.date_format))
+    ax.xaxis.set_major_locator(_locator(spec))
+
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight' if spec.tight_bbox else None)
+    return buffer.getvalue()
+
+
+def _locator(spec):
+    if spec.locator == 'month':
+        return mdates.MonthLocator()
+    return mdates.DayLocator(interval=spec.interval)
+
+
+class ChartTemplate:
+    """A figure prebuilt for one layout (size, reference lines, date format, padding) whose data is swapped per chart.
+
+    Margins are fitted with tight_layout and kept while the title and tick labels keep the same size;
+    a chart whose texts are wider or narrower (rounded to MARGIN_STEP pixels) re-fits them first.
+    """
+
+    def __init__(self, figsize, reference_lines, date_format, tight_bbox):
+        self.fig = Figure(figsize=figsize, dpi=DPI)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.pad = TIGHT_PAD if tight_bbox else 1.08
+        ax = self.ax = self.fig.add_subplot()
+        ax.xaxis_date()
+        self.systolic, = ax.plot([], [], marker='o', linestyle='-', label='Systolic', color=COLOR_SYS,
+                                 linewidth=2.5, markersize=6)
+        self.diastolic, = ax.plot([], [], marker='s', linestyle='-', label='Diastolic', color=COLOR_DIA,
+                                  linewidth=2.5, markersize=6)
+        for y in reference_lines:
+            ax.axhline(y=y, color=REFERENCE_COLOR, linestyle='--', alpha=0.7, linewidth=1)
+
+        self.title = ax.set_title(' ', fontsize=14, fontweight='bold')
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Pressure (mmHg)')
+        ax.legend()
+        ax.grid(False)  # Grid desactivado
+        ax.tick_params(axis='x', rotation=45)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter(date_format))
+        self._fitted = None  # Text sizes the current margins were fitted to
+        self._widths = {}  # (text, font) -> width in pixels
+
+    def _set(self, title, days, systolic, diastolic, alpha, locator):
+        x = mdates.date2num(days)
+        self.systolic.set_data(x, systolic)
+        self.diastolic.set_data(x, diastolic)
+        self.systolic.set_alpha(alpha)
+        self.diastolic.set_alpha(alpha)
+        self.title.set_text(title)
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+    def _text_sizes(self):
+        """Widths of the title and the widest x and y tick labels, in MARGIN_STEP pixel steps."""
+        renderer = self.canvas.get_renderer()
+
+        def width(text, font):
+            # The same few dates and pressures label most charts, so each is measured once per template
+            key = (text, font)
+            if key not in self._widths:
+                if len(self._widths) >= WIDTH_CACHE_SIZE:
+                    self._widths.clear()
+                self._widths[key] = renderer.get_text_width_height_descent(text, font, ismath=False)[0]
+            return self._widths[key]
+
+        sizes = [width(self.title.get_text(), self.title.get_fontproperties())]
+        for axis in (self.ax.xaxis, self.ax.yaxis):
+            font = axis.get_major_ticks()[0].label1.get_fontproperties()
+            low, high = sorted(axis.get_view_interval())
+            ticks = [tick for tick in axis.get_major_locator()() if low <= tick <= high]
+            labels = axis.get_major_formatter().format_ticks(ticks)
+            sizes.append(max((width(label, font) for label in labels), default=0))
+        return tuple(math.ceil(size / MARGIN_STEP) for size in sizes)
+
+    def render(self, spec):
+        """Draws `spec` into the template and returns PNG bytes (CHART_PALETTE_COLORS decides the encoding).
+
+        One canvas draw, after re-fitting the margins only if the texts changed size; savefig would add a
+        layout dry run on every chart.
+        """
+        self._set(spec.title, spec.days, spec.systolic, spec.diastolic, spec.alpha, _locator(spec))
+        sizes = self._text_sizes()
+        if sizes != self._fitted:
+            self.fig.tight_layout(pad=self.pad)
+            self.fig.set_layout_engine('none')
+            self._fitted = sizes
+        self.canvas.draw()
+        image = Image.frombuffer('RGBA', self.canvas.get_width_height(), self.canvas.buffer_rgba()).convert('RGB')
+        if CHART_PALETTE_COLORS:
+            image = image.quantize(CHART_PALETTE_COLORS, method=Image.Quantize.FASTOCTREE)
+        buffer = io.BytesIO()
+        image.save(buffer, format='png')
+        return buffer.getvalue()
+
+
+_templates = {}  # Per worker process: layout -> ChartTemplate
+
+
+def render_template(spec):
+    """Draws a chart with this process's template for its layout (built on first use). Returns PNG bytes."""
+    layout = (tuple(spec.figsize), tuple(spec.reference_lines), spec.date_format, spec.tight_bbox)
+    template = _templates.get(layout)
+    if template is None:
+        template = _templates[layout] = ChartTemplate(*layout)
+    return template.render(spec)
+
+
+def _render_timed(spec):
+    """render_template plus the seconds it took inside the worker, so queueing and drawing can be told apart."""
+    start = time.perf_counter()
+    png = render_template(spec)
+    return png, time.perf_counter() - start
+
+
+class ChartRenderer:
+    """Process pool with a bounded number of in-flight renders."""
+
+    def __init__(self, workers=RENDER_WORKERS, max_queue=RENDER_QUEUE_LIMIT):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._pending = 0
+        self._pool = None
+
+    def _get_pool(self):
+        # Spawned (not forked) workers so they never inherit the bot's threads or sockets
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    async def render(self, spec):
+        """Renders `spec` in the pool and returns PNG bytes. Raises RenderQueueFull when saturated."""
+        if self._pending >= self.max_queue:
+            raise RenderQueueFull(f"{self._pending} charts already queued")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            png, draw_seconds = await loop.run_in_executor(self._get_pool(), _render_timed, spec)
+            metrics.observe('render_duration_seconds', draw_seconds)
+            metrics.observe('render_wait_seconds', max(0.0, time.perf_counter() - start - draw_seconds))
+            return png
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+renderer = ChartRenderer()
+
+
+async def render(spec):
+    """Renders a chart with the shared renderer."""
+    return await renderer.render(spec)
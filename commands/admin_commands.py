@@ -0,0 +1,97 @@
+# commands/admin_commands.py
+
+from discord.ext import commands
+
+from async_db import rebuild_daily_stats, backup_database, verify_backup
+from backup import latest_backup
+import metrics
+from utils import logger
+
+
+class AdminCommands(commands.Cog):
+    """Maintenance commands restricted to the bot owner."""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_check(self, ctx):
+        return await self.bot.is_owner(ctx.author)
+
+    # --- DAILY STATS RECONCILIATION ---
+    @commands.command(name='rebuild_stats', help='Rebuilds the daily averages table from raw records (owner only).',
+                      hidden=True)
+    async def rebuild_stats(self, ctx):
+        await ctx.send("🔁 Rebuilding daily statistics...")
+        rows = await rebuild_daily_stats()
+
+        if rows is None:
+            await ctx.send("❌ Error rebuilding daily statistics. Check logs for details.")
+            return
+
+        await ctx.send(f"✅ **Daily statistics rebuilt:** {rows} day/slot rows.")
+        logger.info(f"🔁 Daily stats rebuilt by {ctx.author}")
+
+    # --- BACKUPS ---
+    @commands.command(name='backup', help='Creates a database backup now (owner only).', hidden=True)
+    async def backup_now(self, ctx):
+        await ctx.send("💾 Creating backup...")
+        path = await backup_database()
+
+        if path is None:
+            await ctx.send("❌ Error creating backup. Check logs for details.")
+            return
+
+        await ctx.send(f"✅ **Backup created:** `{path}`")
+
+    @commands.command(name='verify_backup',
+                      help='Checks that a backup restores cleanly. Usage: !verify_backup [file] (owner only)',
+                      hidden=True)
+    async def verify_backup_command(self, ctx, path: str = None):
+        path = path or latest_backup()
+        if path is None:
+            await ctx.send("❌ **No backups found.**")
+            return
+
+        await ctx.send(f"🔍 Verifying `{path}`...")
+        ok, detail = await verify_backup(path)
+
+        if ok:
+            await ctx.send(f"✅ **Backup restores cleanly:** {detail}")
+        else:
+            await ctx.send(f"❌ **Backup verification failed:** {detail}")
+        logger.info(f"🔍 Backup verified by {ctx.author} - {path}: {detail}")
+
+    # --- METRICS ---
+    @commands.command(name='metrics', help='Shows latency percentiles and counters (owner only).', hidden=True)
+    async def show_metrics(self, ctx):
+        histograms, counters = metrics.registry.summary()
+        if not histograms and not counters:
+            await ctx.send("📈 No metrics recorded yet.")
+            return
+
+        def label_text(labels):
+            return ','.join(str(value) for value in labels.values())
+
+        lines = [f"{'timer':<44} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)"]
+        for name, labels, count, p50, p95, p99, _ in histograms:
+            key = f"{name.replace('_seconds', '')}[{label_text(labels)}]" if labels else name.replace('_seconds', '')
+            lines.append(f"{key[:44]:<44} {count:>6} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f} {p99 * 1000:>8.1f}")
+        lines.append("")
+        for name, labels, value in counters:
+            key = f"{name}[{label_text(labels)}]" if labels else name
+            lines.append(f"{key[:44]:<44} {value:>12}")
+
+        # Keep inside Discord's 2000 character limit; the HTTP endpoint has everything
+        output, length = [], 0
+        for line in lines:
+            if length + len(line) > 1850:
+                output.append(f"... {len(lines) - len(output)} more lines")
+                break
+            output.append(line)
+            length += len(line) + 1
+
+        await ctx.send("📈 **Metrics**\n```\n" + '\n'.join(output) + "\n```")
+
+
+async def setup(bot):
+    await bot.add_cog(AdminCommands(bot))
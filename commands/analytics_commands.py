@@ -0,0 +1,88 @@
+# commands/analytics_commands.py
+
+from discord.ext import commands
+import math
+
+import analytics
+from async_db import run_read
+from utils import get_local_time, tenant_of, logger
+
+
+def _pair(values, signed=False):
+    """Formats a (systolic, diastolic) pair, with a dash for values that can't be computed."""
+    if values is None or any(math.isnan(v) for v in values):
+        return "—"
+    sign = '+' if signed else ''
+    return f"{values[0]:{sign}.1f}/{values[1]:{sign}.1f}"
+
+
+class AnalyticsCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def _report(self, ctx):
+        report = await run_read(analytics.engine.report, tenant_of(ctx), get_local_time().date())
+        if report is None:
+            await ctx.send("❌ Error calculating statistics. Please try again.")
+            return None
+        if all(current is None for current, _ in report.values()):
+            await ctx.send(f"📊 No records in the last {max(analytics.WINDOWS)} days.")
+            return None
+        return report
+
+    # --- TREND COMMAND ---
+    @commands.command(name='trend', help='Shows 7/30/90-day average blood pressure and how it changed.')
+    async def trend(self, ctx):
+        report = await self._report(ctx)
+        if report is None:
+            return
+
+        lines = ["📈 **Blood Pressure Trend**", "```",
+                 f"{'Window':<9} {'Average':<13} {'vs previous':<13} {'Days':>4}", "-" * 42]
+        for days, (current, previous) in report.items():
+            if current is None:
+                lines.append(f"{f'{days} days':<9} {'—':<13} {'—':<13} {0:>4}")
+                continue
+            change = current.mean - previous.mean if previous is not None else None
+            if change is None:
+                arrow = ''
+            elif change[0] >= 1:
+                arrow = '▲ '
+            elif change[0] <= -1:
+                arrow = '▼ '
+            else:
+                arrow = '= '
+            lines.append(f"{f'{days} days':<9} {_pair(current.mean):<13} {arrow + _pair(change, signed=True):<13} "
+                         f"{current.days:>4}")
+        lines.append("```")
+        lines.append("Averages are means of daily averages; *vs previous* compares with the window just before.")
+
+        await ctx.send('\n'.join(lines))
+        logger.info("📈 Trend shown")
+
+    # --- VARIABILITY COMMAND ---
+    @commands.command(name='variability', aliases=['variabilidad'],
+                      help='Shows day-to-day variability and the morning-night difference for 7/30/90 days.')
+    async def variability(self, ctx):
+        report = await self._report(ctx)
+        if report is None:
+            return
+
+        lines = ["📉 **Blood Pressure Variability**", "```",
+                 f"{'Window':<9} {'SD':<11} {'ARV':<11} AM-Night", "-" * 44]
+        for days, (current, _) in report.items():
+            if current is None:
+                lines.append(f"{f'{days} days':<9} {'—':<11} {'—':<11} —")
+                continue
+            lines.append(f"{f'{days} days':<9} {_pair(current.sd):<11} {_pair(current.arv):<11} "
+                         f"{_pair(current.morning_night, signed=True)}")
+        lines.append("```")
+        lines.append("**SD:** spread of daily averages · **ARV:** average change from one measured day to the "
+                     "next · **AM-Night:** morning minus night average on days with both.")
+
+        await ctx.send('\n'.join(lines))
+        logger.info("📉 Variability shown")
+
+
+async def setup(bot):
+    await bot.add_cog(AnalyticsCommands(bot))
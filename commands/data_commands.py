@@ -1,11 +1,15 @@
 from discord.ext import commands
-from datetime import timedelta
-import numpy as np
 import discord
-import pandas as pd
+import numpy as np
+
+import aggregate_cache
+import db
+import tables
+from async_db import monthly_slot_sums, pressure_histogram, run_read
+from series_store import store
+from utils import days_window, parse_period, tenant_of, logger
 
-from db import load_data
-from utils import get_local_time, logger
+PERCENTILES = (10, 50, 90)
 
 
 class DataCommands(commands.Cog):
@@ -37,177 +41,173 @@ class DataCommands(commands.Cog):
 
     async def _generate_data_table(self, ctx, days: int, slot: str = None):
         """Helper function to generate N-day data tables"""
-        df = load_data()
-
-        if df.empty:
-            await ctx.send("📊 No records.")
+        start = days_window(days)
+        pages = await self._cached_pages(ctx, ('data', days, start, slot),
+                                        lambda: self._data_table_pages(ctx, days, start, slot))
+        if pages is None:
+            await ctx.send("❌ Error loading data.")
             return
+        await tables.send_pages(ctx, pages)
 
-        cutoff_date = get_local_time() - timedelta(days=days)
-        cutoff_date_np = np.datetime64(cutoff_date)
-        df_period = df[df['day'] >= cutoff_date_np].copy()
+    async def _data_table_pages(self, ctx, days, start, slot):
+        """The !data message pages for the last `days` days, or None if the data could not be read."""
+        # Daily averages are sliced from the user's in-memory readings for the requested window only
+        daily = await run_read(store.daily, tenant_of(ctx), start, None, slot)
 
-        if df_period.empty:
-            await ctx.send(f"📊 No records in the last {days} days.")
-            return
-
-        if slot:
-            df_period = df_period[df_period['time_slot'] == slot].copy()
-            if df_period.empty:
-                await ctx.send(f"📊 No **{self.slot_display[slot]}** records in the last {days} days.")
-                return
+        if daily is None:
+            return None
+        if daily.empty:
+            if slot:
+                return (f"📊 No **{self.slot_display[slot]}** records in the last {days} days.",)
+            return (f"📊 No records in the last {days} days.",)
+        return self._daily_table(f"📋 **Blood Pressure Data - Last {days} Days**", daily, slot)
 
-        # Calculate daily averages
-        df_daily = df_period.groupby('day')[['systolic', 'diastolic']].mean().round(1).reset_index()
-        df_daily = df_daily.sort_values('day', ascending=True)
-
-        if df_daily.empty:
-            await ctx.send(f"📊 No data to display for the last {days} days.")
-            return
+    def _daily_table(self, title, daily, slot):
+        """Pages of a daily averages table with the overall average under every page."""
+        systolic, diastolic = np.round(daily.systolic, 1), np.round(daily.diastolic, 1)
 
         # Calculate overall average
-        avg_sys = df_daily['systolic'].mean().round(1)
-        avg_dia = df_daily['diastolic'].mean().round(1)
-
-        # Create table
-        table_data = []
-        table_data.append(f"📋 **Blood Pressure Data - Last {days} Days**")
-        if slot:
-            table_data.append(f"**Time Slot:** {self.slot_display[slot]}")
-
-        table_data.append("```")
-        table_data.append(f"{'Date':<12} {'Systolic':<10} {'Diastolic':<10}")
-        table_data.append("-" * 35)
-
-        for _, row in df_daily.iterrows():
-            date_str = row['day'].strftime('%d-%m-%y')
-            table_data.append(f"{date_str:<12} {row['systolic']:<10} {row['diastolic']:<10}")
-
-        table_data.append("-" * 35)
-        table_data.append(f"{'AVERAGE':<12} {avg_sys:<10} {avg_dia:<10}")
-        table_data.append("```")
-
-        message = '\n'.join(table_data)
-        if len(message) > 2000:
-            short_message = (
-                f"📋 **Blood Pressure Data - Last {days} Days**\n"
-                f"{'Time Slot: ' + self.slot_display[slot] if slot else ''}\n"
-                f"**Overall Average:** {avg_sys}/{avg_dia} mmHg\n"
-                f"**Days with data:** {len(df_daily)}"
-            )
-            await ctx.send(short_message)
-        else:
-            await ctx.send(message)
+        avg_sys = systolic.mean().round(1)
+        avg_dia = diastolic.mean().round(1)
+
+        # Whole columns at once: dates, then the values padded to their widths
+        rows = tables.concat(tables.left(tables.format_days(daily.days), 12), ' ',
+                             tables.left(tables.format_decimal(systolic), 10), ' ',
+                             tables.left(tables.format_decimal(diastolic), 10))
+
+        header = [f"**Time Slot:** {self.slot_display[slot]}"] if slot else []
+        header += ["```", f"{'Date':<12} {'Systolic':<10} {'Diastolic':<10}", "-" * 35]
+        footer = ["-" * 35, f"{'AVERAGE':<12} {avg_sys:<10} {avg_dia:<10}", "```"]
+        return tables.paginate(title, rows.tolist(), header, footer)
+
+    async def _cached_pages(self, ctx, key, build):
+        """Returns the message pages `build()` makes from the author's data, reusing them until their data changes.
+
+        The data generation is read before building, so pages built while a write lands are never reused.
+        Failed builds (None) are not cached.
+        """
+        tenant = tenant_of(ctx)
+        generation = db.generation(tenant)
+        pages = aggregate_cache.cache.get(tenant, key, generation)
+        if pages is None:
+            pages = await build()
+            if pages is not None:
+                aggregate_cache.cache.put(tenant, key, generation, pages)
+        return pages
 
     # --- TOTAL STATISTICS COMMAND ---
     @commands.command(name='total', aliases=['stats', 'estadisticas'],
-                      help='Shows monthly statistics by time slots with totals and percentages')
-    async def total_stats(self, ctx):
+                      help='Shows monthly statistics by time slots with totals and percentages. '
+                           'Usage: !total [from MM-YY] [to MM-YY]')
+    async def total_stats(self, ctx, first: str = None, last: str = None):
         """Shows monthly statistics by time slots"""
         try:
-            df = load_data()
-            if df.empty:
-                await ctx.send("📊 No blood pressure data recorded.")
-                return
+            start = parse_period('month', first)[0] if first else None
+            end = parse_period('month', last)[1] if last else None
+        except ValueError:
+            await ctx.send("❌ **Invalid month format.** Use `MM-YY` (e.g., 12-24)")
+            return
 
-            # Use existing 'time_slot' column
-            if 'time_slot' not in df.columns:
-                await ctx.send("❌ **Error:** 'time_slot' column not found in data.")
+        try:
+            pages = await self._cached_pages(ctx, ('total', start, end), lambda: self._total_pages(ctx, start, end))
+            if pages is None:
+                await ctx.send("❌ **Error generating statistics.** Please try again.")
                 return
-
-            # Convert 'day' to datetime if needed
-            df['day'] = pd.to_datetime(df['day'])
-            df['month'] = df['day'].dt.to_period('M')
-
-            # Create pivot table using existing time_slot
-            pivot_table = pd.pivot_table(
-                df,
-                values='systolic',
-                index='month',
-                columns='time_slot',
-                aggfunc='count',
-                fill_value=0
-            )
-
-            # Ensure all time slots are present
-            for time_slot in ['morning', 'afternoon', 'night']:
-                if time_slot not in pivot_table.columns:
-                    pivot_table[time_slot] = 0
-
-            # Reorder columns
-            pivot_table = pivot_table[['morning', 'afternoon', 'night']]
-
-            # Calculate monthly total
-            pivot_table['total'] = pivot_table.sum(axis=1)
-
-            # Sort by month (newest first)
-            pivot_table = pivot_table.sort_index(ascending=True)
-
-            # Calculate overall totals
-            total_readings = pivot_table['total'].sum()
-            total_morning = pivot_table['morning'].sum()
-            total_afternoon = pivot_table['afternoon'].sum()
-            total_night = pivot_table['night'].sum()
-
-            # Create formatted table - ONLY PERCENTAGES IN TOTAL LINE
-            table_data = []
-            table_data.append("📊 **READINGS STATISTICS BY MONTH**")
-            table_data.append("```")
-            # Headers
-            table_data.append("Month      |  Morning | Afternoon|  Night   | Total")
-            table_data.append("-----------|----------|----------|----------|----------")
-
-            for month, row in pivot_table.iterrows():
-                month_str = str(month).replace('-', ' ')
-
-                # NO percentages in monthly lines - just counts
-                table_data.append(
-                    f"{month_str:10} | {row['morning']:>7}  | "
-                    f"{row['afternoon']:>9}| "
-                    f"{row['night']:>8} | {row['total']:>5}"
-                )
-
-            table_data.append("-----------|----------|----------|----------|----------")
-
-            # Calculate overall percentages
-            morning_pct_total = (total_morning / total_readings * 100) if total_readings > 0 else 0
-            afternoon_pct_total = (total_afternoon / total_readings * 100) if total_readings > 0 else 0
-            night_pct_total = (total_night / total_readings * 100) if total_readings > 0 else 0
-
-            # TOTAL line WITH percentages
-            table_data.append(
-                f"{'TOTAL':10} | {total_morning:>2} ({morning_pct_total:2.0f}%) | "
-                f"{total_afternoon:>2} ({afternoon_pct_total:2.0f}%) | "
-                f"{total_night:>2} ({night_pct_total:2.0f}%) | {total_readings:>5}"
-            )
-            table_data.append("```")
-
-            # Summary
-            table_data.append("**General Summary:**")
-            table_data.append(f"• **Total readings recorded:** {total_readings}")
-            table_data.append(
-                f"• **Time slot distribution:** 🌅 Morning: {total_morning} ({morning_pct_total:.1f}%) | 🌞 Afternoon: {total_afternoon} ({afternoon_pct_total:.1f}%) | 🌙 Night: {total_night} ({night_pct_total:.1f}%)")
-
-            message = '\n'.join(table_data)
-
-            # Check message length
-            if len(message) > 2000:
-                # Short message if too long
-                short_message = (
-                    f"📊 **READINGS STATISTICS BY MONTH**\n"
-                    f"**Total readings:** {total_readings}\n"
-                    f"🌅 Morning: {total_morning} ({morning_pct_total:.1f}%)\n"
-                    f"🌞 Afternoon: {total_afternoon} ({afternoon_pct_total:.1f}%)\n"
-                    f"🌙 Night: {total_night} ({night_pct_total:.1f}%)"
-                )
-                await ctx.send(short_message)
-            else:
-                await ctx.send(message)
-
+            # Newest months first; older ones are a button away
+            await tables.send_pages(ctx, pages)
         except Exception as e:
             logger.error(f"Error in !total command: {e}", exc_info=True)
             await ctx.send("❌ **Error generating statistics.** Please try again.")
 
+    async def _total_pages(self, ctx, start, end):
+        """The !total message pages, oldest months first, or None if the data could not be read."""
+        tenant = tenant_of(ctx)
+        # Readings per month and slot come from the daily aggregates in one grouped query
+        rows = await monthly_slot_sums(tenant, start, end)
+        if rows is None:
+            return None
+        if not rows:
+            return ("📊 No blood pressure data recorded." if start is None and end is None else
+                    "📊 No readings in that period.",)
+        # Percentiles come from the per-month histogram of pressures, so no reading is loaded either
+        histogram = await pressure_histogram(tenant, start, end)
+        if histogram is None:
+            return None
+        percentiles = self._slot_percentiles(histogram)
+
+        slots = list(self.slot_display)
+        months = sorted({month for month, *_ in rows})
+        counts = np.zeros((len(months), len(slots)), dtype=np.int64)  # Readings per month and slot
+        totals = np.zeros((len(slots), 3))  # Per slot: readings, sum_sys, sum_dia
+        for month, slot, readings, sum_sys, sum_dia in rows:
+            counts[months.index(month), slots.index(slot)] = readings
+            totals[slots.index(slot)] += (readings, sum_sys, sum_dia)
+
+        # Calculate overall totals and percentages
+        total_morning, total_afternoon, total_night = (int(readings) for readings in totals[:, 0])
+        total_readings = total_morning + total_afternoon + total_night
+        morning_pct_total, afternoon_pct_total, night_pct_total = totals[:, 0] / total_readings * 100
+
+        separator = "-----------|----------|----------|----------|----------"
+        # TOTAL line WITH percentages, repeated on every page
+        footer = [
+            separator,
+            f"{'TOTAL':10} | {total_morning:>2} ({morning_pct_total:2.0f}%) | "
+            f"{total_afternoon:>2} ({afternoon_pct_total:2.0f}%) | "
+            f"{total_night:>2} ({night_pct_total:2.0f}%) | {total_readings:>5}",
+            "```",
+            "**Per time slot** (mmHg):",
+            "```",
+            f"{'Slot':<10} | {'Mean':>11} | {'P10':>7} | {'Median':>7} | {'P90':>7}",
+        ]
+        for slot, (readings, sum_sys, sum_dia) in zip(slots, totals):
+            if not readings:
+                footer.append(f"{self.slot_display[slot]:<10} | {'-':>11} | {'-':>7} | {'-':>7} | {'-':>7}")
+                continue
+            mean = f"{sum_sys / readings:.1f}/{sum_dia / readings:.1f}"
+            p10, p50, p90 = (f"{sys:.0f}/{dia:.0f}" for sys, dia in percentiles[slot])
+            footer.append(f"{self.slot_display[slot]:<10} | {mean:>11} | {p10:>7} | {p50:>7} | {p90:>7}")
+        footer += [
+            "```",
+            "**General Summary:**",
+            f"• **Total readings recorded:** {total_readings}",
+            f"• **Time slot distribution:** 🌅 Morning: {total_morning} ({morning_pct_total:.1f}%) | "
+            f"🌞 Afternoon: {total_afternoon} ({afternoon_pct_total:.1f}%) | "
+            f"🌙 Night: {total_night} ({night_pct_total:.1f}%)",
+        ]
+
+        # NO percentages in monthly lines - just counts
+        month_column = np.char.replace(np.array(months), '-', ' ')
+        lines = tables.concat(tables.left(month_column, 10), ' | ',
+                              tables.right(tables.format_int(counts[:, 0]), 7), '  | ',
+                              tables.right(tables.format_int(counts[:, 1]), 9), '| ',
+                              tables.right(tables.format_int(counts[:, 2]), 8), ' | ',
+                              tables.right(tables.format_int(counts.sum(axis=1)), 5))
+        return tables.paginate("📊 **READINGS STATISTICS BY MONTH**", lines.tolist(),
+                               ["```", "Month      |  Morning | Afternoon|  Night   | Total", separator], footer)
+
+    @staticmethod
+    def _slot_percentiles(histogram):
+        """{slot: [(sys, dia) at P10, P50, P90]} from pressure_histogram rows.
+
+        Exact: the same linear interpolation between the closest ranks as np.percentile over the readings.
+        """
+        bins = {}
+        for slot, measure, value, readings in histogram:
+            values, counts = bins.setdefault((slot, measure), ([], []))
+            values.append(value)
+            counts.append(readings)
+
+        def percentile(values, counts):
+            ends = np.cumsum(counts)  # ends[i]: readings with a value up to values[i]
+            ranks = (ends[-1] - 1) * np.asarray(PERCENTILES) / 100
+            values = np.asarray(values, dtype=float)
+            below = values[np.searchsorted(ends, np.floor(ranks), side='right')]
+            above = values[np.searchsorted(ends, np.ceil(ranks), side='right')]
+            return below + (above - below) * (ranks - np.floor(ranks))
+
+        return {slot: list(zip(percentile(*bins[slot, 'sys']), percentile(*bins[slot, 'dia'])))
+                for slot in ('morning', 'afternoon', 'night') if (slot, 'sys') in bins}
 
     # --- PERIOD (MONTH/YEAR) DATA TABLES ---
     @commands.command(name='data_month', help='Shows monthly blood pressure data table. Usage: !data_month <MM-YY>')
@@ -294,7 +294,7 @@ class DataCommands(commands.Cog):
         embed.add_field(
             name="Statistics",
             value=(
-                "`!total` - Estadísticas mensuales por franjas horarias\n"
+                "`!total [MM-YY] [MM-YY]` - Estadísticas mensuales por franjas horarias\n"
                 "`!stats` - Alias para !total\n"
                 "`!estadisticas` - Alias en español\n"
             ),
@@ -306,79 +306,17 @@ class DataCommands(commands.Cog):
     # --- PERIOD DATA TABLE HELPER ---
     async def _generate_period_data_table(self, ctx, period_type: str, period_str: str, slot: str = None):
         """Helper function to generate period data tables (month/year)"""
-        df = load_data()
-
-        if df.empty:
-            await ctx.send("📊 No records.")
-            return
-
         try:
-            if period_type == 'month':
-                # Expecting MM-YY format
-                month, year_short = period_str.split('-')
-                year_full = f"20{year_short}" if len(year_short) == 2 else year_short
-                period_filter = f"{year_full}-{month.zfill(2)}"
-                df_period = df[df['day'].dt.strftime('%Y-%m') == period_filter].copy()
-                title_period = f"{month}/{year_short}"
-            else:  # year
-                year_short = period_str
-                year_full = f"20{year_short}" if len(year_short) == 2 else year_short
-                period_filter = int(year_full)
-                df_period = df[df['day'].dt.year == period_filter].copy()
-                title_period = year_short
-
-            if df_period.empty:
-                await ctx.send(f"📊 No records for **{title_period}**")
-                return
-
-            if slot:
-                df_period = df_period[df_period['time_slot'] == slot].copy()
-                if df_period.empty:
-                    await ctx.send(f"📊 No **{self.slot_display[slot]}** records for **{title_period}**")
-                    return
-
-            # Calculate daily averages
-            df_daily = df_period.groupby('day')[['systolic', 'diastolic']].mean().round(1).reset_index()
-            df_daily = df_daily.sort_values('day', ascending=True)
-
-            if df_daily.empty:
-                await ctx.send(f"📊 No data to display for **{title_period}**")
+            # Expecting MM-YY (month) or YY (year) format
+            start, end, title_period = parse_period(period_type, period_str)
+
+            pages = await self._cached_pages(
+                ctx, ('data_period', period_type, start, end, slot),
+                lambda: self._period_table_pages(ctx, period_type, start, end, title_period, slot))
+            if pages is None:
+                await ctx.send("❌ Error loading data.")
                 return
-
-            # Calculate overall average
-            avg_sys = df_daily['systolic'].mean().round(1)
-            avg_dia = df_daily['diastolic'].mean().round(1)
-
-            # Create table
-            table_data = []
-            period_display = {'month': 'Month', 'year': 'Year'}
-            table_data.append(f"📋 **Blood Pressure Data - {period_display[period_type]} {title_period}**")
-            if slot:
-                table_data.append(f"**Time Slot:** {self.slot_display[slot]}")
-
-            table_data.append("```")
-            table_data.append(f"{'Date':<12} {'Systolic':<10} {'Diastolic':<10}")
-            table_data.append("-" * 35)
-
-            for _, row in df_daily.iterrows():
-                date_str = row['day'].strftime('%d-%m-%y')
-                table_data.append(f"{date_str:<12} {row['systolic']:<10} {row['diastolic']:<10}")
-
-            table_data.append("-" * 35)
-            table_data.append(f"{'AVERAGE':<12} {avg_sys:<10} {avg_dia:<10}")
-            table_data.append("```")
-
-            message = '\n'.join(table_data)
-            if len(message) > 2000:
-                short_message = (
-                    f"📋 **{period_display[period_type]} Blood Pressure Data - {title_period}**\n"
-                    f"{'Time Slot: ' + self.slot_display[slot] if slot else ''}\n"
-                    f"**Overall Average:** {avg_sys}/{avg_dia} mmHg\n"
-                    f"**Days with data:** {len(df_daily)}"
-                )
-                await ctx.send(short_message)
-            else:
-                await ctx.send(message)
+            await tables.send_pages(ctx, pages)
 
         except ValueError:
             if period_type == 'month':
@@ -389,6 +327,21 @@ class DataCommands(commands.Cog):
             await ctx.send("❌ Error generating data table.")
             logger.error(f"Error generating {period_type} data table: {e}")
 
+    async def _period_table_pages(self, ctx, period_type, start, end, title_period, slot):
+        """The !data_month / !data_year message pages for [start, end], or None if the data could not be read."""
+        # Daily averages are sliced from the user's in-memory readings for the requested period only
+        daily = await run_read(store.daily, tenant_of(ctx), start, end, slot)
+
+        if daily is None:
+            return None
+        if daily.empty:
+            if slot:
+                return (f"📊 No **{self.slot_display[slot]}** records for **{title_period}**",)
+            return (f"📊 No records for **{title_period}**",)
+        period_display = {'month': 'Month', 'year': 'Year'}
+        return self._daily_table(f"📋 **Blood Pressure Data - {period_display[period_type]} {title_period}**",
+                                 daily, slot)
+
 
 async def setup(bot):
     await bot.add_cog(DataCommands(bot))
\ No newline at end of file
@@ -2,14 +2,14 @@
 
 import discord
 from discord.ext import commands
-from datetime import timedelta
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 import io
-import numpy as np
 
-from db import load_data
-from utils import get_local_time, logger
+from async_db import run_read
+from charts import ChartSpec, RenderQueueFull, render
+import graph_cache
+import metrics
+from series_store import store
+from utils import days_window, get_local_time, parse_period, tenant_of, logger
 
 
 class GraphCommands(commands.Cog):
@@ -17,48 +17,20 @@ class GraphCommands(commands.Cog):
         self.bot = bot
         self.slot_display = {'morning': 'Morning', 'afternoon': 'Afternoon', 'night': 'Night'}
         self.slot_short = {'morning': 'm', 'afternoon': 'a', 'night': 'n'}
-        self.color_sys = '#FF6B6B'
-        self.color_dia = '#4ECDC4'
-        self.reference_color = '#FF4444'  # Color rojo para las líneas de referencia
 
     # --- GENERAL GRAPH (N DAYS) ---
     @commands.command(name='graph', help='Shows blood pressure trend for last N days. Usage: !graph <days>')
     async def daily_graph(self, ctx, days: int = 30):
-        df = load_data()
+        start, end = days_window(days), get_local_time().date()
+        title = f'Blood Pressure Trend - Last {days} Days (Daily Averages)'
 
-        if df.empty:
-            await ctx.send("📊 No records to generate a graph.")
-            return
-
-        cutoff_date = get_local_time() - timedelta(days=days)
-        cutoff_date_np = np.datetime64(cutoff_date)
-
-        df_filtered = df[df['day'] >= cutoff_date_np].copy()
-
-        if df_filtered.empty:
-            await ctx.send(f"📊 No records in the last {days} days.")
-            return
-
-        try:
-            # CALCULAR PROMEDIOS DIARIOS
-            df_daily = df_filtered.groupby('day')[['systolic', 'diastolic']].mean().reset_index()
-            df_daily = df_daily.sort_values('day')
-
-            fig, ax = plt.subplots(figsize=(12, 6))
-
-            # Plot promedios diarios en lugar de datos individuales
-            ax.plot(df_daily['day'], df_daily['systolic'], marker='o', linestyle='-',
-                    label='Systolic', alpha=0.8, color=self.color_sys, linewidth=2.5, markersize=6)
-            ax.plot(df_daily['day'], df_daily['diastolic'], marker='s', linestyle='-',
-                    label='Diastolic', alpha=0.8, color=self.color_dia, linewidth=2.5, markersize=6)
-
-            # AÑADIR LÍNEAS DE REFERENCIA
-            ax.axhline(y=140, color=self.reference_color, linestyle='--', alpha=0.7, linewidth=1)
-            ax.axhline(y=90, color=self.reference_color, linestyle='--', alpha=0.7, linewidth=1)
-
-            # Format x-axis
-            date_format = mdates.DateFormatter('%d %b')
-            ax.xaxis.set_major_formatter(date_format)
+        async def build():
+            # PROMEDIOS DIARIOS desde los arrays en memoria del usuario
+            daily = await run_read(store.daily, tenant_of(ctx), start, end)
+            if daily is None:
+                return "❌ Error loading data."
+            if daily.empty:
+                return f"📊 No records in the last {days} days."
 
             # Ajustar intervalo basado en número de días
             if days <= 7:
@@ -68,31 +40,50 @@ class GraphCommands(commands.Cog):
             else:
                 interval = max(1, days // 15)
 
-            ax.xaxis.set_major_locator(mdates.DayLocator(interval=interval))
-
-            ax.set_title(f'Blood Pressure Trend - Last {days} Days (Daily Averages)', fontsize=14, fontweight='bold')
-            ax.set_xlabel('Date')
-            ax.set_ylabel('Pressure (mmHg)')
-            ax.legend()
-            ax.grid(False)  # Grid desactivado
-            ax.tick_params(axis='x', rotation=45)
-
-            plt.tight_layout()
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-            buffer.seek(0)
-            plt.close(fig)
-
-            await ctx.send(
-                f"📈 **Blood Pressure Trend - Last {days} Days**\n"
-                f"Showing daily averages ({len(df_daily)} days with data)",
-                file=discord.File(buffer, filename=f"bp_graph_{days}days.png")
+            # Plot promedios diarios en lugar de datos individuales
+            spec = ChartSpec(
+                title=title,
+                days=daily.dates(),
+                systolic=daily.systolic.tolist(),
+                diastolic=daily.diastolic.tolist(),
+                interval=interval,
+                alpha=0.8,
+                tight_bbox=True,
             )
+            return spec, (f"📈 **Blood Pressure Trend - Last {days} Days**\n"
+                          f"Showing daily averages ({len(daily)} days with data)")
 
+        try:
+            await self._send_chart(ctx, 'graph', start, end, None, title, f"bp_graph_{days}days.png", build)
+        except RenderQueueFull:
+            await ctx.send("⏳ **Too many graphs are being generated.** Please try again in a moment.")
         except Exception as e:
             await ctx.send("❌ Error generating graph.")
             logger.error(f"Error generating graph: {e}")
 
+    async def _send_chart(self, ctx, command, start, end, slot, title, filename, build):
+        """Sends the author's chart of `command` over [start, end], rendering it only on a cache miss.
+
+        The cache is checked before `build()` runs, so a hit reads no data at all. build() reads the data
+        and returns (spec, caption), or a message to send instead of a chart (no data, load errors).
+        """
+        tenant = tenant_of(ctx)
+        key = graph_cache.make_key(tenant, command, start, end, slot, title)
+        version = graph_cache.cache.version(tenant)
+        entry = await graph_cache.get(tenant, key, start, end)
+        if entry is None:
+            built = await build()
+            if isinstance(built, str):
+                await ctx.send(built)
+                return
+            spec, caption = built
+            png = await render(spec)
+            await graph_cache.put(tenant, key, start, end, png, caption, version)
+        else:
+            png, caption = entry
+        metrics.inc('upload_bytes_total', len(png), kind='graph')
+        await ctx.send(caption, file=discord.File(io.BytesIO(png), filename=filename))
+
     # --- SLOT-SPECIFIC GRAPH (N DAYS) HANDLERS ---
     @commands.command(name='graph_m', help='Morning blood pressure trend for last N days. Usage: !graph_m <days>',
                       hidden=True)
@@ -111,58 +102,33 @@ class GraphCommands(commands.Cog):
 
     # --- SLOT-SPECIFIC GRAPH (N DAYS) HELPER ---
     async def _generate_slot_graph_days(self, ctx, slot: str, days: int):
-        df = load_data()
-
-        if df.empty:
-            await ctx.send("📊 No records.")
-            return
+        start, end = days_window(days), get_local_time().date()
+        title = f"Blood Pressure - {self.slot_display[slot]} Slot ({days} Days)"
 
-        cutoff_date = get_local_time() - timedelta(days=days)
-        cutoff_date_np = np.datetime64(cutoff_date)
-        df_filtered = df[df['day'] >= cutoff_date_np].copy()
-        df_slot = df_filtered[df_filtered['time_slot'] == slot].copy()
-
-        if df_slot.empty:
-            await ctx.send(f"📊 No **{self.slot_display[slot]}** records in the last {days} days.")
-            return
-
-        try:
-            fig, ax = plt.subplots(figsize=(12, 6))
+        async def build():
+            readings = await run_read(store.readings, tenant_of(ctx), start, end, slot)
+            if readings is None:
+                return "❌ Error loading data."
+            if readings.empty:
+                return f"📊 No **{self.slot_display[slot]}** records in the last {days} days."
 
             # Para gráficos específicos por slot, mostramos los datos individuales
-            ax.plot(df_slot['day'], df_slot['systolic'], marker='o', linestyle='-',
-                    label='Systolic', alpha=0.8, color=self.color_sys, linewidth=2.5, markersize=6)
-            ax.plot(df_slot['day'], df_slot['diastolic'], marker='s', linestyle='-',
-                    label='Diastolic', alpha=0.8, color=self.color_dia, linewidth=2.5, markersize=6)
-
-            # AÑADIR LÍNEAS DE REFERENCIA
-            ax.axhline(y=140, color=self.reference_color, linestyle='--', alpha=0.7, linewidth=1)
-            ax.axhline(y=90, color=self.reference_color, linestyle='--', alpha=0.7, linewidth=1)
-
-            ax.set_title(f"Blood Pressure - {self.slot_display[slot]} Slot ({days} Days)", fontsize=14,
-                         fontweight='bold')
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Pressure (mmHg)")
-            ax.legend()
-            ax.grid(False)  # Grid desactivado
-            ax.tick_params(axis='x', rotation=45)
-
-            date_format = mdates.DateFormatter('%d %b')
-            ax.xaxis.set_major_formatter(date_format)
-            ax.xaxis.set_major_locator(mdates.DayLocator(interval=max(1, days // 10)))
-
-            plt.tight_layout()
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=150)
-            buffer.seek(0)
-            plt.close(fig)
-
-            await ctx.send(
-                f"📈 **{self.slot_display[slot]} Blood Pressure - Last {days} Days**\n"
-                f"Showing individual readings",
-                file=discord.File(buffer, filename=f"bp_{self.slot_short[slot]}_{days}days.png")
+            spec = ChartSpec(
+                title=title,
+                days=readings.dates(),
+                systolic=readings.systolic.tolist(),
+                diastolic=readings.diastolic.tolist(),
+                interval=max(1, days // 10),
+                alpha=0.8,
             )
+            return spec, (f"📈 **{self.slot_display[slot]} Blood Pressure - Last {days} Days**\n"
+                          f"Showing individual readings")
 
+        try:
+            await self._send_chart(ctx, 'graph_slot', start, end, slot, title,
+                                   f"bp_{self.slot_short[slot]}_{days}days.png", build)
+        except RenderQueueFull:
+            await ctx.send("⏳ **Too many graphs are being generated.** Please try again in a moment.")
         except Exception as e:
             await ctx.send(f"❌ Error generating {slot} graph.")
             logger.error(f"Error generating {slot} graph: {e}")
@@ -254,91 +220,53 @@ class GraphCommands(commands.Cog):
     # --- PERIOD GRAPH HELPER ---
     async def _generate_period_graph(self, ctx, period_type: str, period_str: str, slot: str = None):
         """Helper function to generate period graphs (month/year)"""
-        df = load_data()
-
-        if df.empty:
-            await ctx.send("📊 No records.")
-            return
-
         try:
+            # Expecting MM-YY (month) or YY (year) format
+            start, end, title_period = parse_period(period_type, period_str)
+        except ValueError:
             if period_type == 'month':
-                # Expecting MM-YY format
-                month, year_short = period_str.split('-')
-                year_full = f"20{year_short}" if len(year_short) == 2 else year_short
-                period_filter = f"{year_full}-{month.zfill(2)}"
-                df_period = df[df['day'].dt.strftime('%Y-%m') == period_filter].copy()
-                title_period = f"{month}/{year_short}"
-            else:  # year
-                year_short = period_str
-                year_full = f"20{year_short}" if len(year_short) == 2 else year_short
-                period_filter = int(year_full)
-                df_period = df[df['day'].dt.year == period_filter].copy()
-                title_period = year_short
-
-            if df_period.empty:
-                await ctx.send(f"📊 No records for **{title_period}**")
-                return
-
-            if slot:
-                df_period = df_period[df_period['time_slot'] == slot].copy()
-                if df_period.empty:
-                    await ctx.send(f"📊 No **{self.slot_display[slot]}** records for **{title_period}**")
-                    return
-
-            # Calculate daily averages
-            df_daily = df_period.groupby('day')[['systolic', 'diastolic']].mean().reset_index()
-
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.plot(df_daily['day'], df_daily['systolic'], marker='o', label='Systolic',
-                    color=self.color_sys, linewidth=2.5, markersize=6)
-            ax.plot(df_daily['day'], df_daily['diastolic'], marker='s', label='Diastolic',
-                    color=self.color_dia, linewidth=2.5, markersize=6)
-
-            # AÑADIR LÍNEAS DE REFERENCIA
-            ax.axhline(y=140, color=self.reference_color, linestyle='--', alpha=0.7, linewidth=1)
-            ax.axhline(y=90, color=self.reference_color, linestyle='--', alpha=0.7, linewidth=1)
+                await ctx.send("❌ **Invalid month format.** Use `MM-YY` (e.g., 12-24)")
+            else:
+                await ctx.send("❌ **Invalid year format.** Use `YY` (e.g., 24)")
+            return
 
-            # Title construction
-            title_slot = f" - {self.slot_display[slot]}" if slot else ""
-            title = f"Blood Pressure Trend{title_slot} ({title_period})"
+        # Title construction
+        title_slot = f" - {self.slot_display[slot]}" if slot else ""
+        title = f"Blood Pressure Trend{title_slot} ({title_period})"
 
-            ax.set_title(title, fontsize=14, fontweight='bold')
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Pressure (mmHg)")
-            ax.legend()
-            ax.grid(False)  # Grid desactivado
-            ax.tick_params(axis='x', rotation=45)
+        async def build():
+            # Daily averages are sliced from the user's in-memory readings for the requested period only
+            daily = await run_read(store.daily, tenant_of(ctx), start, end, slot)
+            if daily is None:
+                return "❌ Error loading data."
+            if daily.empty:
+                if slot:
+                    return f"📊 No **{self.slot_display[slot]}** records for **{title_period}**"
+                return f"📊 No records for **{title_period}**"
 
             # Format x-axis based on period
             if period_type == 'month':
-                date_format = mdates.DateFormatter('%d %b')
-                ax.xaxis.set_major_formatter(date_format)
-                ax.xaxis.set_major_locator(mdates.DayLocator(interval=2))
+                axis_format = {'date_format': '%d %b', 'locator': 'day', 'interval': 2}
             else:  # year
-                date_format = mdates.DateFormatter('%b')
-                ax.xaxis.set_major_formatter(date_format)
-                ax.xaxis.set_major_locator(mdates.MonthLocator())
-
-            plt.tight_layout()
-
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format='png', dpi=150)
-            buffer.seek(0)
-            plt.close(fig)
-
-            period_type_display = {'month': 'Month', 'year': 'Year'}
-            slot_suffix = f"_{self.slot_short[slot]}" if slot else ""
-            await ctx.send(
-                f"📈 **Blood Pressure - {period_type_display[period_type]} {title_period}{title_slot}**\n"
-                f"Showing daily averages",
-                file=discord.File(buffer, filename=f"bp_{period_type}{slot_suffix}_{period_str.replace('-', '')}.png")
+                axis_format = {'date_format': '%b', 'locator': 'month'}
+
+            spec = ChartSpec(
+                title=title,
+                days=daily.dates(),
+                systolic=daily.systolic.tolist(),
+                diastolic=daily.diastolic.tolist(),
+                **axis_format,
             )
+            period_type_display = {'month': 'Month', 'year': 'Year'}
+            return spec, (f"📈 **Blood Pressure - {period_type_display[period_type]} {title_period}{title_slot}**\n"
+                          f"Showing daily averages")
 
-        except ValueError:
-            if period_type == 'month':
-                await ctx.send("❌ **Invalid month format.** Use `MM-YY` (e.g., 12-24)")
-            else:
-                await ctx.send("❌ **Invalid year format.** Use `YY` (e.g., 24)")
+        slot_suffix = f"_{self.slot_short[slot]}" if slot else ""
+        try:
+            await self._send_chart(ctx, f'graph_{period_type}', start, end, slot, title,
+                                   f"bp_{period_type}{slot_suffix}_{period_str.replace('-', '')}.png", build)
+        except RenderQueueFull:
+            await ctx.send("⏳ **Too many graphs are being generated.** Please try again in a moment.")
         except Exception as e:
             await ctx.send("❌ Error generating graph.")
             logger.error(f"Error generating {period_type} graph: {e}")
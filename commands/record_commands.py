@@ -5,10 +5,94 @@ from discord.ext import commands
 from datetime import datetime
 import asyncio
 import io
-import pandas as pd
 
-from db import save_data, load_data, delete_last_record, get_record, update_data
-from utils import get_local_time, logger
+from async_db import (save_data, insert_records, delete_record, undo_last, get_record, update_data, history_page,
+                      run_read)
+from config import EXPORT_PART_MB, IMPORT_MAX_MB
+from exporter import FORMATS, export_records, parquet_available
+from importer import CsvImport, MAX_REPORTED_ERRORS
+import metrics
+import tables
+from utils import get_local_time, parse_flexible_date, tenant_of, logger
+
+
+MAX_LAST = 40  # Longest !last that fits in one message
+HISTORY_PAGE_SIZE = 10
+SLOT_SHORT = {'morning': 'm', 'afternoon': 'a', 'night': 'n'}
+UNDO_TITLES = {
+    'delete': "↩️ **Restored deleted record:**",
+    'edit': "↩️ **Edit undone, record back to:**",
+    'import': "↩️ **Import undone**",
+    'kept': "↩️ **Change undone, nothing restored:**",
+}
+
+
+def _history_lines(rows):
+    """Formats (id, day, time_slot, systolic, diastolic, record_date) rows as bullet lines."""
+    _, days, slots, systolic, diastolic, _ = zip(*rows)
+    return tables.concat("• **", tables.format_days(days, '/'), "** (", [SLOT_SHORT.get(slot, '?') for slot in slots],
+                         "): **", tables.format_int(systolic), "/", tables.format_int(diastolic), "** mmHg").tolist()
+
+
+class HistoryView(discord.ui.View):
+    """Pages through a user's records with Newer/Older buttons, one keyset query per page."""
+
+    def __init__(self, author_id, tenant, page_size=HISTORY_PAGE_SIZE):
+        super().__init__(timeout=180)
+        self.author_id = author_id
+        self.tenant = tenant
+        self.page_size = page_size
+        self.rows = []
+        self.page = 1
+        self.message = None
+
+    async def load(self, before=None, after=None, step=0):
+        """Loads a page and returns its message text ("" if it's empty, None on error), updating the buttons."""
+        result = await history_page(self.tenant, self.page_size, before, after)
+        if result is None:
+            return None
+        rows, more = result
+        if not rows:
+            return ""
+        self.rows = rows
+        self.page += step
+        # Coming from one side means the other side has at least the page just left
+        self.older.disabled = not (more if after is None else True)
+        self.newer.disabled = not (more if after is not None else before is not None)
+        return '\n'.join([f"📜 **History - page {self.page}:**\n", *_history_lines(rows)])
+
+    @staticmethod
+    def _cursor(row):
+        return row[5], row[0]
+
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.author_id
+
+    async def _turn(self, interaction, step, **cursor):
+        content = await self.load(step=step, **cursor)
+        if not content:
+            await interaction.response.send_message(
+                "❌ Error loading records. Please try again." if content is None else "📝 No more records.",
+                ephemeral=True)
+            return
+        await interaction.response.edit_message(content=content, view=self)
+
+    @discord.ui.button(label='◀ Newer', style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction, button):
+        await self._turn(interaction, -1, after=self._cursor(self.rows[0]))
+
+    @discord.ui.button(label='Older ▶', style=discord.ButtonStyle.secondary)
+    async def older(self, interaction, button):
+        await self._turn(interaction, 1, before=self._cursor(self.rows[-1]))
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
 
 
 class RecordCommands(commands.Cog):
@@ -38,17 +122,18 @@ class RecordCommands(commands.Cog):
                 date_str = " ".join(date)
                 try:
                     # Permitir fechas con un solo dígito (ej: 2-11-25 en lugar de 02-11-25)
-                    day = self._parse_flexible_date(date_str)
+                    day = parse_flexible_date(date_str)
                 except ValueError:
                     await ctx.send("❌ **Invalid date format.** Use `dd-mm-yy` (e.g., 25-12-24 or 2-12-24)")
                     return
 
             full_slot = self.slot_map[slot]
-            success = save_data(day, full_slot, systolic, diastolic)
+            result = await save_data(tenant_of(ctx), day, full_slot, systolic, diastolic)
 
-            if not success:
+            if result is None:
                 await ctx.send("❌ **Error saving record.** Please try again.")
                 return
+            _, sample, previous = result
 
             # Value evaluation
             if systolic >= 180 or diastolic >= 120:
@@ -72,66 +157,43 @@ class RecordCommands(commands.Cog):
                 f"⏰ Time Slot: **{self.slot_display[slot]}**\n"
                 f"💓 Blood Pressure: **{systolic}/{diastolic}** mmHg\n"
                 f"{evaluation}"
+                + (f"\n🔄 Replaced the previous **{previous[0]}/{previous[1]}** mmHg for this slot "
+                   f"(`!undo` restores it)." if previous else "")
+                + (f"\n🔢 Reading #{sample + 1} for this slot." if sample else "")
             )
         except Exception as e:
             await ctx.send(f"❌ **Unexpected error:** {e}")
             logger.error(f"Error in register command: {e}")
 
-    def _parse_flexible_date(self, date_str):
-        """Parse dates with flexible formatting (allows single-digit days/months)"""
-        try:
-            # Primero intentar con el formato estándar
-            return datetime.strptime(date_str, '%d-%m-%y')
-        except ValueError:
-            # Si falla, intentar con formato flexible
-            parts = date_str.split('-')
-            if len(parts) == 3:
-                day, month, year = parts
-                # Añadir ceros a la izquierda si es necesario
-                day = day.zfill(2)
-                month = month.zfill(2)
-                # Asegurar formato de año de 2 dígitos
-                if len(year) == 2:
-                    year = year
-                elif len(year) == 4:
-                    year = year[2:]
-                else:
-                    raise ValueError("Invalid year format")
-
-                normalized_date = f"{day}-{month}-{year}"
-                return datetime.strptime(normalized_date, '%d-%m-%y')
-            else:
-                raise ValueError("Invalid date format")
-
     # --- SHOW LAST RECORDS ---
     @commands.command(name='last', help='Show last records. Usage: !last [count]')
     async def show_last(self, ctx, count: int = 5):
-        df = load_data()
+        count = max(1, min(count, MAX_LAST))
+        # Newest first, straight from the record_date index
+        page = await history_page(tenant_of(ctx), count)
 
-        if df.empty:
+        if page is None:
+            await ctx.send("❌ Error loading records. Please try again.")
+            return
+        rows, _ = page
+        if not rows:
             await ctx.send("📝 No records.")
             return
 
-        # Sort by record_date (timestamp) for true last record order
-        df_last = df.sort_values('record_date', ascending=True).head(count)
-        df_last['day_str'] = df_last['day'].dt.strftime('%d/%m/%y')
+        await ctx.send('\n'.join([f"📝 **Last {len(rows)} records:**\n", *_history_lines(rows)]))
 
-        if df_last.empty:
-            await ctx.send("📝 No records found.")
+    # --- HISTORY COMMAND ---
+    @commands.command(name='history', help='Browse all your records, newest first, with page buttons.')
+    async def show_history(self, ctx):
+        view = HistoryView(ctx.author.id, tenant_of(ctx))
+        content = await view.load()
+        if content is None:
+            await ctx.send("❌ Error loading records. Please try again.")
             return
-
-        output = [f"📝 **Last {len(df_last)} records:**\n"]
-        for index, row in df_last.iterrows():
-            slot_short = {'morning': 'm', 'afternoon': 'a', 'night': 'n'}
-            slot_s = slot_short.get(row['time_slot'], '?')
-
-            # Mostrar información de fecha y hora en lugar de ID
-            record_time = pd.to_datetime(row['record_date']).strftime('%H:%M')
-            output.append(
-                f"• **{row['day_str']}** ({slot_s}): **{row['systolic']}/{row['diastolic']}** mmHg"
-            )
-
-        await ctx.send('\n'.join(output))
+        if not view.rows:
+            await ctx.send("📝 No records.")
+            return
+        view.message = await ctx.send(content, view=view)
 
     # --- EDIT COMMAND ---
     @commands.command(name='edit', help='Edits a record. Usage: !edit <systolic> <diastolic> <slot> <dd-mm-yy>')
@@ -148,26 +210,24 @@ class RecordCommands(commands.Cog):
 
             try:
                 # Usar el parser flexible de fechas
-                parsed_date = self._parse_flexible_date(date_str)
+                parsed_date = parse_flexible_date(date_str)
                 day_str = parsed_date.strftime('%d-%m-%y')  # Normalizar a formato estándar
             except ValueError:
                 await ctx.send("❌ **Invalid date format.** Use `dd-mm-yy` (e.g., 25-12-24 or 2-12-24).")
                 return
 
             full_slot = self.slot_map[slot]
-            old_record = get_record(day_str, full_slot)
+            current = await get_record(tenant_of(ctx), parsed_date, full_slot)
 
-            if not old_record:
+            if not current:
                 await ctx.send(
                     f"❌ **Record not found.** No record exists for date **{day_str}** in time slot **{self.slot_display[slot]}**.")
                 return
 
-            old_sys, old_dia = old_record
-
             confirm_message = (
                 f"⚠️ **CONFIRMATION REQUIRED** ⚠️\n"
                 f"Are you sure you want to **EDIT** this record?\n"
-                f"**Current Record:** {day_str} ({slot}): **{old_sys}/{old_dia}** mmHg\n"
+                f"**Current Record:** {day_str} ({slot}): **{current[0]}/{current[1]}** mmHg\n"
                 f"**New Values:** {day_str} ({slot}): **{systolic}/{diastolic}** mmHg\n"
                 f"React with ✅ to confirm the edit. (30 seconds)"
             )
@@ -184,15 +244,25 @@ class RecordCommands(commands.Cog):
                 await ctx.send("❌ Timeout expired. Record was **NOT** edited.")
                 return
 
-            if update_data(day_str, full_slot, systolic, diastolic):
+            # The update returns the values it overwrote, which a write since the preview may have changed
+            previous = await update_data(tenant_of(ctx), parsed_date, full_slot, systolic, diastolic)
+
+            if previous is None:
                 await ctx.send(
-                    f"✅ **RECORD SUCCESSFULLY EDITED**\n"
-                    f"📅 Day: **{day_str}**\n"
-                    f"⏰ Time Slot: **{self.slot_display[slot]}**\n"
-                    f"🔄 Changed from **{old_sys}/{old_dia}** to **{systolic}/{diastolic}** mmHg."
-                )
-            else:
+                    f"❌ **Record not found.** No record exists for date **{day_str}** in time slot **{self.slot_display[slot]}**.")
+                return
+            if previous is False:
                 await ctx.send("❌ Error updating record.")
+                return
+
+            old_sys, old_dia = previous
+            await ctx.send(
+                f"✅ **RECORD SUCCESSFULLY EDITED**\n"
+                f"📅 Day: **{day_str}**\n"
+                f"⏰ Time Slot: **{self.slot_display[slot]}**\n"
+                f"🔄 Changed from **{old_sys}/{old_dia}** to **{systolic}/{diastolic}** mmHg.\n"
+                f"Use `!undo` to revert it."
+            )
 
         except Exception as e:
             await ctx.send(f"❌ **Unexpected error:** {e}")
@@ -201,21 +271,22 @@ class RecordCommands(commands.Cog):
     # --- DELETE COMMAND ---
     @commands.command(name='delete', help='Deletes the last recorded blood pressure entry.')
     async def delete_last_command(self, ctx):
-        df = load_data()
-        if df.empty:
+        # The latest record by record_date, from the index in one query; exactly this row is deleted
+        page = await history_page(tenant_of(ctx), 1)
+        if page is None:
+            await ctx.send("❌ Error loading records. Please try again.")
+            return
+        if not page[0]:
             await ctx.send("❌ **No records found** to delete.")
             return
 
-        # Get the actual last record by record_date
-        last_record = df.sort_values('record_date', ascending=True).iloc[0]
-
-        slot_short = {'morning': 'm', 'afternoon': 'a', 'night': 'n'}
-        slot_s = slot_short.get(last_record['time_slot'], '?')
+        last_record = page[0][0]
+        record_text = _history_lines([last_record])[0][2:]
 
         confirm_message = (
             f"⚠️ **CONFIRMATION REQUIRED** ⚠️\n"
             f"Are you sure you want to **DELETE** your **LAST** record?\n"
-            f"**Record to delete:** {last_record['day'].strftime('%d-%m-%y')} ({slot_s}): **{last_record['systolic']}/{last_record['diastolic']}** mmHg\n"
+            f"**Record to delete:** {record_text}\n"
             f"React with ✅ to confirm deletion. (30 seconds)"
         )
 
@@ -231,56 +302,190 @@ class RecordCommands(commands.Cog):
             await ctx.send("❌ Timeout expired. Record was **NOT** deleted.")
             return
 
-        if delete_last_record():
+        if await delete_record(tenant_of(ctx), last_record[0]):
             await ctx.send(
                 f"🗑️ **SUCCESSFULLY DELETED** the last record:\n"
-                f"{last_record['day'].strftime('%d-%m-%y')} ({slot_s}): **{last_record['systolic']}/{last_record['diastolic']}** mmHg"
+                f"{record_text}\n"
+                f"Use `!undo` to restore it."
             )
         else:
             await ctx.send("❌ Error trying to delete record. Please try again.")
 
-    # --- EXPORT COMMAND ---
-    @commands.command(name='export', help='Export data to CSV. Usage: !export')
-    async def export_data(self, ctx):
-        df = load_data()
-
-        if df.empty:
-            await ctx.send("📁 No data to export.")
+    # --- UNDO COMMAND ---
+    @commands.command(name='undo', help='Restores the records changed by your last !delete, !edit or !import.')
+    async def undo(self, ctx):
+        result = await undo_last(tenant_of(ctx))
+        if result is False:
+            await ctx.send("❌ Error undoing the last change. Please try again.")
+            return
+        if result is None:
+            await ctx.send("ℹ️ Nothing to undo.")
             return
 
-        try:
-            export_df = df.copy()
-            export_df['Date'] = export_df['day'].dt.strftime('%d-%m-%y')
-            export_df['Time_of_Record'] = pd.to_datetime(export_df['record_date']).dt.strftime('%H:%M:%S')
+        action, rows, moved, removed, kept = result
+        lines = _history_lines([(None, *row, None) for row in rows]) if rows else []
+        if kept:
+            # Under the replace policy a restored reading would have displaced the one registered since
+            lines += ["⏭️ **Not restored**, the slot has been registered again since and keeps its newer reading "
+                      "(use `!edit` to change it):", *_history_lines([(None, *row, None) for row in kept])]
+        header = []
+        if action == 'import':
+            header.append(f"🗑️ Removed **{removed}** imported readings.")
+            if rows:
+                header.append("Readings it overwrote are back:")
+        footer = []
+        if moved:
+            footer.append("🔢 That slot has been registered again since, so the newer reading was kept too and "
+                          "the restored one was added as another reading of the slot.")
+        # An undone import can restore thousands of readings, so the list is paged
+        title = UNDO_TITLES.get(action, UNDO_TITLES['edit']) if rows or action == 'import' else UNDO_TITLES['kept']
+        await tables.send_pages(ctx, tables.paginate(title, lines, header=header, footer=footer))
+        logger.info(f"↩️ Undo ({action}) by {ctx.author}")
+
+    # --- EXPORT COMMAND ---
+    @commands.command(name='export',
+                      help='Export data. Usage: !export [csv|parquet] [gz] [m|a|n] [from dd-mm-yy] [to dd-mm-yy]')
+    async def export_data(self, ctx, *options):
+        fmt, compress, slot, dates = 'csv', False, None, []
+        for option in options:
+            option = option.lower()
+            if option in FORMATS:
+                fmt = option
+            elif option in ('gz', 'gzip'):
+                compress = True
+            elif option in self.slot_map:
+                slot = self.slot_map[option]
+            else:
+                try:
+                    dates.append(parse_flexible_date(option))
+                except ValueError:
+                    await ctx.send(f"❌ **Unknown option `{option}`.** "
+                                   f"Usage: `!export [csv|parquet] [gz] [m|a|n] [from dd-mm-yy] [to dd-mm-yy]`")
+                    return
 
-            # Map full slot names to short codes
-            slot_map_short = {'morning': 'm', 'afternoon': 'a', 'night': 'n'}
-            export_df['Time_Slot'] = export_df['time_slot'].map(slot_map_short)
+        if len(dates) > 2:
+            await ctx.send("❌ **Too many dates.** Give a start date and optionally an end date.")
+            return
+        if fmt == 'parquet' and not parquet_available():
+            await ctx.send("❌ **Parquet export is not available** on this bot. Use `!export csv` instead.")
+            return
 
-            export_df = export_df[['Date', 'Time_Slot', 'systolic', 'diastolic', 'Time_of_Record']]
-            export_df.columns = ['Date', 'Time_Slot', 'Systolic', 'Diastolic', 'Time_of_Record']
+        start_day = dates[0] if dates else None
+        end_day = dates[1] if len(dates) > 1 else None
+        # Parts stay under both the configured size and this server's upload limit
+        part_bytes = EXPORT_PART_MB * 1024 * 1024
+        if ctx.guild is not None:
+            part_bytes = min(part_bytes, ctx.guild.filesize_limit)
 
-            buffer = io.StringIO()
-            export_df.to_csv(buffer, index=False)
-            buffer.seek(0)
+        try:
+            # Rows stream from a reader connection into spooled temp files, one chunk at a time
+            export = await run_read(export_records, tenant_of(ctx),
+                                    f"blood_pressure_export_{datetime.now().strftime('%Y%m%d')}",
+                                    fmt, compress, start_day, end_day, slot, part_bytes)
+        except Exception as e:
+            await ctx.send("❌ Error exporting data. Check logs for details.")
+            logger.error(f"Error exporting data: {e}")
+            return
 
-            file = discord.File(
-                io.BytesIO(buffer.getvalue().encode('utf-8')),
-                filename=f"blood_pressure_export_{datetime.now().strftime('%Y%m%d')}.csv"
-            )
+        try:
+            if not export.rows:
+                await ctx.send("📁 No data to export.")
+                return
 
-            await ctx.send(
+            first_day = datetime.strptime(export.first_day, '%Y-%m-%d').strftime('%d-%m-%y')
+            last_day = datetime.strptime(export.last_day, '%Y-%m-%d').strftime('%d-%m-%y')
+            summary = (
                 f"📁 **Data Export**\n"
-                f"📊 Records: **{len(export_df)}**\n"
-                f"📅 Period: **{export_df['Date'].min()}** to **{export_df['Date'].max()}**",
-                file=file
+                f"📊 Records: **{export.rows}**\n"
+                f"📅 Period: **{first_day}** to **{last_day}**"
             )
+            for number, (filename, file) in enumerate(export.parts, start=1):
+                if len(export.parts) > 1:
+                    text = summary if number == 1 else ''
+                    text += f"\n🧩 Part **{number}/{len(export.parts)}**"
+                else:
+                    text = summary
+                metrics.inc('upload_bytes_total', file.seek(0, io.SEEK_END), kind='export')
+                file.seek(0)
+                await ctx.send(text, file=discord.File(file, filename=filename))
 
-            logger.info("📁 Data exported")
+            logger.info(f"📁 Data exported - Rows: {export.rows}, Files: {len(export.parts)}")
 
         except Exception as e:
             await ctx.send("❌ Error exporting data. Check logs for details.")
             logger.error(f"Error exporting data: {e}")
+        finally:
+            export.close()
+
+    # --- IMPORT COMMAND ---
+    @commands.command(name='import',
+                      help='Imports readings from a CSV in the !export format. Usage: !import (attach the file)')
+    async def import_data(self, ctx):
+        if not ctx.message.attachments:
+            await ctx.send("📥 **Attach a CSV file** with the same columns `!export` produces.")
+            return
+
+        attachment = ctx.message.attachments[0]
+        if not attachment.filename.lower().endswith('.csv'):
+            await ctx.send("❌ **Invalid file.** Please attach a `.csv` file.")
+            return
+
+        # Checked before downloading: the whole file is read into memory
+        if attachment.size > IMPORT_MAX_MB * 1024 * 1024:
+            await ctx.send(f"❌ **File too large.** Imports are limited to {IMPORT_MAX_MB} MB; split the CSV "
+                           f"into smaller files.")
+            return
+
+        try:
+            data = await attachment.read()
+            # Parsing and validation run off the event loop, one batch at a time
+            csv_import = await asyncio.to_thread(CsvImport, data)
+        except ValueError as e:
+            await ctx.send(f"❌ **Invalid CSV:** {e}")
+            return
+        except Exception as e:
+            await ctx.send("❌ Error reading the attachment. Please try again.")
+            logger.error(f"Error reading import attachment: {e}")
+            return
+
+        await ctx.send(f"📥 Importing **{attachment.filename}**...")
+
+        tenant = tenant_of(ctx)
+        accepted = 0
+        while True:
+            try:
+                batch = await asyncio.to_thread(csv_import.next_batch)
+            except Exception as e:
+                # Earlier batches are already saved, so the summary below still reports them
+                logger.error(f"Error reading import rows: {e}")
+                csv_import.stopped = (None, "the file could not be read")
+                break
+            if not batch:
+                break
+            # Each batch is one transaction; other users' writes can run in between
+            inserted = await insert_records(tenant, batch)
+            if inserted is None:
+                await ctx.send(f"❌ Error saving readings. Import stopped after **{accepted}** rows.")
+                return
+            accepted += inserted
+
+        if csv_import.stopped:
+            line, reason = csv_import.stopped
+            where = f" at line {line}" if line else ""
+            status = f"⚠️ **Import stopped{where} after {accepted} rows** ({reason}); the rest of the file was skipped"
+        else:
+            status = "✅ **Import finished**"
+        output = [
+            status,
+            f"📊 Accepted: **{accepted}**",
+            f"🚫 Rejected: **{csv_import.rejected}**",
+        ]
+        if csv_import.errors:
+            output.append(f"First {min(csv_import.rejected, MAX_REPORTED_ERRORS)} rejected rows:")
+            output.extend(f"• Line {line}: {reason}" for line, reason in csv_import.errors)
+
+        await ctx.send('\n'.join(output))
+        logger.info(f"📥 Data imported - Accepted: {accepted}, Rejected: {csv_import.rejected}")
 
 
 async def setup(bot):
@@ -0,0 +1,156 @@
+# commands/schedule_commands.py
+
+from discord.ext import commands
+import math
+
+import pytz
+
+import analytics
+from async_db import get_record, run_read
+from config import TIMEZONE, REMINDER_GRACE_MINUTES
+from scheduler import scheduler, parse_time
+from utils import tenant_of, logger
+
+REMINDER = 'reminder'
+WEEKLY_SUMMARY = 'weekly_summary'
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+class ScheduleCommands(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.slot_map = {'m': 'morning', 'a': 'afternoon', 'n': 'night'}
+        scheduler.register(REMINDER, self._send_reminder, misfire_grace=REMINDER_GRACE_MINUTES * 60)
+        scheduler.register(WEEKLY_SUMMARY, self._send_weekly_summary)
+
+    async def _channel(self, job):
+        channel = self.bot.get_channel(job.channel_id)
+        if channel is None:
+            channel = await self.bot.fetch_channel(job.channel_id)
+        return channel
+
+    def _timezone(self, ctx, timezone):
+        """The requested timezone, else the one of the user's other jobs, else the bot's. None if unknown."""
+        if timezone is None:
+            jobs = scheduler.jobs_of(tenant_of(ctx))
+            return jobs[0].timezone if jobs else TIMEZONE
+        try:
+            return pytz.timezone(timezone).zone
+        except pytz.UnknownTimeZoneError:
+            return None
+
+    # --- JOB HANDLERS ---
+    async def _send_reminder(self, job):
+        """Reminds the user to measure, unless that slot already has a reading today."""
+        today = job.local_time(job.last_run).date()
+        if await get_record(job.tenant, today, job.key):
+            return
+        channel = await self._channel(job)
+        await channel.send(f"⏰ <@{job.tenant[1]}>, time to measure your **{job.key}** blood pressure! "
+                           f"Use `!register <sys> <dia> {job.key[0]}`.")
+
+    async def _send_weekly_summary(self, job):
+        """Posts the 7-day average and its change from the week before."""
+        today = job.local_time(job.last_run).date()
+        report = await run_read(analytics.engine.report, job.tenant, today, (7,))
+        if report is None:
+            raise LookupError("analytics unavailable")
+        current, previous = report[7]
+
+        channel = await self._channel(job)
+        if current is None:
+            await channel.send(f"📅 <@{job.tenant[1]}>, no readings this week. Remember to measure!")
+            return
+        message = (f"📅 **Weekly summary** for <@{job.tenant[1]}>: average **{current.mean[0]:.1f}/"
+                   f"{current.mean[1]:.1f}** mmHg over {current.days} days ({current.readings} readings)")
+        if previous is not None and not any(math.isnan(v) for v in previous.mean):
+            change = current.mean - previous.mean
+            message += f", {change[0]:+.1f}/{change[1]:+.1f} vs the week before"
+        await channel.send(message + ".")
+
+    # --- REMINDER COMMAND ---
+    @commands.command(name='remind',
+                      help='Daily reminder to measure a slot. Usage: !remind <m|a|n> <HH:MM> [timezone] or '
+                           '!remind <m|a|n> off')
+    async def remind(self, ctx, slot: str, when: str, timezone: str = None):
+        slot = slot.lower()
+        if slot not in self.slot_map:
+            await ctx.send("❌ **Invalid time slot.** Use `m` (morning), `a` (afternoon), or `n` (night).")
+            return
+
+        if when.lower() == 'off':
+            removed = await scheduler.cancel(REMINDER, tenant_of(ctx), self.slot_map[slot])
+            await ctx.send("🔕 Reminder removed." if removed else "ℹ️ No reminder set for that slot.")
+            return
+
+        try:
+            at_time = parse_time(when)
+        except ValueError:
+            await ctx.send("❌ **Invalid time.** Use `HH:MM` (e.g. 08:30).")
+            return
+        timezone = self._timezone(ctx, timezone)
+        if timezone is None:
+            await ctx.send("❌ **Unknown timezone.** Use a name like `Europe/Madrid` or `America/New_York`.")
+            return
+
+        job = await scheduler.schedule(REMINDER, tenant_of(ctx), at_time, timezone, key=self.slot_map[slot],
+                                       channel_id=ctx.channel.id)
+        if job is None:
+            await ctx.send("❌ **Error saving reminder.** Please try again.")
+            return
+        await ctx.send(f"⏰ I'll remind you to measure your **{job.key}** blood pressure every day at "
+                       f"**{at_time}** ({timezone}), unless you've already registered it.")
+        logger.info(f"⏰ Reminder set - Slot: {job.key}, Time: {at_time} {timezone}")
+
+    # --- WEEKLY SUMMARY COMMAND ---
+    @commands.command(name='summary',
+                      help='Weekly average summary. Usage: !summary <mon..sun> <HH:MM> [timezone] or !summary off')
+    async def summary(self, ctx, day: str, when: str = None, timezone: str = None):
+        if day.lower() == 'off':
+            removed = await scheduler.cancel(WEEKLY_SUMMARY, tenant_of(ctx))
+            await ctx.send("🔕 Weekly summary removed." if removed else "ℹ️ No weekly summary set.")
+            return
+
+        weekday = day.lower()[:3]
+        if weekday not in WEEKDAYS or when is None:
+            await ctx.send("❌ **Usage:** `!summary <mon..sun> <HH:MM> [timezone]` (e.g. `!summary sun 20:00`).")
+            return
+        try:
+            at_time = parse_time(when)
+        except ValueError:
+            await ctx.send("❌ **Invalid time.** Use `HH:MM` (e.g. 20:00).")
+            return
+        timezone = self._timezone(ctx, timezone)
+        if timezone is None:
+            await ctx.send("❌ **Unknown timezone.** Use a name like `Europe/Madrid` or `America/New_York`.")
+            return
+
+        job = await scheduler.schedule(WEEKLY_SUMMARY, tenant_of(ctx), at_time, timezone,
+                                       weekday=WEEKDAYS.index(weekday), channel_id=ctx.channel.id)
+        if job is None:
+            await ctx.send("❌ **Error saving weekly summary.** Please try again.")
+            return
+        await ctx.send(f"📅 Weekly summary set for every **{weekday.capitalize()}** at **{at_time}** ({timezone}).")
+        logger.info(f"📅 Weekly summary set - Day: {weekday}, Time: {at_time} {timezone}")
+
+    # --- SCHEDULE LIST COMMAND ---
+    @commands.command(name='schedule', help='Lists your reminders and weekly summary.')
+    async def show_schedule(self, ctx):
+        jobs = scheduler.jobs_of(tenant_of(ctx))
+        if not jobs:
+            await ctx.send("📭 No reminders set. Use `!remind` or `!summary`.")
+            return
+
+        lines = ["⏰ **Your Schedule**", "```"]
+        for job in jobs:
+            what = f"Reminder ({job.key})" if job.kind == REMINDER else "Weekly summary"
+            when = job.at_time if job.weekday is None else f"{WEEKDAYS[job.weekday].capitalize()} {job.at_time}"
+            lines.append(f"{what:<22} {when:<10} next: {job.local_time(job.next_run).strftime('%d-%m-%y %H:%M')}")
+        lines.append("```")
+        lines.append(f"Times are in {jobs[0].timezone}." if len({job.timezone for job in jobs}) == 1 else
+                     "Times are in each job's own timezone.")
+        await ctx.send('\n'.join(lines))
+
+
+async def setup(bot):
+    await bot.add_cog(ScheduleCommands(bot))
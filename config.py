@@ -11,4 +11,197 @@ except (TypeError, ValueError):
 
 DB_NAME = 'blood_pressure.db'
 TIMEZONE = 'Europe/Madrid'
-LOG_FILE = 'PA.log'
\ No newline at end of file
+LOG_FILE = 'PA.log'
+
+# --- LOGGING ---
+# 'size' rotates at LOG_MAX_MB, 'time' at midnight; rotated files are gzipped. LOG_FORMAT is 'text' or 'json'
+LOG_ROTATION = os.getenv('LOG_ROTATION', 'size')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+
+try:
+    LOG_MAX_MB = int(os.getenv('LOG_MAX_MB', 10))
+except ValueError:
+    LOG_MAX_MB = 10
+
+try:
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 7))
+except ValueError:
+    LOG_BACKUP_COUNT = 7
+
+# --- CHART RENDERING ---
+# Worker processes rendering graphs, and how many renders may be queued before new requests are refused
+try:
+    RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', os.cpu_count() or 2))
+except ValueError:
+    RENDER_WORKERS = os.cpu_count() or 2
+
+try:
+    RENDER_QUEUE_LIMIT = int(os.getenv('RENDER_QUEUE_LIMIT', 32))
+except ValueError:
+    RENDER_QUEUE_LIMIT = 32
+
+# Colors of the palette charts are reduced to before encoding (smaller, lossy PNGs); 0 keeps full color
+try:
+    CHART_PALETTE_COLORS = min(int(os.getenv('CHART_PALETTE_COLORS', 0)), 256)
+except ValueError:
+    CHART_PALETTE_COLORS = 0
+
+# --- GRAPH CACHE ---
+# Rendered PNGs are kept in memory (LRU) and, if GRAPH_CACHE_DIR is set, on disk up to GRAPH_CACHE_DISK_MB
+GRAPH_CACHE_DIR = os.getenv('GRAPH_CACHE_DIR', '')
+
+try:
+    GRAPH_CACHE_MEMORY_MB = int(os.getenv('GRAPH_CACHE_MEMORY_MB', 64))
+except ValueError:
+    GRAPH_CACHE_MEMORY_MB = 64
+
+try:
+    GRAPH_CACHE_DISK_MB = int(os.getenv('GRAPH_CACHE_DISK_MB', 256))
+except ValueError:
+    GRAPH_CACHE_DISK_MB = 256
+
+# --- SERIES STORE ---
+# Memory budget for the per-user reading arrays the graph and data commands slice (LRU)
+try:
+    SERIES_CACHE_MB = int(os.getenv('SERIES_CACHE_MB', 32))
+except ValueError:
+    SERIES_CACHE_MB = 32
+
+# --- AGGREGATE CACHE ---
+# Data tables and statistics kept per user until their data changes, at most AGGREGATE_CACHE_TTL seconds
+try:
+    AGGREGATE_CACHE_ENTRIES = int(os.getenv('AGGREGATE_CACHE_ENTRIES', 1024))
+except ValueError:
+    AGGREGATE_CACHE_ENTRIES = 1024
+
+try:
+    AGGREGATE_CACHE_TTL = int(os.getenv('AGGREGATE_CACHE_TTL', 3600))
+except ValueError:
+    AGGREGATE_CACHE_TTL = 3600
+
+# --- DATABASE CONNECTIONS ---
+# Read connections kept open next to the single writer, and per-connection SQLite memory tuning
+try:
+    DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', 4))
+except ValueError:
+    DB_READ_POOL_SIZE = 4
+
+try:
+    DB_MMAP_MB = int(os.getenv('DB_MMAP_MB', 256))
+except ValueError:
+    DB_MMAP_MB = 256
+
+try:
+    DB_CACHE_MB = int(os.getenv('DB_CACHE_MB', 16))
+except ValueError:
+    DB_CACHE_MB = 16
+
+# --- BACKUPS ---
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'backup')
+
+# Newest backup kept per day, ISO week and month
+try:
+    BACKUP_KEEP_DAILY = int(os.getenv('BACKUP_KEEP_DAILY', 7))
+except ValueError:
+    BACKUP_KEEP_DAILY = 7
+
+try:
+    BACKUP_KEEP_WEEKLY = int(os.getenv('BACKUP_KEEP_WEEKLY', 4))
+except ValueError:
+    BACKUP_KEEP_WEEKLY = 4
+
+try:
+    BACKUP_KEEP_MONTHLY = int(os.getenv('BACKUP_KEEP_MONTHLY', 12))
+except ValueError:
+    BACKUP_KEEP_MONTHLY = 12
+
+# Local time (TIMEZONE) of the daily backup
+BACKUP_TIME = os.getenv('BACKUP_TIME', '03:00')
+
+# --- EXPORT ---
+# Largest file !export attaches; bigger exports are split into parts (capped by the server's upload limit)
+try:
+    EXPORT_PART_MB = int(os.getenv('EXPORT_PART_MB', 8))
+except ValueError:
+    EXPORT_PART_MB = 8
+
+# --- IMPORT ---
+# Largest CSV attachment !import accepts; the file is held in memory while it is parsed
+try:
+    IMPORT_MAX_MB = int(os.getenv('IMPORT_MAX_MB', 8))
+except ValueError:
+    IMPORT_MAX_MB = 8
+
+# --- METRICS ---
+# Prometheus text endpoint at http://METRICS_HOST:METRICS_PORT/metrics; 0 disables it
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+try:
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+except ValueError:
+    METRICS_PORT = 0
+
+# --- ALERTS ---
+# A user is alerted when the mean of their last ALERT_WINDOW_DAYS daily averages (with at least ALERT_MIN_DAYS
+# days of data) is above ALERT_HIGH_SYS or ALERT_HIGH_DIA, or below both ALERT_LOW_SYS and ALERT_LOW_DIA.
+# An unchanged alert is repeated at most every ALERT_REPEAT_HOURS
+try:
+    ALERT_HIGH_SYS = int(os.getenv('ALERT_HIGH_SYS', 135))
+except ValueError:
+    ALERT_HIGH_SYS = 135
+
+try:
+    ALERT_HIGH_DIA = int(os.getenv('ALERT_HIGH_DIA', 85))
+except ValueError:
+    ALERT_HIGH_DIA = 85
+
+try:
+    ALERT_LOW_SYS = int(os.getenv('ALERT_LOW_SYS', 90))
+except ValueError:
+    ALERT_LOW_SYS = 90
+
+try:
+    ALERT_LOW_DIA = int(os.getenv('ALERT_LOW_DIA', 60))
+except ValueError:
+    ALERT_LOW_DIA = 60
+
+try:
+    ALERT_WINDOW_DAYS = int(os.getenv('ALERT_WINDOW_DAYS', 10))
+except ValueError:
+    ALERT_WINDOW_DAYS = 10
+
+try:
+    ALERT_MIN_DAYS = int(os.getenv('ALERT_MIN_DAYS', 5))
+except ValueError:
+    ALERT_MIN_DAYS = 5
+
+try:
+    ALERT_REPEAT_HOURS = int(os.getenv('ALERT_REPEAT_HOURS', 24))
+except ValueError:
+    ALERT_REPEAT_HOURS = 24
+
+# Local time (TIMEZONE) of the daily re-check of every user's alert window
+ALERT_CHECK_TIME = os.getenv('ALERT_CHECK_TIME', '08:00')
+
+# --- SCHEDULER ---
+# A measurement reminder more than this late (e.g. the bot was down) is skipped instead of sent
+try:
+    REMINDER_GRACE_MINUTES = int(os.getenv('REMINDER_GRACE_MINUTES', 60))
+except ValueError:
+    REMINDER_GRACE_MINUTES = 60
+
+# --- READINGS ---
+# 'replace': one reading per day and slot, registering again overwrites it; 'samples': every reading is kept
+SLOT_POLICY = os.getenv('SLOT_POLICY', 'replace')
+
+# --- TENANTS ---
+# Readings stored before per-user storage existed are assigned to this Discord guild/user on upgrade
+try:
+    LEGACY_GUILD_ID = int(os.getenv('LEGACY_GUILD_ID', 0))
+except ValueError:
+    LEGACY_GUILD_ID = 0
+
+try:
+    LEGACY_USER_ID = int(os.getenv('LEGACY_USER_ID', 0))
+except ValueError:
+    LEGACY_USER_ID = 0
@@ -1,176 +1,1050 @@
+import json
 import sqlite3
 import pandas as pd
-from datetime import datetime
-import shutil
-import os
-from config import DB_NAME
+from contextlib import contextmanager
+import queue
+import threading
+import time
+import metrics
+from config import (DB_NAME, DB_READ_POOL_SIZE, DB_MMAP_MB, DB_CACHE_MB, LEGACY_GUILD_ID, LEGACY_USER_ID,
+                    SLOT_POLICY)
 from utils import logger, get_local_time
 
+AGGREGATIONS = ('raw', 'daily', 'monthly_count')
+
+# 'day' is stored as an ISO 'yyyy-mm-dd' string so it sorts chronologically and range scans can use an index
+DAY_FORMAT = '%Y-%m-%d'
+
+
+def day_key(day):
+    """Converts a date/datetime into the stored 'day' value."""
+    return day.strftime(DAY_FORMAT)
+
+
+# --- CONNECTIONS ---
+_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",  # Readers never block the writer (and vice versa)
+    "PRAGMA synchronous = NORMAL",  # Durable at checkpoints; no fsync on every commit in WAL mode
+    f"PRAGMA mmap_size = {DB_MMAP_MB * 1024 * 1024}",
+    f"PRAGMA cache_size = -{DB_CACHE_MB * 1024}",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+
+class ConnectionManager:
+    """A long-lived writer connection plus a small pool of read connections to one database file.
+
+    Connections stay open, so each call skips connection setup and schema parsing, and SQLite's
+    per-connection statement cache reuses the prepared statements of the fixed SQL strings below.
+    """
+
+    def __init__(self, path, readers=DB_READ_POOL_SIZE):
+        self.path = path
+        self.readers = max(1, readers)
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._pool = queue.LifoQueue()
+        self._opened = 0
+        self._pool_lock = threading.Lock()
+
+    def _connect(self):
+        # Autocommit mode: transactions are opened explicitly by write()
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def exclusive(self):
+        """Yields the writer connection outside any transaction, with all other writes held off."""
+        start = time.perf_counter()
+        with self._write_lock:
+            metrics.observe('db_write_wait_seconds', time.perf_counter() - start)
+            if self._writer is None:
+                self._writer = self._connect()
+            yield self._writer
+
+    @contextmanager
+    def write(self):
+        """Yields the writer connection inside a BEGIN IMMEDIATE ... COMMIT transaction."""
+        with self.exclusive() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @contextmanager
+    def read(self):
+        """Yields a pooled read connection, opening a new one while fewer than `readers` exist."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._opened < self.readers
+                if can_open:
+                    self._opened += 1
+            conn = self._connect() if can_open else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self._opened = 0
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def connections():
+    """Returns the ConnectionManager for the current DB_NAME, replacing it if DB_NAME changed."""
+    global _manager
+    with _manager_lock:
+        if _manager is None or _manager.path != DB_NAME:
+            if _manager is not None:
+                _manager.close()
+            _manager = ConnectionManager(DB_NAME)
+        return _manager
+
+
+def close_connections():
+    """Closes every pooled connection (used on shutdown)."""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
+
+
+# --- WRITE LISTENERS ---
+_write_listeners = []
+
+
+def add_write_listener(callback):
+    """Registers callback(tenant, days) to run after every committed write; days is a set of ISO day strings."""
+    _write_listeners.append(callback)
+
+
+_generations = {}  # tenant -> writes committed since startup
+
+
+def generation(tenant):
+    """A counter that every committed write of the tenant bumps; equal values mean unchanged data."""
+    return _generations.get(tuple(tenant), 0)
+
+
+def _notify_write(tenant, days):
+    tenant = tuple(tenant)
+    for callback in _write_listeners:
+        try:
+            callback(tenant, days)
+        except Exception as e:
+            logger.warning(f"⚠️ Write listener failed: {e}")
+    # Bumped only once the listeners (e.g. the series store) have dropped their old data, so a build that
+    # reads the new generation can't be served stale arrays. Only the writer thread bumps, so it can't race
+    _generations[tenant] = _generations.get(tenant, 0) + 1
+
+
+# --- UNDO JOURNAL ---
+UNDO_DEPTH = 20  # Operations per tenant that !undo can step back through
+
+
+def _journal(conn, tenant, action, where, params, op=None, created=False):
+    """Copies the tenant's records matching `where` into undo_journal as one operation, before they change.
+
+    Pass the `op` an earlier call returned to add to the same operation. With `created`, the rows are
+    readings the operation added: they are journaled without pressures and !undo deletes them.
+    Runs inside the caller's write transaction; operations beyond UNDO_DEPTH are dropped. Returns the op.
+    """
+    if op is None:
+        op = conn.execute("SELECT COALESCE(MAX(op), 0) + 1 FROM undo_journal WHERE guild_id = ? AND user_id = ?",
+                          tenant).fetchone()[0]
+        conn.execute("DELETE FROM undo_journal WHERE guild_id = ? AND user_id = ? AND op <= ?",
+                     (*tenant, op - UNDO_DEPTH))
+    pressures = "NULL, NULL" if created else "systolic, diastolic"
+    conn.execute(
+        f"INSERT INTO undo_journal (guild_id, user_id, op, action, record_id, day, time_slot, sample, systolic, "
+        f"diastolic, record_date) SELECT guild_id, user_id, ?, ?, id, day, time_slot, sample, {pressures}, "
+        f"record_date "
+        f"FROM records WHERE guild_id = ? AND user_id = ? AND {where}", (op, action, *tenant, *params))
+    return op
+
+
+# --- SCHEMA MIGRATIONS ---
+def _migrate_iso_day(cursor):
+    """v1: rewrites 'dd-mm-yy' days as ISO dates and indexes (day, time_slot)."""
+    cursor.execute(
+        "UPDATE records SET day = '20' || substr(day, 7, 2) || '-' || substr(day, 4, 2) || '-' || substr(day, 1, 2) "
+        "WHERE day GLOB '[0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_records_iso_day")
+    # Covering index: range scans, daily means and (day, slot) lookups never touch the table itself
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_records_day_slot ON records (day, time_slot, systolic, diastolic)"
+    )
+
+
+def _stats_sql(keys):
+    """Builds the daily_stats maintenance SQL for a given key (e.g. ('day', 'time_slot')).
+
+    Returns (add, remove, rebuild): trigger bodies adding/removing one reading's contribution
+    to its row, and an INSERT ... SELECT recomputing every row from records.
+    """
+    columns = ', '.join(keys)
+    match_old = ' AND '.join(f"{key} = OLD.{key}" for key in keys)
+    add = f"""
+        INSERT INTO daily_stats ({columns}, readings, sum_sys, sum_dia, sumsq_sys, sumsq_dia)
+        VALUES ({', '.join(f'NEW.{key}' for key in keys)}, 1, NEW.systolic, NEW.diastolic,
+                NEW.systolic * NEW.systolic, NEW.diastolic * NEW.diastolic)
+        ON CONFLICT ({columns}) DO UPDATE SET
+            readings = readings + 1,
+            sum_sys = sum_sys + excluded.sum_sys,
+            sum_dia = sum_dia + excluded.sum_dia,
+            sumsq_sys = sumsq_sys + excluded.sumsq_sys,
+            sumsq_dia = sumsq_dia + excluded.sumsq_dia;
+    """
+    # The row is dropped once its day/slot has no readings left
+    remove = f"""
+        UPDATE daily_stats SET
+            readings = readings - 1,
+            sum_sys = sum_sys - OLD.systolic,
+            sum_dia = sum_dia - OLD.diastolic,
+            sumsq_sys = sumsq_sys - OLD.systolic * OLD.systolic,
+            sumsq_dia = sumsq_dia - OLD.diastolic * OLD.diastolic
+        WHERE {match_old};
+        DELETE FROM daily_stats WHERE {match_old} AND readings <= 0;
+    """
+    rebuild = f"""
+        INSERT INTO daily_stats ({columns}, readings, sum_sys, sum_dia, sumsq_sys, sumsq_dia)
+        SELECT {columns}, COUNT(*), SUM(systolic), SUM(diastolic),
+               SUM(systolic * systolic), SUM(diastolic * diastolic)
+        FROM records GROUP BY {columns}
+    """
+    return add, remove, rebuild
+
+
+def _create_daily_stats(cursor, keys, key_types):
+    """Creates daily_stats keyed on `keys`, its triggers on records, and backfills it."""
+    add, remove, rebuild = _stats_sql(keys)
+    key_columns = ''.join(f"{key} {key_type},\n" for key, key_type in zip(keys, key_types))
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            {key_columns}
+            readings INTEGER NOT NULL,
+            sum_sys INTEGER NOT NULL,
+            sum_dia INTEGER NOT NULL,
+            sumsq_sys INTEGER NOT NULL,
+            sumsq_dia INTEGER NOT NULL,
+            PRIMARY KEY ({', '.join(keys)})
+        ) WITHOUT ROWID
+    ''')
+    # Triggers run inside the writing statement's transaction, so the aggregates can never drift
+    # from the raw rows whichever function (or manual SQL) changed them
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_records_insert_stats AFTER INSERT ON records "
+                   f"BEGIN {add} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_records_delete_stats AFTER DELETE ON records "
+                   f"BEGIN {remove} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_records_update_stats "
+                   f"AFTER UPDATE OF {', '.join(keys)}, systolic, diastolic ON records "
+                   f"BEGIN {remove} {add} END")
+    cursor.execute("DELETE FROM daily_stats")
+    cursor.execute(rebuild)
+
+
+# Current daily_stats key and its rebuild statement
+_STATS_KEYS = ('guild_id', 'user_id', 'day', 'time_slot')
+_STATS_REBUILD = _stats_sql(_STATS_KEYS)[2]
+
+
+def _migrate_daily_stats(cursor):
+    """v2: adds the daily_stats aggregate table, kept in sync with records by triggers."""
+    _create_daily_stats(cursor, ('day', 'time_slot'), ('TEXT', 'TEXT'))
+
+
+def _migrate_tenants(cursor):
+    """v3: scopes every reading to a (guild_id, user_id) tenant and re-keys indexes and daily_stats on it.
+
+    Refuses (raising RuntimeError, so nothing changes) to hand existing readings to user 0: no Discord
+    user has that id, so the history would be unreachable.
+    """
+    if not LEGACY_USER_ID and cursor.execute("SELECT EXISTS (SELECT 1 FROM records)").fetchone()[0]:
+        raise RuntimeError("existing readings need an owner: set LEGACY_USER_ID (and LEGACY_GUILD_ID) before "
+                           "upgrading this database")
+    for trigger in ('trg_records_insert_stats', 'trg_records_delete_stats', 'trg_records_update_stats'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS daily_stats")
+
+    cursor.execute("ALTER TABLE records ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE records ADD COLUMN user_id INTEGER NOT NULL DEFAULT 0")
+    # Readings recorded before tenants existed are handed to the configured legacy owner
+    cursor.execute("UPDATE records SET guild_id = ?, user_id = ?", (LEGACY_GUILD_ID, LEGACY_USER_ID))
+
+    cursor.execute("DROP INDEX IF EXISTS idx_records_day_slot")
+    # Every per-user query leads on the tenant, so its cost doesn't depend on how many other users exist
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_records_tenant_day "
+        "ON records (guild_id, user_id, day, time_slot, systolic, diastolic)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_records_tenant_recorded ON records (guild_id, user_id, record_date)"
+    )
+
+    _create_daily_stats(cursor, _STATS_KEYS, ('INTEGER', 'INTEGER', 'TEXT', 'TEXT'))
+
+
+def _migrate_scheduled_jobs(cursor):
+    """v4: adds scheduled_jobs, the persisted reminders, summaries and maintenance jobs of scheduler.py."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            user_id INTEGER NOT NULL DEFAULT 0,
+            job_key TEXT NOT NULL DEFAULT '',
+            channel_id INTEGER,
+            timezone TEXT NOT NULL,
+            at_time TEXT NOT NULL,
+            weekday INTEGER,
+            next_run INTEGER NOT NULL,
+            last_run INTEGER,
+            UNIQUE (kind, guild_id, user_id, job_key)
+        )
+    ''')
+
+
+def _migrate_undo_journal(cursor):
+    """v5: adds undo_journal, the previous versions of deleted and edited readings that !undo restores."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS undo_journal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            op INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            record_id INTEGER NOT NULL,
+            day TEXT,
+            time_slot TEXT,
+            systolic INTEGER,
+            diastolic INTEGER,
+            record_date TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_undo_journal_tenant_op ON undo_journal (guild_id, user_id, op)")
+
+
+def _migrate_slot_samples(cursor):
+    """v6: numbers the readings of each (tenant, day, slot) as samples and makes that key unique.
+
+    Existing duplicates are kept as samples 1, 2, ... in the order they were recorded.
+    """
+    cursor.execute("ALTER TABLE records ADD COLUMN sample INTEGER NOT NULL DEFAULT 0")
+    cursor.execute(
+        "UPDATE records SET sample = numbered.sample FROM ("
+        "    SELECT id, ROW_NUMBER() OVER (PARTITION BY guild_id, user_id, day, time_slot "
+        "                                  ORDER BY record_date, id) - 1 AS sample FROM records"
+        ") AS numbered WHERE records.id = numbered.id AND numbered.sample > 0"
+    )
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_records_tenant_slot_sample "
+        "ON records (guild_id, user_id, day, time_slot, sample)"
+    )
+    cursor.execute("ALTER TABLE undo_journal ADD COLUMN sample INTEGER NOT NULL DEFAULT 0")
+
+
+def _histogram_sql():
+    """Builds the pressure_histogram maintenance SQL, as _stats_sql does for daily_stats.
+
+    Returns (add, remove, rebuild): trigger bodies counting one reading's systolic and diastolic value
+    in its (tenant, month, slot) histogram or taking them out, and an INSERT ... SELECT recounting every bin.
+    """
+    columns = "guild_id, user_id, month, time_slot, measure, value"
+    add = f"""
+        INSERT INTO pressure_histogram ({columns}, readings)
+        VALUES (NEW.guild_id, NEW.user_id, substr(NEW.day, 1, 7), NEW.time_slot, 'sys', NEW.systolic, 1),
+               (NEW.guild_id, NEW.user_id, substr(NEW.day, 1, 7), NEW.time_slot, 'dia', NEW.diastolic, 1)
+        ON CONFLICT ({columns}) DO UPDATE SET readings = readings + 1;
+    """
+    match_old = ("guild_id = OLD.guild_id AND user_id = OLD.user_id AND month = substr(OLD.day, 1, 7) "
+                 "AND time_slot = OLD.time_slot")
+    # Bins are dropped once no reading has their value
+    remove = f"""
+        UPDATE pressure_histogram SET readings = readings - 1
+        WHERE {match_old} AND measure = 'sys' AND value = OLD.systolic;
+        UPDATE pressure_histogram SET readings = readings - 1
+        WHERE {match_old} AND measure = 'dia' AND value = OLD.diastolic;
+        DELETE FROM pressure_histogram WHERE {match_old} AND readings <= 0;
+    """
+    rebuild = f"""
+        INSERT INTO pressure_histogram ({columns}, readings)
+        SELECT guild_id, user_id, substr(day, 1, 7), time_slot, 'sys', systolic, COUNT(*) FROM records
+        GROUP BY guild_id, user_id, substr(day, 1, 7), time_slot, systolic
+        UNION ALL
+        SELECT guild_id, user_id, substr(day, 1, 7), time_slot, 'dia', diastolic, COUNT(*) FROM records
+        GROUP BY guild_id, user_id, substr(day, 1, 7), time_slot, diastolic
+    """
+    return add, remove, rebuild
+
+
+_HISTOGRAM_REBUILD = _histogram_sql()[2]
+
+
+def _migrate_pressure_histogram(cursor):
+    """v7: adds pressure_histogram, per (tenant, month, slot) counts of each systolic and diastolic value.
+
+    !total's percentiles over any range of months are read from it, without touching the readings.
+    """
+    add, remove, rebuild = _histogram_sql()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pressure_histogram (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            time_slot TEXT NOT NULL,
+            measure TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            readings INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, user_id, month, time_slot, measure, value)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_records_insert_histogram AFTER INSERT ON records "
+                   f"BEGIN {add} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_records_delete_histogram AFTER DELETE ON records "
+                   f"BEGIN {remove} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS trg_records_update_histogram "
+                   f"AFTER UPDATE OF guild_id, user_id, day, time_slot, systolic, diastolic ON records "
+                   f"BEGIN {remove} {add} END")
+    cursor.execute(rebuild)
+
+
+# Index i upgrades the schema from user_version i to i + 1
+_MIGRATIONS = [_migrate_iso_day, _migrate_daily_stats, _migrate_tenants, _migrate_scheduled_jobs,
+               _migrate_undo_journal, _migrate_slot_samples, _migrate_pressure_histogram]
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+
+def _migrate(manager):
+    """Applies pending schema migrations, each in its own transaction."""
+    with manager.read() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, migration in enumerate(_MIGRATIONS[version:], start=version + 1):
+        with manager.write() as conn:
+            migration(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {target}")
+        logger.info(f"🔧 Database migrated to schema v{target}")
+
 
 # --- DATABASE FUNCTIONS ---
 def setup_db():
-    """Initializes the database structure."""
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                day TEXT,
-                time_slot TEXT,
-                systolic INTEGER,
-                diastolic INTEGER,
-                record_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    """Initializes the database structure. Returns True on success, False if it failed (e.g. a refused migration)."""
+    try:
+        manager = connections()
+        with manager.write() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    day TEXT,
+                    time_slot TEXT,
+                    systolic INTEGER,
+                    diastolic INTEGER,
+                    record_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        _migrate(manager)
         logger.info("✅ Database initialized successfully")
+        return True
     except Exception as e:
         logger.error(f"❌ Error initializing database: {e}")
+        return False
+
+
+@metrics.timed('db_duration_seconds', operation='load_data')
+def load_data(tenant):
+    """Loads all of a tenant's data into DataFrame."""
+    return query_records(tenant)
+
+
+@metrics.timed('db_duration_seconds', operation='query_records')
+def query_records(tenant, start=None, end=None, slot=None, aggregation='raw', order_by='day', descending=False,
+                  limit=None):
+    """Loads only the rows a command needs, filtering and grouping in SQL.
+
+    tenant is a (guild_id, user_id) pair, start/end are inclusive dates (or datetimes) and slot is a full
+    slot name. aggregation is one of 'raw' (one row per reading), 'daily' (daily mean per day) or
+    'monthly_count' (readings per month and slot).
+    """
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation: {aggregation}")
 
+    conditions = ["guild_id = ?", "user_id = ?"]
+    params = list(tenant)
+    if start is not None:
+        conditions.append("day >= ?")
+        params.append(day_key(start))
+    if end is not None:
+        conditions.append("day <= ?")
+        params.append(day_key(end))
+    if slot is not None:
+        conditions.append("time_slot = ?")
+        params.append(slot)
+    where = f"WHERE {' AND '.join(conditions)}"
+    direction = "DESC" if descending else "ASC"
+
+    if aggregation == 'raw':
+        order = f"day {direction}, record_date {direction}" if order_by == 'day' else \
+            f"record_date {direction}, id {direction}"
+        sql = (f"SELECT id, day, time_slot, systolic, diastolic, record_date "
+               f"FROM records {where} ORDER BY {order}")
+    elif aggregation == 'daily':
+        # Read from the maintained aggregates: one row per day and slot instead of one per reading
+        sql = (f"SELECT day, CAST(SUM(sum_sys) AS REAL) / SUM(readings) AS systolic, "
+               f"CAST(SUM(sum_dia) AS REAL) / SUM(readings) AS diastolic, SUM(readings) AS readings "
+               f"FROM daily_stats {where} GROUP BY day ORDER BY day {direction}")
+    else:  # monthly_count
+        sql = (f"SELECT substr(day, 1, 7) AS month, time_slot, SUM(readings) AS readings "
+               f"FROM daily_stats {where} GROUP BY 1, 2 ORDER BY 1 {direction}, 2")
+
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
 
-def load_data():
-    """Loads all data into DataFrame."""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        df = pd.read_sql_query("SELECT * FROM records ORDER BY day, record_date", conn)
-        conn.close()
+        with connections().read() as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
 
-        if not df.empty:
-            # Convert 'day' column from 'dd-mm-yy' string format to datetime object
-            df['day'] = pd.to_datetime(df['day'], format='%d-%m-%y', errors='coerce')
+        if not df.empty and 'day' in df.columns:
+            # Malformed legacy days fail to parse and are dropped, as load_data always did
+            df['day'] = pd.to_datetime(df['day'], format=DAY_FORMAT, errors='coerce')
             df = df.dropna(subset=['day'])
-            df[['systolic', 'diastolic']] = df[['systolic', 'diastolic']].apply(pd.to_numeric)
-
-            # Ensure record_date is in datetime format for sorting/filtering
-            df['record_date'] = pd.to_datetime(df['record_date'])
+            if 'record_date' in df.columns:
+                df['record_date'] = pd.to_datetime(df['record_date'])
 
-        logger.info(f"📊 Data loaded - Records: {len(df)}")
+        metrics.inc('db_rows_read_total', len(df), operation='query_records', aggregation=aggregation)
+        logger.info(f"📊 Data queried ({aggregation}) - Rows: {len(df)}")
         return df
     except Exception as e:
-        logger.error(f"❌ Error loading data: {e}")
+        logger.error(f"❌ Error querying data: {e}")
         return pd.DataFrame()
 
 
-def save_data(day, slot, sys, dia):
-    """Saves a new record."""
+def iter_records(tenant, start=None, end=None, slot=None, chunk_size=1000):
+    """Yields a tenant's readings in day order as lists of at most chunk_size rows.
+
+    Rows are (day, time_slot, systolic, diastolic, record_date) tuples straight from the cursor, so
+    memory stays bounded by one chunk however long the history is. The read connection is held until
+    the generator is exhausted or closed; database errors propagate to the caller.
+    """
+    conditions = ["guild_id = ?", "user_id = ?", "day GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"]
+    params = list(tenant)
+    if start is not None:
+        conditions.append("day >= ?")
+        params.append(day_key(start))
+    if end is not None:
+        conditions.append("day <= ?")
+        params.append(day_key(end))
+    if slot is not None:
+        conditions.append("time_slot = ?")
+        params.append(slot)
+
+    with connections().read() as conn:
+        cursor = conn.execute(
+            f"SELECT day, time_slot, systolic, diastolic, record_date FROM records "
+            f"WHERE {' AND '.join(conditions)} ORDER BY day, record_date", params
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                metrics.inc('db_rows_read_total', len(rows), operation='iter_records')
+                yield rows
+        finally:
+            cursor.close()
+
+
+@metrics.timed('db_duration_seconds', operation='history_page')
+def history_page(tenant, limit, before=None, after=None):
+    """Returns one page of a tenant's readings, newest first, and whether more lie past its far end.
+
+    Pages are keyset-paginated on (record_date, id), which idx_records_tenant_recorded serves in
+    order, so any page costs O(limit). `before` / `after` are the (record_date, id) cursor of the
+    last / first row of the page already shown; with `after`, "more" means newer rows remain.
+    Rows are (id, day, time_slot, systolic, diastolic, record_date). Returns None on error.
+    """
+    conditions = ["guild_id = ?", "user_id = ?"]
+    params = list(tenant)
+    direction = "DESC"
+    if before is not None:
+        conditions.append("(record_date, id) < (?, ?)")
+        params.extend(before)
+    elif after is not None:
+        conditions.append("(record_date, id) > (?, ?)")
+        params.extend(after)
+        direction = "ASC"
+    params.append(int(limit) + 1)
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        # Ensure day is saved as 'dd-mm-yy' string
-        cursor.execute(
-            "INSERT INTO records (day, time_slot, systolic, diastolic) VALUES (?, ?, ?, ?)",
-            (day.strftime('%d-%m-%y'), slot, sys, dia))
-        conn.commit()
-        conn.close()
-        logger.info(f"💾 Record saved - Date: {day.strftime('%d-%m-%y')}")
-        return True
+        with connections().read() as conn:
+            rows = conn.execute(
+                f"SELECT id, day, time_slot, systolic, diastolic, record_date FROM records "
+                f"WHERE {' AND '.join(conditions)} ORDER BY record_date {direction}, id {direction} LIMIT ?", params
+            ).fetchall()
+        metrics.inc('db_rows_read_total', len(rows), operation='history_page')
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return (rows[::-1] if direction == "ASC" else rows), more
+    except Exception as e:
+        logger.error(f"❌ Error loading history: {e}")
+        return None
+
+
+@metrics.timed('db_duration_seconds', operation='list_tenants')
+def list_tenants(guild_id=None):
+    """Returns the (guild_id, user_id) pairs that have readings, optionally within one guild."""
+    try:
+        with connections().read() as conn:
+            if guild_id is None:
+                return conn.execute("SELECT DISTINCT guild_id, user_id FROM daily_stats").fetchall()
+            return conn.execute("SELECT DISTINCT guild_id, user_id FROM daily_stats WHERE guild_id = ?",
+                                (guild_id,)).fetchall()
+    except Exception as e:
+        logger.error(f"❌ Error listing tenants: {e}")
+        return []
+
+
+@metrics.timed('db_duration_seconds', operation='daily_slot_sums')
+def daily_slot_sums(tenant, days=None):
+    """Returns a tenant's (day, time_slot, readings, sum_sys, sum_dia) aggregates, optionally for some days only.
+
+    Rows come straight from daily_stats, one per day and slot. Returns None on error.
+    """
+    conditions = ["guild_id = ?", "user_id = ?", "day GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"]
+    params = list(tenant)
+    if days is not None:
+        days = list(days)
+        conditions.append(f"day IN ({', '.join('?' * len(days))})")
+        params.extend(days)
+    try:
+        with connections().read() as conn:
+            rows = conn.execute(
+                f"SELECT day, time_slot, readings, sum_sys, sum_dia FROM daily_stats "
+                f"WHERE {' AND '.join(conditions)} ORDER BY day", params
+            ).fetchall()
+        metrics.inc('db_rows_read_total', len(rows), operation='daily_slot_sums')
+        return rows
+    except Exception as e:
+        logger.error(f"❌ Error loading daily aggregates: {e}")
+        return None
+
+
+@metrics.timed('db_duration_seconds', operation='recent_daily_sums')
+def recent_daily_sums(tenant, limit):
+    """Returns (day, readings, sum_sys, sum_dia) for a tenant's latest `limit` days with data, newest first.
+
+    Returns None on error.
+    """
+    try:
+        with connections().read() as conn:
+            rows = conn.execute(
+                "SELECT day, SUM(readings), SUM(sum_sys), SUM(sum_dia) FROM daily_stats "
+                "WHERE guild_id = ? AND user_id = ? AND day GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' "
+                "GROUP BY day ORDER BY day DESC LIMIT ?", (*tenant, int(limit))
+            ).fetchall()
+        metrics.inc('db_rows_read_total', len(rows), operation='recent_daily_sums')
+        return rows
+    except Exception as e:
+        logger.error(f"❌ Error loading recent daily aggregates: {e}")
+        return None
+
+
+@metrics.timed('db_duration_seconds', operation='monthly_slot_sums')
+def monthly_slot_sums(tenant, start=None, end=None):
+    """Returns a tenant's ('YYYY-MM', time_slot, readings, sum_sys, sum_dia) totals per month and slot, oldest first.
+
+    One grouped query over daily_stats, so the cost follows the days with data in [start, end]
+    rather than the number of readings. Returns None on error.
+    """
+    conditions = ["guild_id = ?", "user_id = ?", "day GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'",
+                  "time_slot IN ('morning', 'afternoon', 'night')"]
+    params = list(tenant)
+    if start is not None:
+        conditions.append("day >= ?")
+        params.append(day_key(start))
+    if end is not None:
+        conditions.append("day <= ?")
+        params.append(day_key(end))
+    try:
+        with connections().read() as conn:
+            rows = conn.execute(
+                f"SELECT substr(day, 1, 7), time_slot, SUM(readings), SUM(sum_sys), SUM(sum_dia) FROM daily_stats "
+                f"WHERE {' AND '.join(conditions)} GROUP BY 1, 2 ORDER BY 1, 2", params
+            ).fetchall()
+        metrics.inc('db_rows_read_total', len(rows), operation='monthly_slot_sums')
+        return rows
+    except Exception as e:
+        logger.error(f"❌ Error loading monthly totals: {e}")
+        return None
+
+
+@metrics.timed('db_duration_seconds', operation='pressure_histogram')
+def pressure_histogram(tenant, start=None, end=None):
+    """Returns a tenant's (time_slot, measure, value, readings) counts over the whole months of [start, end].
+
+    measure is 'sys' or 'dia', and rows come in value order within each slot and measure. The cost
+    follows the distinct pressures per month rather than the number of readings. Returns None on error.
+    """
+    conditions = ["guild_id = ?", "user_id = ?", "month GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]'",
+                  "time_slot IN ('morning', 'afternoon', 'night')"]
+    params = list(tenant)
+    if start is not None:
+        conditions.append("month >= ?")
+        params.append(day_key(start)[:7])
+    if end is not None:
+        conditions.append("month <= ?")
+        params.append(day_key(end)[:7])
+    try:
+        with connections().read() as conn:
+            rows = conn.execute(
+                f"SELECT time_slot, measure, value, SUM(readings) FROM pressure_histogram "
+                f"WHERE {' AND '.join(conditions)} GROUP BY 1, 2, 3 ORDER BY 1, 2, 3", params
+            ).fetchall()
+        metrics.inc('db_rows_read_total', len(rows), operation='pressure_histogram')
+        return rows
+    except Exception as e:
+        logger.error(f"❌ Error loading pressure histogram: {e}")
+        return None
+
+
+@metrics.timed('db_duration_seconds', operation='tenant_readings')
+def tenant_readings(tenant, days=None):
+    """Returns a tenant's (day, time_slot, systolic, diastolic) readings in day order, optionally for some days only.
+
+    Readings of a day keep the order they were taken in. Returns None on error.
+    """
+    conditions = ["guild_id = ?", "user_id = ?", "day GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"]
+    params = list(tenant)
+    if days is not None:
+        days = list(days)
+        conditions.append(f"day IN ({', '.join('?' * len(days))})")
+        params.extend(days)
+    try:
+        with connections().read() as conn:
+            rows = conn.execute(
+                f"SELECT day, time_slot, systolic, diastolic FROM records "
+                f"WHERE {' AND '.join(conditions)} ORDER BY day, record_date, id", params
+            ).fetchall()
+        metrics.inc('db_rows_read_total', len(rows), operation='tenant_readings')
+        return rows
+    except Exception as e:
+        logger.error(f"❌ Error loading readings: {e}")
+        return None
+
+
+@metrics.timed('db_duration_seconds', operation='rebuild_daily_stats')
+def rebuild_daily_stats():
+    """Recomputes daily_stats and pressure_histogram from the raw records.
+
+    Returns the number of (tenant, day, slot) rows, or None on error.
+    """
+    try:
+        with connections().write() as conn:
+            conn.execute("DELETE FROM daily_stats")
+            rows = conn.execute(_STATS_REBUILD).rowcount
+            conn.execute("DELETE FROM pressure_histogram")
+            conn.execute(_HISTOGRAM_REBUILD)
+        logger.info(f"🔁 Daily stats rebuilt - Rows: {rows}")
+        return rows
+    except Exception as e:
+        logger.error(f"❌ Error rebuilding daily stats: {e}")
+        return None
+
+
+# Find a (tenant, day, slot) reading and sample numbers through idx_records_tenant_slot_sample. A slot's
+# current reading is its highest sample: save_data (replace), update_data and get_record all act on it
+_SLOT_MATCH = "guild_id = ? AND user_id = ? AND day = ? AND time_slot = ?"
+_NEXT_SAMPLE = f"(SELECT COALESCE(MAX(sample) + 1, 0) FROM records WHERE {_SLOT_MATCH})"
+_CURRENT_SAMPLE = f"(SELECT COALESCE(MAX(sample), 0) FROM records WHERE {_SLOT_MATCH})"
+_CURRENT = f"SELECT id, systolic, diastolic FROM records WHERE {_SLOT_MATCH} ORDER BY sample DESC LIMIT 1"
+
+
+@metrics.timed('db_duration_seconds', operation='save_data')
+def save_data(tenant, day, slot, sys, dia, policy=None):
+    """Saves a reading for a (guild_id, user_id) tenant with a single upsert.
+
+    With the 'replace' policy (SLOT_POLICY default) saving again overwrites the slot's current (highest)
+    sample, journaled for !undo; with 'samples' each reading is kept as the slot's next sample.
+    Returns (record_id, sample, previous) where previous is the replaced (sys, dia) or None, or
+    None on error.
+    """
+    policy = policy or SLOT_POLICY
+    key = (*tenant, day_key(day), slot)
+    try:
+        with connections().write() as conn:
+            previous = None
+            if policy == 'samples':
+                record_id, sample = conn.execute(
+                    f"INSERT INTO records (guild_id, user_id, day, time_slot, sample, systolic, diastolic) "
+                    f"VALUES (?, ?, ?, ?, {_NEXT_SAMPLE}, ?, ?) RETURNING id, sample",
+                    (*key, *key, sys, dia)).fetchone()
+            else:
+                previous = conn.execute(_CURRENT, key).fetchone()
+                if previous is not None:
+                    _journal(conn, tenant, 'edit', "id = ?", previous[:1])
+                record_id, sample = conn.execute(
+                    f"INSERT INTO records (guild_id, user_id, day, time_slot, sample, systolic, diastolic) "
+                    f"VALUES (?, ?, ?, ?, {_CURRENT_SAMPLE}, ?, ?) "
+                    f"ON CONFLICT (guild_id, user_id, day, time_slot, sample) DO UPDATE "
+                    f"SET systolic = excluded.systolic, diastolic = excluded.diastolic, "
+                    f"record_date = CURRENT_TIMESTAMP RETURNING id, sample",
+                    (*key, *key, sys, dia)).fetchone()
+        _notify_write(tenant, {key[2]})
+        logger.info(f"💾 Record saved - Date: {day.strftime('%d-%m-%y')}, Sample: {sample}")
+        return record_id, sample, previous[1:] if previous is not None else None
     except Exception as e:
         logger.error(f"❌ Error saving record: {e}")
-        return False
+        return None
+
 
+@metrics.timed('db_duration_seconds', operation='insert_records')
+def insert_records(tenant, rows, policy=None):
+    """Inserts many of a tenant's readings in one transaction.
 
-def update_data(day_str, slot, sys, dia):
-    """Updates an existing record based on day and time_slot."""
+    rows are (day, slot, sys, dia, record_date) tuples with day as a date and record_date as a
+    'YYYY-MM-DD HH:MM:SS' string. Slots already holding a reading follow the save_data policy
+    (overwritten, or added as new samples). The batch is journaled as one 'import' operation, so !undo
+    deletes the readings it added and brings back the ones it overwrote. Returns the number of rows
+    written, or None on error.
+    """
+    policy = policy or SLOT_POLICY
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
+        guild_id, user_id = tenant
+        params = [(guild_id, user_id, day_key(day), slot, sys, dia, record_date)
+                  for day, slot, sys, dia, record_date in rows]
+        with connections().write() as conn:
+            # Ids only grow (AUTOINCREMENT), so the rows this batch adds are the ones above the current maximum
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM records").fetchone()[0]
+            op = None
+            if policy == 'samples':
+                conn.executemany(
+                    f"INSERT INTO records (guild_id, user_id, day, time_slot, systolic, diastolic, record_date, "
+                    f"sample) VALUES (?, ?, ?, ?, ?, ?, ?, {_NEXT_SAMPLE})",
+                    [(*row, *row[:4]) for row in params])
+            else:
+                # The current reading of every (day, slot) in the batch, found in one statement
+                keys = json.dumps(sorted({(row[2], row[3]) for row in params}))
+                if conn.execute(f"SELECT 1 FROM json_each(?) AS k WHERE EXISTS (SELECT 1 FROM records "
+                                f"WHERE guild_id = ? AND user_id = ? AND day = k.value ->> 0 "
+                                f"AND time_slot = k.value ->> 1)", (keys, *tenant)).fetchone():
+                    op = _journal(conn, tenant, 'import',
+                                  "id IN (SELECT (SELECT id FROM records AS r WHERE r.guild_id = ? AND r.user_id = ? "
+                                  "AND r.day = k.value ->> 0 AND r.time_slot = k.value ->> 1 ORDER BY r.sample DESC "
+                                  "LIMIT 1) FROM json_each(?) AS k)", (*tenant, keys))
+                conn.executemany(
+                    f"INSERT INTO records (guild_id, user_id, day, time_slot, systolic, diastolic, record_date, "
+                    f"sample) VALUES (?, ?, ?, ?, ?, ?, ?, {_CURRENT_SAMPLE}) "
+                    f"ON CONFLICT (guild_id, user_id, day, time_slot, sample) DO UPDATE "
+                    f"SET systolic = excluded.systolic, diastolic = excluded.diastolic, "
+                    f"record_date = excluded.record_date",
+                    [(*row, *row[:4]) for row in params])
+            _journal(conn, tenant, 'import', "id > ?", (last_id,), op=op, created=True)
+        _notify_write(tenant, {row[2] for row in params})
+        logger.info(f"📥 Records imported - Rows: {len(params)}")
+        return len(params)
+    except Exception as e:
+        logger.error(f"❌ Error importing records: {e}")
+        return None
 
-        cursor.execute(
-            "UPDATE records SET systolic = ?, diastolic = ?, record_date = CURRENT_TIMESTAMP "
-            "WHERE day = ? AND time_slot = ?",
-            (sys, dia, day_str, slot)
-        )
-        conn.commit()
-        conn.close()
-        logger.info(f"✏️ Record updated - Day: {day_str}, Slot: {slot}")
-        return True
+
+@metrics.timed('db_duration_seconds', operation='update_data')
+def update_data(tenant, day, slot, sys, dia):
+    """Overwrites the current (highest sample) reading of a tenant's day and slot, journaling it for !undo.
+
+    Returns the previous (sys, dia), None if the slot has no reading, or False on error.
+    """
+    key = (*tenant, day_key(day), slot)
+    try:
+        with connections().write() as conn:
+            current = conn.execute(_CURRENT, key).fetchone()
+            if current is None:
+                return None
+            _journal(conn, tenant, 'edit', "id = ?", current[:1])
+            conn.execute("UPDATE records SET systolic = ?, diastolic = ?, record_date = CURRENT_TIMESTAMP "
+                         "WHERE id = ?", (sys, dia, current[0]))
+        _notify_write(tenant, {key[2]})
+        logger.info(f"✏️ Record updated - Day: {key[2]}, Slot: {slot}")
+        return current[1:]
     except Exception as e:
         logger.error(f"❌ Error updating record: {e}")
         return False
 
 
-def get_record(day_str, slot):
-    """Retrieves a single record based on day (str) and time_slot."""
+@metrics.timed('db_duration_seconds', operation='get_record')
+def get_record(tenant, day, slot):
+    """Retrieves the (systolic, diastolic) of a tenant's current reading for a day (date) and time_slot."""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT systolic, diastolic FROM records WHERE day = ? AND time_slot = ?",
-            (day_str, slot)
-        )
-        record = cursor.fetchone()
-        conn.close()
-        return record
+        with connections().read() as conn:
+            current = conn.execute(_CURRENT, (*tenant, day_key(day), slot)).fetchone()
+            return current[1:] if current is not None else None
     except Exception as e:
         logger.error(f"❌ Error retrieving record: {e}")
         return None
 
 
+@metrics.timed('db_duration_seconds', operation='delete_record')
+def delete_record(tenant, record_id):
+    """Deletes one of the tenant's records by id, journaling it for !undo. Returns True if a row was deleted."""
+    try:
+        with connections().write() as conn:
+            _journal(conn, tenant, 'delete', "id = ?", (record_id,))
+            deleted = conn.execute("DELETE FROM records WHERE guild_id = ? AND user_id = ? AND id = ? RETURNING day",
+                                   (*tenant, record_id)).fetchone()
+            if deleted is None:
+                # Nothing to undo: drop the empty operation's number along with the transaction
+                raise LookupError(record_id)
 
-import sqlite3
-
+        _notify_write(tenant, {deleted[0]})
+        logger.info(f"🗑️ Record deleted - Id: {record_id}")
+        return True
+    except LookupError:
+        logger.warning("⚠️ No record found to delete.")
+        return False
+    except Exception as e:
+        logger.error(f"❌ Error deleting record: {e}")
+        return False
 
-def delete_last_record():
-    """Deletes the record with the latest record_date timestamp."""
 
-    # Asume que DB_NAME y logger están disponibles
+@metrics.timed('db_duration_seconds', operation='undo_last')
+def undo_last(tenant, policy=None):
+    """Reverts the tenant's latest journaled delete, edit or import.
 
+    Returns (action, restored, moved, removed, kept) where restored and kept are [(day, time_slot, systolic,
+    diastolic), ...] lists, None if there is nothing to undo, or False on error. Restored rows keep their
+    original id and record_date; readings the operation added (an import's) are deleted and counted in
+    `removed`. A deleted reading whose slot has been registered again since would displace the newer one:
+    with the 'replace' policy (SLOT_POLICY default) it is left out and listed in `kept` unless it fits below
+    the slot's current sample; with 'samples' it comes back as the slot's next sample, counted in `moved`.
+    """
+    policy = policy or SLOT_POLICY
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
+        with connections().write() as conn:
+            op = conn.execute("SELECT MAX(op) FROM undo_journal WHERE guild_id = ? AND user_id = ?",
+                              tenant).fetchone()[0]
+            if op is None:
+                return None
+            # Added readings (no journaled pressures) are deleted first, so the slots they took are free again
+            entries = conn.execute(
+                "SELECT action, record_id, day, time_slot, systolic, diastolic, record_date, sample FROM undo_journal "
+                "WHERE guild_id = ? AND user_id = ? AND op = ? ORDER BY systolic IS NOT NULL, id", (*tenant, op)
+            ).fetchall()
+            restored, kept, moved, removed = [], [], 0, 0
+            for _, record_id, day, slot, sys, dia, recorded, sample in entries:
+                key = (*tenant, day, slot)
+                if sys is None:
+                    removed += conn.execute("DELETE FROM records WHERE id = ? AND guild_id = ? AND user_id = ?",
+                                            (record_id, *tenant)).rowcount
+                    continue
+                held = conn.execute(f"SELECT sample, id FROM records WHERE {_SLOT_MATCH}", key).fetchall()
+                others = dict(row for row in held if row[1] != record_id)  # sample -> id
+                # An edited row is still in place; a deleted one may find its sample taken, or a reading
+                # registered after it (a higher id) current where it would now outrank it
+                current = max(others) if others else None
+                displaces = sample in others or (len(others) == len(held) and current is not None
+                                                 and sample > current and others[current] > record_id)
+                if displaces and policy == 'replace':
+                    kept.append((day, slot, sys, dia))
+                    continue
+                if sample in others:
+                    sample = current + 1
+                    moved += 1
+                # Deleted rows come back; edited rows (or rows deleted since) get their old values back
+                conn.execute(
+                    "INSERT INTO records (id, guild_id, user_id, day, time_slot, sample, systolic, diastolic, "
+                    "record_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                    "day = excluded.day, time_slot = excluded.time_slot, sample = excluded.sample, "
+                    "systolic = excluded.systolic, diastolic = excluded.diastolic, record_date = excluded.record_date",
+                    (record_id, *key, sample, sys, dia, recorded))
+                restored.append((day, slot, sys, dia))
+            conn.execute("DELETE FROM undo_journal WHERE guild_id = ? AND user_id = ? AND op = ?", (*tenant, op))
+
+        _notify_write(tenant, {entry[2] for entry in entries})
+        logger.info(f"↩️ Undo - Action: {entries[0][0]}, Restored: {len(restored)}, Moved: {moved}, "
+                    f"Removed: {removed}, Kept: {len(kept)}")
+        return entries[0][0], restored, moved, removed, kept
+    except Exception as e:
+        logger.error(f"❌ Error undoing last change: {e}")
+        return False
 
-        # Consulta: Borra el registro cuya record_date sea la más alta (el más reciente).
-        sql_query = """
-            DELETE FROM records 
-            WHERE record_date = (SELECT MAX(record_date) FROM records)
-        """
 
-        cursor.execute(sql_query)
-        conn.commit()
+# --- SCHEDULED JOBS ---
+JOB_COLUMNS = ('id', 'kind', 'guild_id', 'user_id', 'job_key', 'channel_id', 'timezone', 'at_time', 'weekday',
+               'next_run', 'last_run')
 
-        if cursor.rowcount > 0:
-            logger.info("🗑️ Last record deleted")
-            return True
-        else:
-            logger.warning("⚠️ No record found to delete.")
-            return False
 
+@metrics.timed('db_duration_seconds', operation='load_jobs')
+def load_jobs():
+    """Returns every scheduled job as a tuple in JOB_COLUMNS order, or None on error."""
+    try:
+        with connections().read() as conn:
+            return conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM scheduled_jobs").fetchall()
     except Exception as e:
-        logger.error(f"❌ Error deleting record: {e}")
-        return False
+        logger.error(f"❌ Error loading scheduled jobs: {e}")
+        return None
+
 
-    finally:
-        # Asegura que la conexión se cierra en todos los casos
-        if 'conn' in locals() and conn:
-            conn.close()
+@metrics.timed('db_duration_seconds', operation='save_job')
+def save_job(kind, tenant, key, channel_id, timezone, at_time, weekday, next_run):
+    """Creates or replaces the (kind, tenant, key) job. Returns its id, or None on error."""
+    try:
+        with connections().write() as conn:
+            return conn.execute(
+                "INSERT INTO scheduled_jobs (kind, guild_id, user_id, job_key, channel_id, timezone, at_time, "
+                "weekday, next_run) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, guild_id, user_id, job_key) DO UPDATE SET channel_id = excluded.channel_id, "
+                "timezone = excluded.timezone, at_time = excluded.at_time, weekday = excluded.weekday, "
+                "next_run = excluded.next_run RETURNING id",
+                (kind, *tenant, key, channel_id, timezone, at_time, weekday, next_run)
+            ).fetchone()[0]
+    except Exception as e:
+        logger.error(f"❌ Error saving scheduled job: {e}")
+        return None
 
 
-def backup_database():
-    """Creates database backup."""
+@metrics.timed('db_duration_seconds', operation='delete_jobs')
+def delete_jobs(kind, tenant, key=None):
+    """Deletes a tenant's jobs of one kind (only the one with `key` if given). Returns the deleted ids."""
+    sql = "DELETE FROM scheduled_jobs WHERE kind = ? AND guild_id = ? AND user_id = ?"
+    params = [kind, *tenant]
+    if key is not None:
+        sql += " AND job_key = ?"
+        params.append(key)
     try:
-        if not os.path.exists('backup'):
-            os.makedirs('backup')
+        with connections().write() as conn:
+            return [row[0] for row in conn.execute(sql + " RETURNING id", params).fetchall()]
+    except Exception as e:
+        logger.error(f"❌ Error deleting scheduled jobs: {e}")
+        return []
 
-        backup_name = os.path.join('backup', f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
-        shutil.copy2(DB_NAME, backup_name)
 
-        # Clean old backups (keep last 7)
-        try:
-            backup_files = [f for f in os.listdir('backup') if f.startswith('backup_') and f.endswith('.db')]
-            if len(backup_files) > 7:
-                # Sort by creation time to find the oldest
-                backup_files.sort(key=lambda x: os.path.getctime(os.path.join('backup', x)))
-                for old_backup in backup_files[:-7]:
-                    os.remove(os.path.join('backup', old_backup))
-                    logger.info(f"🧹 Old backup deleted: {old_backup}")
-        except Exception as cleanup_error:
-            logger.warning(f"⚠️ Could not clean old backups: {cleanup_error}")
-
-        logger.info(f"💾 Backup created: {backup_name}")
-        return backup_name
-
-    except Exception as e:
-        logger.error(f"❌ Error creating backup: {e}")
-        return None
\ No newline at end of file
+@metrics.timed('db_duration_seconds', operation='set_job_runs')
+def set_job_runs(runs):
+    """Stores (job_id, next_run, last_run) for several jobs in one transaction."""
+    try:
+        with connections().write() as conn:
+            conn.executemany("UPDATE scheduled_jobs SET next_run = ?, last_run = ? WHERE id = ?",
+                             [(next_run, last_run, job_id) for job_id, next_run, last_run in runs])
+        return True
+    except Exception as e:
+        logger.error(f"❌ Error updating scheduled jobs: {e}")
+        return False
@@ -0,0 +1,143 @@
+# exporter.py
+"""Streaming writer for !export: readings go from a SQLite cursor into spooled temp files chunk by chunk.
+
+CSV files use the same columns !import reads back. Parquet needs the optional pyarrow package.
+"""
+
+import csv
+import gzip
+import io
+import tempfile
+from dataclasses import dataclass, field
+
+import db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = ('csv', 'parquet')
+CSV_HEADER = ('Date', 'Time_Slot', 'Systolic', 'Diastolic', 'Time_of_Record')
+SLOT_CODES = {'morning': 'm', 'afternoon': 'a', 'night': 'n'}
+
+CHUNK_ROWS = {'csv': 1000, 'parquet': 20000}  # Parquet writes one row group per chunk
+SPOOL_BYTES = 1024 * 1024  # Parts bigger than this are moved from memory to a temp file on disk
+PART_HEADROOM = 1024 * 1024  # Compressed output still buffered by the writer when the size is checked
+
+
+def parquet_available():
+    return pq is not None
+
+
+class _CsvPart:
+    def __init__(self, compress):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        self._gzip = gzip.GzipFile(fileobj=self.file, mode='wb', mtime=0) if compress else None
+        self._text = io.TextIOWrapper(self._gzip or self.file, encoding='utf-8', newline='')
+        self._writer = csv.writer(self._text, lineterminator='\n')
+        self._writer.writerow(CSV_HEADER)
+
+    def write(self, rows):
+        # ISO day 'YYYY-MM-DD' -> 'dd-mm-yy' and record_date 'YYYY-MM-DD HH:MM:SS' -> 'HH:MM:SS' by slicing
+        self._writer.writerows(
+            (f"{day[8:10]}-{day[5:7]}-{day[2:4]}", SLOT_CODES.get(slot), sys_, dia, str(recorded)[11:19])
+            for day, slot, sys_, dia, recorded in rows
+        )
+        self._text.flush()
+
+    def size(self):
+        return self.file.tell()
+
+    def finish(self):
+        self._text.flush()
+        self._text.detach()
+        if self._gzip is not None:
+            self._gzip.close()  # Writes the gzip trailer; the underlying file stays open
+        self.file.seek(0)
+        return self.file
+
+
+class _ParquetPart:
+    def __init__(self, compress):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        self._schema = pa.schema([('day', pa.date32()), ('time_slot', pa.string()), ('systolic', pa.int16()),
+                                  ('diastolic', pa.int16()), ('record_date', pa.timestamp('s'))])
+        self._writer = pq.ParquetWriter(self.file, self._schema, compression='zstd' if compress else 'snappy')
+
+    def write(self, rows):
+        days, slots, systolic, diastolic, recorded = zip(*rows)
+        self._writer.write_batch(pa.record_batch([
+            pa.array(days).cast(pa.date32()),
+            pa.array(slots, pa.string()),
+            pa.array(systolic, pa.int16()),
+            pa.array(diastolic, pa.int16()),
+            pa.array([str(value) for value in recorded]).cast(pa.timestamp('s')),
+        ], schema=self._schema))
+
+    def size(self):
+        return self.file.tell()
+
+    def finish(self):
+        self._writer.close()
+        self.file.seek(0)
+        return self.file
+
+
+@dataclass
+class ExportResult:
+    """Finished parts as (filename, file) pairs, positioned at the start, plus what they contain."""
+    parts: list = field(default_factory=list)
+    rows: int = 0
+    first_day: str = None
+    last_day: str = None
+
+    def close(self):
+        for _, file in self.parts:
+            file.close()
+
+
+def export_records(tenant, name, fmt='csv', compress=False, start=None, end=None, slot=None,
+                   part_bytes=8 * 1024 * 1024):
+    """Writes a tenant's readings into one or more files of at most part_bytes each.
+
+    Files are named `{name}.csv[.gz]` or `{name}.parquet`, with `_partN` added when the export is split;
+    every part is complete on its own (CSV parts repeat the header). Runs on a database reader thread.
+    Raises ValueError for an unknown or unavailable format.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet' and not parquet_available():
+        raise ValueError("Parquet export needs the pyarrow package")
+
+    part_class = _ParquetPart if fmt == 'parquet' else _CsvPart
+    limit = max(part_bytes - PART_HEADROOM, part_bytes // 2)
+    files = []
+    result = ExportResult()
+    part = None
+    try:
+        for rows in db.iter_records(tenant, start, end, slot, chunk_size=CHUNK_ROWS[fmt]):
+            if part is None:
+                part = part_class(compress)
+            part.write(rows)
+            result.rows += len(rows)
+            result.first_day = result.first_day or rows[0][0]
+            result.last_day = rows[-1][0]
+            if part.size() >= limit:
+                files.append(part.finish())
+                part = None
+        if part is not None:
+            files.append(part.finish())
+    except BaseException:
+        if part is not None:
+            part.file.close()
+        for file in files:
+            file.close()
+        raise
+
+    extension = 'parquet' if fmt == 'parquet' else 'csv.gz' if compress else 'csv'
+    for number, file in enumerate(files, start=1):
+        suffix = f"_part{number}" if len(files) > 1 else ''
+        result.parts.append((f"{name}{suffix}.{extension}", file))
+    return result
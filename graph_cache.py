@@ -0,0 +1,234 @@
+# graph_cache.py
+"""Cache of rendered graph messages with an LRU memory tier and an optional size-capped disk tier.
+
+Keys are built from the request alone: (tenant, command, period, slot, title), so a hit is found
+before any data is read and skips the data fetch, the spec building and the render. Freshness
+comes from invalidation: writes through db.py drop every entry of that tenant whose period contains
+a touched day, in both tiers, and bump the tenant's version. put() refuses a chart whose version
+changed since its lookup, so a render racing with a write can't be stored after the write dropped
+its period. Entries hold the PNG and the message text that goes with it.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+
+import db
+import metrics
+from config import GRAPH_CACHE_DIR, GRAPH_CACHE_MEMORY_MB, GRAPH_CACHE_DISK_MB
+from utils import logger
+
+SUFFIX = '.chart'
+# PNG files of the earlier disk formats ('{start}_{end}_{key}.png', then with the tenant in front)
+_OLD_FILE = re.compile(r'(-?\d+_-?\d+_)?\d{4}-\d{2}-\d{2}_\d{4}-\d{2}-\d{2}_[0-9a-f]{64}\.png(\.tmp)?')
+_CAPTION_LENGTH = struct.Struct('>I')  # Disk entries are the caption's length, the caption and the PNG
+
+
+def make_key(tenant, command, start, end, slot, title):
+    """Builds the cache key for a tenant's chart of `command` over [start, end], before any data is read."""
+    guild_id, user_id = tenant
+    raw = f"{guild_id}|{user_id}|{command}|{db.day_key(start)}|{db.day_key(end)}|{slot or 'all'}|{title}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class GraphCache:
+    def __init__(self, memory_bytes, disk_dir='', disk_bytes=0):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()  # key -> (png, caption, tenant, start, end), least recently used first
+        self._memory_used = 0
+        self._disk = OrderedDict()  # filename -> size, least recently used first
+        self._disk_used = 0
+        self._versions = {}  # tenant -> invalidations since startup
+        # Invalidation runs on the database worker thread, lookups on the event loop
+        self._lock = threading.Lock()
+
+        if self.disk_dir:
+            self._load_disk_index()
+
+    @staticmethod
+    def _filename(tenant, key, start, end):
+        # Tenant and period are part of the name so invalidation after a restart needs no extra index
+        return f"{tenant[0]}_{tenant[1]}_{start}_{end}_{key}{SUFFIX}"
+
+    @staticmethod
+    def _parse_filename(name):
+        guild_id, user_id, start, end, _ = name.split('_', 4)
+        return (int(guild_id), int(user_id)), start, end
+
+    def _load_disk_index(self):
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            entries, old = [], []
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(SUFFIX) and name.count('_') >= 4:
+                    stat = os.stat(os.path.join(self.disk_dir, name))
+                    entries.append((stat.st_mtime, name, stat.st_size))
+                elif _OLD_FILE.fullmatch(name) or name.endswith(f"{SUFFIX}.tmp"):
+                    old.append(name)
+            for _, name, size in sorted(entries):
+                self._disk[name] = size
+                self._disk_used += size
+            # Earlier formats can't be invalidated (or read) any more, so they would only take up space
+            self._remove_files(old)
+            logger.info(f"🖼️ Graph disk cache loaded - Entries: {len(self._disk)}, old files removed: {len(old)}")
+        except OSError as e:
+            logger.warning(f"⚠️ Graph disk cache disabled: {e}")
+            self.disk_dir = ''
+
+    def version(self, tenant):
+        """The tenant's invalidation count; read it before the data a chart is drawn from, and pass it to put()."""
+        with self._lock:
+            return self._versions.get(tuple(tenant), 0)
+
+    def _remember(self, tenant, key, png, caption, start, end, version):
+        """Stores an entry in the memory tier unless the tenant was invalidated since `version`.
+
+        Evicts least recently used entries over budget. Returns False if the entry was refused. Caller holds the lock.
+        """
+        if self._versions.get(tenant, 0) != version:
+            return False
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return True
+        self._memory[key] = (png, caption, tenant, start, end)
+        self._memory_used += len(png)
+        while self._memory_used > self.memory_bytes and self._memory:
+            _, (old_png, *_) = self._memory.popitem(last=False)
+            self._memory_used -= len(old_png)
+        return True
+
+    def get(self, tenant, key, start, end):
+        """Returns the cached (png, caption) or None."""
+        tenant = tuple(tenant)
+        start, end = db.day_key(start), db.day_key(end)
+        name = self._filename(tenant, key, start, end)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry[:2]
+            if name not in self._disk:
+                return None
+            self._disk.move_to_end(name)
+            version = self._versions.get(tenant, 0)
+
+        path = os.path.join(self.disk_dir, name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            length, = _CAPTION_LENGTH.unpack_from(data)
+            caption = data[_CAPTION_LENGTH.size:_CAPTION_LENGTH.size + length].decode('utf-8')
+            png = data[_CAPTION_LENGTH.size + length:]
+        except (OSError, struct.error, UnicodeDecodeError):
+            self._forget_file(name)
+            return None
+
+        with self._lock:
+            # A write may have removed the file while it was read; the bytes are still served to this request
+            self._remember(tenant, key, png, caption, start, end, version)
+        return png, caption
+
+    def put(self, tenant, key, start, end, png, caption, version):
+        """Caches a tenant's chart covering [start, end] with its message text.
+
+        `version` is version(tenant) from before the chart's data was read; if a write has invalidated the
+        tenant since, the chart may show old data and is not stored.
+        """
+        tenant = tuple(tenant)
+        start, end = db.day_key(start), db.day_key(end)
+        with self._lock:
+            if not self._remember(tenant, key, png, caption, start, end, version):
+                return
+        if not self.disk_dir:
+            return
+
+        name = self._filename(tenant, key, start, end)
+        path = os.path.join(self.disk_dir, name)
+        encoded = caption.encode('utf-8')
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(_CAPTION_LENGTH.pack(len(encoded)) + encoded + png)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write graph cache file: {e}")
+            return
+
+        size = _CAPTION_LENGTH.size + len(encoded) + len(png)
+        evicted = []
+        with self._lock:
+            if self._versions.get(tenant, 0) != version:
+                # Invalidated while the file was written: it was not in the index yet, so remove it here
+                evicted.append(name)
+            else:
+                self._disk_used += size - self._disk.pop(name, 0)
+                self._disk[name] = size
+                while self._disk_used > self.disk_bytes and len(self._disk) > 1:
+                    old_name, old_size = self._disk.popitem(last=False)
+                    self._disk_used -= old_size
+                    evicted.append(old_name)
+        self._remove_files(evicted)
+
+    def invalidate_days(self, tenant, days):
+        """Drops every entry of `tenant` whose period contains one of `days` (ISO strings)."""
+        tenant = tuple(tenant)
+        days = sorted(days)
+
+        def touched(entry_tenant, start, end):
+            return entry_tenant == tenant and any(start <= day <= end for day in days)
+
+        with self._lock:
+            self._versions[tenant] = self._versions.get(tenant, 0) + 1
+            stale_keys = [key for key, (_, _, *entry) in self._memory.items() if touched(*entry)]
+            for key in stale_keys:
+                png, *_ = self._memory.pop(key)
+                self._memory_used -= len(png)
+
+            stale_files = [name for name in self._disk if touched(*self._parse_filename(name))]
+            for name in stale_files:
+                self._disk_used -= self._disk.pop(name)
+
+        self._remove_files(stale_files)
+        if stale_keys or stale_files:
+            logger.info(f"🖼️ Graph cache invalidated - Entries: {len(stale_keys)} memory, {len(stale_files)} disk")
+
+    def _forget_file(self, name):
+        with self._lock:
+            if name in self._disk:
+                self._disk_used -= self._disk.pop(name)
+
+    def _remove_files(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+            except OSError:
+                pass
+
+
+cache = GraphCache(GRAPH_CACHE_MEMORY_MB * 1024 * 1024, GRAPH_CACHE_DIR, GRAPH_CACHE_DISK_MB * 1024 * 1024)
+db.add_write_listener(cache.invalidate_days)
+
+
+async def get(tenant, key, start, end):
+    """Looks up a chart's (png, caption), reading the disk tier off the event loop."""
+    if cache.disk_dir:
+        entry = await asyncio.to_thread(cache.get, tenant, key, start, end)
+    else:
+        entry = cache.get(tenant, key, start, end)
+    metrics.inc('graph_cache_requests_total', result='miss' if entry is None else 'hit')
+    return entry
+
+
+async def put(tenant, key, start, end, png, caption, version):
+    """Stores a chart and its caption, writing the disk tier off the event loop."""
+    if cache.disk_dir:
+        await asyncio.to_thread(cache.put, tenant, key, start, end, png, caption, version)
+    else:
+        cache.put(tenant, key, start, end, png, caption, version)
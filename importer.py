@@ -0,0 +1,108 @@
+# importer.py
+"""Streaming parser for CSV files in the !export format, used by !import."""
+
+import csv
+import functools
+import io
+from datetime import datetime
+
+from utils import parse_flexible_date
+
+# Same limits !register enforces
+SYSTOLIC_RANGE = (50, 250)
+DIASTOLIC_RANGE = (30, 150)
+
+SLOT_NAMES = {'m': 'morning', 'a': 'afternoon', 'n': 'night',
+              'morning': 'morning', 'afternoon': 'afternoon', 'night': 'night'}
+REQUIRED_COLUMNS = ('Date', 'Time_Slot', 'Systolic', 'Diastolic')
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 10
+
+
+# Histories repeat the same few dates and times on many rows; strptime is the parser's main cost
+@functools.lru_cache(maxsize=4096)
+def _parse_day(text):
+    return parse_flexible_date(text).date()
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_time(text):
+    return datetime.strptime(text, '%H:%M:%S' if text.count(':') == 2 else '%H:%M').time()
+
+
+class CsvImport:
+    """Reads an exported CSV row by row into validated batches, counting and sampling rejected rows.
+
+    Columns: Date (dd-mm-yy), Time_Slot (m/a/n), Systolic, Diastolic and optionally Time_of_Record (HH:MM:SS).
+    Raises ValueError if the file is not UTF-8 or the header lacks a required column. A line the csv module
+    can't parse ends the file early: reading stops there and `stopped` says where and why.
+    """
+
+    def __init__(self, data, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.rejected = 0
+        self.errors = []  # (line number, reason) for the first MAX_REPORTED_ERRORS rejected rows
+        self.stopped = None  # (line number, reason) if reading stopped before the end of the file
+        # Decoded up front, so an encoding error is reported before any row is imported
+        try:
+            text = data.decode('utf-8-sig')
+        except UnicodeDecodeError as e:
+            line = data[:e.start].count(b'\n') + 1
+            raise ValueError(f"the file is not UTF-8 text (line {line})")
+        self._reader = csv.DictReader(io.StringIO(text, newline=''))
+
+        columns = self._reader.fieldnames or []
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise ValueError(f"missing column(s): {', '.join(missing)}")
+
+    def next_batch(self):
+        """Returns up to batch_size (day, slot, sys, dia, record_date) rows; an empty list once the file is done."""
+        batch = []
+        if self.stopped:
+            return batch
+        try:
+            for row in self._reader:
+                try:
+                    batch.append(self._parse_row(row))
+                except ValueError as e:
+                    self.rejected += 1
+                    if len(self.errors) < MAX_REPORTED_ERRORS:
+                        self.errors.append((self._reader.line_num, str(e)))
+                    continue
+                if len(batch) >= self.batch_size:
+                    break
+        except csv.Error as e:
+            # line_num counts the lines of the records read so far, so the failing record starts on the next one
+            self.stopped = (self._reader.line_num + 1, str(e))
+        return batch
+
+    @staticmethod
+    def _parse_row(row):
+        try:
+            day = _parse_day((row['Date'] or '').strip())
+        except ValueError:
+            raise ValueError("invalid date (use dd-mm-yy)")
+
+        slot = SLOT_NAMES.get((row['Time_Slot'] or '').strip().lower())
+        if slot is None:
+            raise ValueError("invalid time slot (use m, a or n)")
+
+        try:
+            systolic = int(row['Systolic'])
+            diastolic = int(row['Diastolic'])
+        except (TypeError, ValueError):
+            raise ValueError("pressures must be whole numbers")
+
+        if not (SYSTOLIC_RANGE[0] <= systolic <= SYSTOLIC_RANGE[1]) or \
+                not (DIASTOLIC_RANGE[0] <= diastolic <= DIASTOLIC_RANGE[1]):
+            raise ValueError("values out of range (Systolic: 50-250, Diastolic: 30-150)")
+
+        time_str = (row.get('Time_of_Record') or '').strip() or '00:00:00'
+        try:
+            record_time = _parse_time(time_str)
+        except ValueError:
+            raise ValueError("invalid time of record (use HH:MM:SS)")
+
+        return day, slot, systolic, diastolic, datetime.combine(day, record_time).strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,117 @@
+# log_pipeline.py
+"""Non-blocking logging: callers only enqueue records; a listener thread formats and writes them.
+
+The log file rotates by size or at midnight, rotated files are gzipped on the listener thread, and
+records can be written as JSON lines carrying the correlation ID of the command that produced them.
+"""
+
+import atexit
+import contextvars
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import uuid
+from datetime import datetime
+
+from config import LOG_FILE, LOG_FORMAT, LOG_ROTATION, LOG_MAX_MB, LOG_BACKUP_COUNT
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%d-%m-%Y %H:%M:%S'
+
+# Set per command invocation; copied into worker threads with the rest of the context
+correlation_id = contextvars.ContextVar('correlation_id', default=None)
+
+_listener = None
+
+
+def new_correlation_id():
+    """Starts a new correlation ID for the current task and returns it."""
+    value = uuid.uuid4().hex[:12]
+    correlation_id.set(value)
+    return value
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the correlation ID of the context that logged them (before they are queued)."""
+
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Only the arguments are resolved on the caller's thread (they may change after the call);
+        # formatting and tracebacks are left to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'correlation_id', None):
+            entry['correlation_id'] = record.correlation_id
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_namer(name):
+    return f"{name}.gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _file_handler():
+    if LOG_ROTATION == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(LOG_FILE, when='midnight', backupCount=LOG_BACKUP_COUNT,
+                                                            encoding='utf-8')
+    else:
+        handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_MB * 1024 * 1024,
+                                                       backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+    return handler
+
+
+def setup_logging(level=logging.INFO):
+    """Routes the root logger through a queue to a rotating file handler on a listener thread (once)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, _file_handler(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Writes out every queued record and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
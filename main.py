@@ -1,9 +1,17 @@
 import sys
 import blood_pressure_bot
+import async_db
+import charts
+import db
+from config import LOG_FILE
+from log_pipeline import setup_logging
 
 def main():
     """Initializes the database, sets up scheduled tasks, and runs the Discord bot."""
 
+    # Only this process writes the log file; render workers import the same modules without it
+    setup_logging()
+
     # Manejar token faltante
     if not blood_pressure_bot.DISCORD_TOKEN:
         print("❌ ERROR: Discord token not found.")
@@ -15,7 +23,10 @@ def main():
 
         # 1. Inicializar DB (Llamando a la función del módulo)
         print("📊 Initializing database...")
-        blood_pressure_bot.setup_db()
+        if not db.setup_db():
+            # e.g. an upgrade that needs LEGACY_USER_ID; the log has the reason
+            print(f"❌ ERROR: Database setup failed. See {LOG_FILE} for details.")
+            sys.exit(1)
 
         # 2. Imprimir configuración y correr el bot
         print(f"🌍 Timezone configured: {blood_pressure_bot.TIMEZONE}")
@@ -32,6 +43,10 @@ def main():
     except Exception as e:
         print(f"❌ UNEXPECTED ERROR: {e}")
         blood_pressure_bot.logger.critical(f"Critical error: {e}")
+    finally:
+        # Deja terminar las escrituras pendientes antes de salir
+        async_db.shutdown()
+        charts.renderer.shutdown()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,201 @@
+# metrics.py
+"""In-process metrics: latency histograms, counters and event-loop lag.
+
+Histograms use fixed buckets, so memory stays constant however many observations arrive, and
+quantiles are estimated from the buckets the same way Prometheus' histogram_quantile() does.
+Everything is thread-safe: database timers are recorded on the worker threads.
+"""
+
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+from utils import logger
+
+# Seconds; from sub-millisecond point reads up to slow renders and exports
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOOP_LAG_INTERVAL = 0.5
+
+HELP = {
+    'command_duration_seconds': 'Time from command dispatch to completion',
+    'commands_total': 'Commands invoked, by outcome',
+    'db_duration_seconds': 'Time spent in a db.py function, including waiting for a connection',
+    'db_write_wait_seconds': 'Time waiting for the database write lock',
+    'db_rows_read_total': 'Rows returned to Python by database reads',
+    'render_duration_seconds': 'Time a worker process spent drawing a chart',
+    'render_wait_seconds': 'Time a chart waited for a free render worker',
+    'graph_cache_requests_total': 'Graph cache lookups, by result',
+    'series_store_requests_total': 'Reading array lookups, by whether they were cached, patched or loaded',
+    'aggregate_cache_requests_total': 'Data table and statistics cache lookups, by command and result',
+    'upload_bytes_total': 'Attachment bytes sent to Discord',
+    'event_loop_lag_seconds': 'How late a periodic event loop tick fired',
+    'alert_evaluations_total': 'Alert window checks after a write, by whether the window had to be re-read',
+    'alerts_total': 'Alerts raised, by type and delivery outcome',
+    'scheduler_jobs_total': 'Scheduled job runs, by kind and outcome',
+    'scheduler_lateness_seconds': 'How long after its scheduled time a job started',
+}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimates the q-quantile by linear interpolation inside the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+
+class Registry:
+    def __init__(self):
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}  # (name, labels) -> value
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def summary(self):
+        """Returns ([(name, labels, count, p50, p95, p99, max)], [(name, labels, value)]), sorted by name."""
+        with self._lock:
+            histograms = [(name, dict(labels), h.count, h.quantile(0.5), h.quantile(0.95), h.quantile(0.99), h.max)
+                          for (name, labels), h in sorted(self._histograms.items())]
+            counters = [(name, dict(labels), value) for (name, labels), value in sorted(self._counters.items())]
+        return histograms, counters
+
+    def prometheus_text(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                describe(name, 'histogram')
+                cumulative = 0
+                for bound, bucket_count in zip((*histogram.buckets, '+Inf'), histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            for (name, labels), value in sorted(self._counters.items()):
+                describe(name, 'counter')
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+registry = Registry()
+observe = registry.observe
+inc = registry.inc
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observes the duration of the with-block into histogram `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - start, **labels)
+
+
+def timed(name, **labels):
+    """Decorator observing each call's duration into histogram `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- EVENT LOOP LAG ---
+_lag_task = None
+
+
+async def _sample_loop_lag():
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        registry.observe('event_loop_lag_seconds', max(0.0, time.perf_counter() - start - LOOP_LAG_INTERVAL))
+
+
+def start_loop_lag_sampler():
+    """Starts sampling event-loop lag on the running loop (once)."""
+    global _lag_task
+    if _lag_task is None or _lag_task.done():
+        _lag_task = asyncio.get_running_loop().create_task(_sample_loop_lag())
+
+
+# --- HTTP ENDPOINT ---
+_runner = None
+
+
+async def _metrics_handler(request):
+    return web.Response(text=registry.prometheus_text(), content_type='text/plain', charset='utf-8',
+                        headers={'X-Content-Type-Options': 'nosniff'})
+
+
+async def start_http_server(host, port):
+    """Serves GET /metrics in the Prometheus text format on host:port (once)."""
+    global _runner
+    if _runner is not None:
+        return
+    try:
+        app = web.Application()
+        app.router.add_get('/metrics', _metrics_handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        _runner = runner
+        logger.info(f"📈 Metrics endpoint listening on http://{host}:{port}/metrics")
+    except OSError as e:
+        logger.error(f"❌ Could not start metrics endpoint on {host}:{port}: {e}")
@@ -0,0 +1,194 @@
+# scheduler.py
+"""Persistent scheduler for per-user reminders, weekly summaries and maintenance jobs.
+
+Jobs live in the scheduled_jobs table and, while the bot runs, in a heap ordered by their next
+run. A single coroutine sleeps until the earliest one is due, so adding or firing a job costs
+O(log n) however many users have jobs. Times are wall-clock times in each job's own timezone.
+After a restart, jobs whose run was missed fire once (unless their kind allows only a grace period).
+"""
+
+import asyncio
+import heapq
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import pytz
+
+import async_db
+import metrics
+from config import TIMEZONE
+from utils import logger
+
+MAX_SLEEP = 60  # Seconds; bounds the sleep so a system clock change is noticed
+MAX_CONCURRENT = 8  # Handlers running at once when many jobs are due together
+SYSTEM = (0, 0)  # Tenant of jobs that belong to the bot rather than a user
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    tenant: tuple
+    key: str  # Tells apart jobs of one kind and tenant (e.g. the reminder slot)
+    channel_id: int
+    timezone: str
+    at_time: str  # 'HH:MM' local time
+    weekday: int  # 0 = Monday; None runs daily
+    next_run: int  # Unix time
+    last_run: int = None
+
+    @classmethod
+    def from_row(cls, row):
+        job_id, kind, guild_id, user_id, key, channel_id, timezone, at_time, weekday, next_run, last_run = row
+        return cls(job_id, kind, (guild_id, user_id), key, channel_id, timezone, at_time, weekday, next_run,
+                   last_run)
+
+    def local_time(self, timestamp):
+        """The naive local datetime of a Unix time in the job's timezone."""
+        return datetime.fromtimestamp(timestamp, pytz.timezone(self.timezone)).replace(tzinfo=None)
+
+
+def parse_time(value):
+    """Parses 'HH:MM' (or 'H:MM') into a normalized 'HH:MM' string. Raises ValueError if invalid."""
+    return datetime.strptime(value, '%H:%M').strftime('%H:%M')
+
+
+def next_run_after(at_time, weekday, timezone, after):
+    """Returns the first Unix time after `after` when the local clock of `timezone` reads at_time.
+
+    Local times skipped by a DST change run when the clock jumps past them.
+    """
+    tz = pytz.timezone(timezone)
+    hour, minute = map(int, at_time.split(':'))
+    local_day = datetime.fromtimestamp(after, tz).date()
+    for offset in range(8):
+        day = local_day + timedelta(days=offset)
+        if weekday is not None and day.weekday() != weekday:
+            continue
+        moment = tz.normalize(tz.localize(datetime(day.year, day.month, day.day, hour, minute)))
+        if moment.timestamp() > after:
+            return int(moment.timestamp())
+    return int(after) + 7 * 86400  # Unreachable: some day of the next 8 matches
+
+
+class Scheduler:
+    def __init__(self):
+        self._jobs = {}  # id -> Job
+        self._heap = []  # (next_run, id); entries whose job was changed or removed are skipped when popped
+        self._handlers = {}  # kind -> (async handler(job), misfire grace in seconds or None)
+        self._running = set()
+        self._slots = None
+        self._wake = None
+        self._task = None
+
+    def register(self, kind, handler, misfire_grace=None):
+        """Sets the coroutine run for jobs of `kind`; runs later than misfire_grace seconds are skipped."""
+        self._handlers[kind] = (handler, misfire_grace)
+
+    async def start(self):
+        """Loads the persisted jobs and starts the scheduling coroutine (once)."""
+        if self._task is not None:
+            return
+        rows = await async_db.load_jobs()
+        for row in rows or []:
+            self._push(Job.from_row(row))
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(MAX_CONCURRENT)
+        self._task = asyncio.create_task(self._run())
+        overdue = sum(1 for job in self._jobs.values() if job.next_run <= time.time())
+        logger.info(f"⏰ Scheduler started - Jobs: {len(self._jobs)}, overdue: {overdue}")
+
+    def _push(self, job):
+        self._jobs[job.id] = job
+        heapq.heappush(self._heap, (job.next_run, job.id))
+        if self._wake is not None:
+            self._wake.set()
+
+    def jobs_of(self, tenant, kind=None):
+        """A tenant's jobs, soonest first."""
+        tenant = tuple(tenant)
+        return sorted((job for job in self._jobs.values() if job.tenant == tenant and kind in (None, job.kind)),
+                      key=lambda job: job.next_run)
+
+    async def schedule(self, kind, tenant, at_time, timezone=TIMEZONE, weekday=None, key='', channel_id=None):
+        """Creates or replaces the (kind, tenant, key) job and returns it, or None if it couldn't be saved."""
+        next_run = next_run_after(at_time, weekday, timezone, time.time())
+        job_id = await async_db.save_job(kind, tuple(tenant), key, channel_id, timezone, at_time, weekday, next_run)
+        if job_id is None:
+            return None
+        job = Job(job_id, kind, tuple(tenant), key, channel_id, timezone, at_time, weekday, next_run,
+                  self._jobs[job_id].last_run if job_id in self._jobs else None)
+        self._push(job)
+        return job
+
+    async def ensure(self, kind, at_time, timezone=TIMEZONE, tenant=SYSTEM, key='', channel_id=None):
+        """Schedules a daily job unless it already exists with the same time, keeping its pending run."""
+        for job in self.jobs_of(tenant, kind):
+            if (job.key, job.at_time, job.timezone, job.weekday, job.channel_id) == (key, at_time, timezone, None,
+                                                                                    channel_id):
+                return job
+        return await self.schedule(kind, tenant, at_time, timezone, key=key, channel_id=channel_id)
+
+    async def cancel(self, kind, tenant, key=None):
+        """Removes a tenant's jobs of one kind (only `key` if given). Returns how many were removed."""
+        removed = await async_db.delete_jobs(kind, tuple(tenant), key)
+        for job_id in removed:
+            self._jobs.pop(job_id, None)
+        return len(removed)
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                next_run, job_id = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                if job is not None and job.next_run == next_run:
+                    due.append(job)
+
+            if due:
+                # Reschedule before running so a slow handler can't make a job fire twice
+                runs = []
+                for job in due:
+                    scheduled = job.next_run
+                    job.next_run = next_run_after(job.at_time, job.weekday, job.timezone, now)
+                    job.last_run = int(now)
+                    heapq.heappush(self._heap, (job.next_run, job.id))
+                    runs.append((job.id, job.next_run, job.last_run))
+                    self._fire(job, now - scheduled)
+                await async_db.set_job_runs(runs)
+                continue
+
+            timeout = min(self._heap[0][0] - now, MAX_SLEEP) if self._heap else MAX_SLEEP
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, job, lateness):
+        handler, grace = self._handlers.get(job.kind, (None, None))
+        if handler is None:
+            logger.warning(f"⚠️ No handler for scheduled job kind '{job.kind}'")
+            return
+        if grace is not None and lateness > grace:
+            metrics.inc('scheduler_jobs_total', kind=job.kind, result='skipped')
+            logger.info(f"⏭️ Skipped {job.kind} job {job.id}, {lateness / 60:.0f} minutes late")
+            return
+        metrics.observe('scheduler_lateness_seconds', max(0.0, lateness), kind=job.kind)
+        task = asyncio.create_task(self._call(handler, job))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _call(self, handler, job):
+        try:
+            async with self._slots:
+                await handler(job)
+            metrics.inc('scheduler_jobs_total', kind=job.kind, result='ok')
+        except Exception as e:
+            metrics.inc('scheduler_jobs_total', kind=job.kind, result='error')
+            logger.error(f"❌ Error in scheduled {job.kind} job {job.id}: {e}")
+
+
+scheduler = Scheduler()
@@ -0,0 +1,236 @@
+# series_store.py
+"""In-memory store of each user's readings as compact NumPy arrays, for the graph and data commands.
+
+A user's history is four parallel arrays sorted by day: int32 epoch days, uint8 slot codes and int16
+systolic / diastolic values (9 bytes per reading). It is loaded on first use; writes through db.py
+only mark the touched days, and the next request re-reads just those days and splices them in.
+Users are evicted least recently used first once the arrays exceed SERIES_CACHE_MB.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+import db
+import metrics
+from analytics import SLOTS, FULL_RELOAD_DAYS
+from config import SERIES_CACHE_MB
+
+OVERHEAD_BYTES = 512  # Rough per-user cost of the Python objects around the arrays
+
+
+def _epoch_day(day):
+    """Days since 1970-01-01 of a date or an ISO 'YYYY-MM-DD' string."""
+    return int(np.datetime64(day if isinstance(day, str) else db.day_key(day), 'D').astype(np.int64))
+
+
+def _valid_day(day):
+    try:
+        date.fromisoformat(day)
+        return True
+    except ValueError:
+        return False
+
+
+def _columns(rows):
+    """Splits (day, time_slot, systolic, diastolic) rows into the four compact arrays."""
+    try:
+        days = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    except ValueError:
+        # Malformed legacy days are dropped, as query_records does
+        rows = [row for row in rows if _valid_day(row[0])]
+        days = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    return (days.astype(np.int32),
+            np.array([SLOTS.get(row[1], SLOTS['afternoon']) for row in rows], dtype=np.uint8),
+            np.array([row[2] for row in rows], dtype=np.int16),
+            np.array([row[3] for row in rows], dtype=np.int16))
+
+
+@dataclass
+class Readings:
+    """Rows sliced from the store: days as datetime64[D], with the pressures and readings behind each row."""
+    days: np.ndarray
+    systolic: np.ndarray
+    diastolic: np.ndarray
+    readings: np.ndarray
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def empty(self):
+        return not len(self.days)
+
+    def dates(self):
+        """The days as a list of datetime.date."""
+        return self.days.astype(object).tolist()
+
+
+class UserReadings:
+    """One user's readings; rows of a day stay in the order they were taken."""
+
+    def __init__(self, rows):
+        self.days, self.slots, self.systolic, self.diastolic = _columns(rows)
+        self.nbytes = self._size()
+
+    def _size(self):
+        return self.days.nbytes + self.slots.nbytes + self.systolic.nbytes + self.diastolic.nbytes + OVERHEAD_BYTES
+
+    def patch(self, days, rows):
+        """Replaces the readings of epoch `days` with `rows` (which hold only those days).
+
+        Only the arrays from the earliest touched day onwards are rebuilt, so a write to a recent day
+        costs about as much as the readings after it.
+        """
+        cut = int(np.searchsorted(self.days, min(days)))
+        old = [array[cut:] for array in (self.days, self.slots, self.systolic, self.diastolic)]
+        keep = ~np.isin(old[0], np.array(sorted(days), dtype=np.int32))
+        tail = [np.concatenate([array[keep], new]) for array, new in zip(old, _columns(rows))]
+        order = np.argsort(tail[0], kind='stable')
+        self.days, self.slots, self.systolic, self.diastolic = (
+            np.concatenate([array[:cut], part[order]])
+            for array, part in zip((self.days, self.slots, self.systolic, self.diastolic), tail))
+        self.nbytes = self._size()
+
+    def _select(self, start, end, slot):
+        lo = int(np.searchsorted(self.days, _epoch_day(start))) if start is not None else 0
+        hi = int(np.searchsorted(self.days, _epoch_day(end), side='right')) if end is not None else len(self.days)
+        days, systolic, diastolic = self.days[lo:hi], self.systolic[lo:hi], self.diastolic[lo:hi]
+        if slot is not None:
+            match = self.slots[lo:hi] == SLOTS[slot]
+            days, systolic, diastolic = days[match], systolic[match], diastolic[match]
+        return days, systolic, diastolic
+
+    def readings(self, start=None, end=None, slot=None):
+        days, systolic, diastolic = self._select(start, end, slot)
+        return Readings(days.astype('datetime64[D]'), systolic.copy(), diastolic.copy(),
+                        np.ones(len(days), dtype=np.int32))
+
+    def daily(self, start=None, end=None, slot=None):
+        days, systolic, diastolic = self._select(start, end, slot)
+        if not len(days):
+            return Readings(days.astype('datetime64[D]'), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int32))
+        # Rows are sorted by day, so each day is one run: sum the runs and divide by their lengths
+        first = np.flatnonzero(np.concatenate([[True], days[1:] != days[:-1]]))
+        counts = np.diff(np.append(first, len(days)))
+        return Readings(days[first].astype('datetime64[D]'),
+                        np.add.reduceat(systolic.astype(np.int64), first) / counts,
+                        np.add.reduceat(diastolic.astype(np.int64), first) / counts,
+                        counts.astype(np.int32))
+
+
+class SeriesStore:
+    def __init__(self, budget_bytes=SERIES_CACHE_MB * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self._users = OrderedDict()  # tenant -> UserReadings, least recently used first
+        self._used = 0
+        self._dirty = {}  # tenant -> ISO days written since its arrays were last refreshed
+        self._loading = {}  # tenant -> Event set once its in-flight load or patch is stored
+        # Invalidation arrives on the database writer thread, requests on the reader threads
+        self._lock = threading.Lock()
+
+    def invalidate_days(self, tenant, days):
+        """Write listener: marks days of a cached (or loading) tenant for refresh."""
+        tenant = tuple(tenant)
+        with self._lock:
+            if tenant in self._users or tenant in self._loading:
+                self._dirty.setdefault(tenant, set()).update(days)
+
+    def _refresh(self, tenant):
+        """Returns the tenant's up-to-date readings, loading or patching them; None if the database failed.
+
+        One request refreshes a tenant at a time. Its dirty days are taken before the patch is stored, so
+        other requests for the tenant wait for it instead of serving the unpatched arrays as a hit.
+        """
+        while True:
+            with self._lock:
+                loading = self._loading.get(tenant)
+                if loading is None:
+                    user = self._users.get(tenant)
+                    dirty = self._dirty.pop(tenant, None)
+                    if user is not None and not dirty:
+                        self._users.move_to_end(tenant)
+                        metrics.inc('series_store_requests_total', result='hit')
+                        return user
+                    loading = self._loading[tenant] = threading.Event()
+                    break
+            loading.wait()
+
+        try:
+            return self._fetch(tenant, user, dirty)
+        finally:
+            with self._lock:
+                del self._loading[tenant]
+            loading.set()
+
+    def _fetch(self, tenant, user, dirty):
+        """Patches the dirty days into the tenant's cached readings, or loads them whole, and stores the result."""
+        try:
+            if user is not None and len(dirty) <= FULL_RELOAD_DAYS:
+                rows = db.tenant_readings(tenant, dirty)
+                if rows is None:
+                    raise LookupError
+                days = [_epoch_day(day) for day in dirty if _valid_day(day)]
+                with self._lock:
+                    cached = self._users.get(tenant) is user
+                    if days:
+                        self._used -= user.nbytes if cached else 0
+                        user.patch(days, rows)
+                        self._used += user.nbytes if cached else 0
+                metrics.inc('series_store_requests_total', result='patch')
+            else:
+                rows = db.tenant_readings(tenant)
+                if rows is None:
+                    raise LookupError
+                loaded = UserReadings(rows)
+                with self._lock:
+                    if user is not None and self._users.get(tenant) is user:
+                        self._used -= self._users.pop(tenant).nbytes
+                    user = loaded
+                metrics.inc('series_store_requests_total', result='load')
+        except LookupError:
+            with self._lock:
+                if dirty:
+                    self._dirty.setdefault(tenant, set()).update(dirty)
+            return None
+
+        with self._lock:
+            if tenant not in self._users:
+                self._users[tenant] = user
+                self._used += user.nbytes
+            self._users.move_to_end(tenant)
+            # The requesting user is always kept, even if their history alone exceeds the budget
+            while self._used > self.budget_bytes and len(self._users) > 1:
+                evicted_tenant, evicted = self._users.popitem(last=False)
+                self._used -= evicted.nbytes
+                self._dirty.pop(evicted_tenant, None)
+        return user
+
+    def readings(self, tenant, start=None, end=None, slot=None):
+        """Returns a tenant's individual readings in [start, end] (optionally one slot) as Readings, in day order.
+
+        Returns None if the database could not be read. Runs on a database reader thread.
+        """
+        user = self._refresh(tuple(tenant))
+        if user is None:
+            return None
+        with self._lock:
+            return user.readings(start, end, slot)
+
+    def daily(self, tenant, start=None, end=None, slot=None):
+        """Returns a tenant's daily mean pressures in [start, end] (optionally one slot) as Readings, in day order.
+
+        Returns None if the database could not be read. Runs on a database reader thread.
+        """
+        user = self._refresh(tuple(tenant))
+        if user is None:
+            return None
+        with self._lock:
+            return user.daily(start, end, slot)
+
+
+store = SeriesStore()
+db.add_write_listener(store.invalidate_days)
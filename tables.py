@@ -0,0 +1,130 @@
+# tables.py
+"""Fixed-width text tables for Discord messages, formatted a column at a time.
+
+Columns are NumPy string arrays: dates and numbers are converted in one vectorized pass, padded
+with np.char and concatenated row-wise, so a year-long table costs a handful of array operations
+instead of one f-string and strftime per row. paginate() then splits the rows into messages that
+each fit Discord's 2000-character limit, repeating the header and footer on every page.
+"""
+
+import discord
+import numpy as np
+
+MESSAGE_LIMIT = 2000
+PAGE_SUFFIX_RESERVE = 16  # Room kept in the title for " (page 12/34)"
+PAGE_TIMEOUT = 180
+
+# Character positions in 'YYYY-MM-DD' of the two-digit day, month and year
+_DAY, _MONTH, _YEAR = [8, 9], [5, 6], [2, 3]
+
+
+def format_days(days, sep='-'):
+    """Formats dates (datetime64, datetime.date or ISO strings) as 'dd-mm-yy' (with `sep`) strings."""
+    iso = np.datetime_as_string(np.asarray(days, dtype='datetime64[D]'), unit='D')
+    if not len(iso):
+        return iso
+    chars = np.ascontiguousarray(iso.astype('<U10')).view('<U1').reshape(len(iso), 10)
+    pick = np.concatenate([chars[:, _DAY], np.full((len(iso), 1), sep), chars[:, _MONTH],
+                           np.full((len(iso), 1), sep), chars[:, _YEAR]], axis=1)
+    return np.ascontiguousarray(pick).view('<U8').ravel()
+
+
+def format_decimal(values, decimals=1):
+    """Formats numbers rounded to `decimals` places, as str(round(value, decimals)) would (e.g. '120.0')."""
+    scale = 10 ** decimals
+    whole, fraction = np.divmod(np.rint(np.asarray(values, dtype=float) * scale).astype(np.int64), scale)
+    return concat(whole.astype(str), '.', np.char.zfill(fraction.astype(str), decimals))
+
+
+def format_int(values):
+    return np.asarray(values, dtype=np.int64).astype(str)
+
+
+def left(column, width):
+    return np.char.ljust(column, width)
+
+
+def right(column, width):
+    return np.char.rjust(column, width)
+
+
+def concat(*parts):
+    """Joins columns and literal strings element-wise into one string column."""
+    result = parts[0]
+    for part in parts[1:]:
+        result = np.char.add(result, part)
+    return result
+
+
+def paginate(title, lines, header=(), footer=(), limit=MESSAGE_LIMIT):
+    """Splits `lines` into message pages of at most `limit` characters.
+
+    Each page is the title (numbered when there are several pages), the header lines, its rows and
+    the footer lines. Returns a tuple of page strings; one page when everything fits.
+    """
+    lines = list(lines)
+    fixed = sum(len(line) + 1 for line in (title, *header, *footer)) + PAGE_SUFFIX_RESERVE
+    chunks, chunk, size = [], [], fixed
+    for line in lines:
+        if chunk and size + len(line) + 1 > limit:
+            chunks.append(chunk)
+            chunk, size = [], fixed
+        chunk.append(line)
+        size += len(line) + 1
+    chunks.append(chunk)
+
+    pages = []
+    for number, chunk in enumerate(chunks, 1):
+        heading = f"{title} (page {number}/{len(chunks)})" if len(chunks) > 1 else title
+        pages.append('\n'.join([heading, *header, *chunk, *footer]))
+    return tuple(pages)
+
+
+class PagesView(discord.ui.View):
+    """Turns through prebuilt message pages with Previous/Next buttons, starting at the last one."""
+
+    def __init__(self, author_id, pages):
+        super().__init__(timeout=PAGE_TIMEOUT)
+        self.author_id = author_id
+        self.pages = pages
+        self.index = len(pages) - 1
+        self.message = None
+        self._update()
+
+    def _update(self):
+        self.previous.disabled = self.index == 0
+        self.next.disabled = self.index == len(self.pages) - 1
+
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.author_id
+
+    async def _turn(self, interaction, step):
+        self.index = min(max(self.index + step, 0), len(self.pages) - 1)
+        self._update()
+        await interaction.response.edit_message(content=self.pages[self.index], view=self)
+
+    @discord.ui.button(label='◀ Previous', style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction, button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label='Next ▶', style=discord.ButtonStyle.secondary)
+    async def next(self, interaction, button):
+        await self._turn(interaction, 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+
+async def send_pages(ctx, pages):
+    """Sends one page as is, or several behind Previous/Next buttons opened on the last (newest) page."""
+    if len(pages) == 1:
+        await ctx.send(pages[0])
+        return
+    view = PagesView(ctx.author.id, pages)
+    view.message = await ctx.send(pages[-1], view=view)
@@ -0,0 +1,20 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+TENANT = (1, 100)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A fresh database at the current schema version, used through db.connections()."""
+    monkeypatch.setattr(db, 'DB_NAME', str(tmp_path / 'test.db'))
+    db.setup_db()
+    yield db
+    db.close_connections()
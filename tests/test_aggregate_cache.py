@@ -0,0 +1,56 @@
+# tests/test_aggregate_cache.py
+from datetime import date
+
+from aggregate_cache import AggregateCache
+from conftest import TENANT
+
+DAY = date(2025, 3, 10)
+KEY = ('total', None, None)
+
+
+def test_generation_counts_committed_writes_per_tenant(database):
+    start, other = database.generation(TENANT), database.generation((1, 200))
+    record_id, _, _ = database.save_data(TENANT, DAY, 'morning', 120, 80)
+    database.update_data(TENANT, DAY, 'morning', 125, 82)
+    assert database.generation(TENANT) == start + 2
+    assert database.generation((1, 200)) == other
+
+    # Nothing committed, nothing bumped
+    assert not database.delete_record(TENANT, record_id + 1)
+    assert database.generation(TENANT) == start + 2
+
+
+def test_listeners_run_before_the_bump(database, monkeypatch):
+    seen = []
+    monkeypatch.setattr(database, '_write_listeners', [lambda tenant, days: seen.append(database.generation(tenant))])
+    start = database.generation(TENANT)
+    database.save_data(TENANT, DAY, 'morning', 120, 80)
+    assert seen == [start] and database.generation(TENANT) == start + 1
+
+
+def test_entry_is_only_reused_at_its_generation(database):
+    cache = AggregateCache()
+    generation = database.generation(TENANT)
+    # A write lands while the pages are being built from the older data
+    database.save_data(TENANT, DAY, 'morning', 120, 80)
+    cache.put(TENANT, KEY, generation, 'old pages')
+
+    assert cache.get(TENANT, KEY, database.generation(TENANT)) is None
+    cache.put(TENANT, KEY, database.generation(TENANT), 'new pages')
+    assert cache.get(TENANT, KEY, database.generation(TENANT)) == 'new pages'
+    assert cache.get((1, 200), KEY, database.generation(TENANT)) is None
+
+
+def test_ttl_and_least_recently_used_eviction(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('aggregate_cache.time.monotonic', lambda: now[0])
+    cache = AggregateCache(max_entries=2, ttl=60)
+    cache.put(TENANT, ('data', 1), 0, 'one')
+    cache.put(TENANT, ('data', 2), 0, 'two')
+    assert cache.get(TENANT, ('data', 1), 0) == 'one'
+    cache.put(TENANT, ('data', 3), 0, 'three')  # Evicts ('data', 2), used least recently
+    assert cache.get(TENANT, ('data', 2), 0) is None
+    assert cache.get(TENANT, ('data', 1), 0) == 'one'
+
+    now[0] += 61
+    assert cache.get(TENANT, ('data', 3), 0) is None
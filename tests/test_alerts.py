@@ -0,0 +1,139 @@
+# tests/test_alerts.py
+import asyncio
+import threading
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import alerts
+from alerts import Alert, AlertEngine, AlertQueue, HYPERTENSION, HYPOTENSION, Thresholds
+from conftest import TENANT
+
+END = date(2025, 3, 31)
+HOUR = 3600
+
+
+@pytest.fixture
+def engine(database):
+    return AlertEngine(Thresholds(135, 85, 90, 60), window_days=4, min_days=3, repeat_hours=24)
+
+
+def _register(database, sys, dia, days, end=END):
+    for offset in range(days):
+        database.save_data(TENANT, end - timedelta(days=offset), 'morning', sys, dia)
+    return {database.day_key(end - timedelta(days=offset)) for offset in range(days)}
+
+
+def test_needs_min_days(database, engine):
+    _register(database, 160, 100, 2)
+    assert engine.evaluate(TENANT, now=0) is None
+
+
+def test_alert_repeats_only_after_repeat_hours(database, engine):
+    _register(database, 150, 95, 3)
+    alert = engine.evaluate(TENANT, now=0)
+    assert (alert.kind, alert.avg_sys, alert.avg_dia) == (HYPERTENSION, 150, 95)
+    assert alert.days == ['2025-03-29', '2025-03-30', '2025-03-31']
+
+    assert engine.evaluate(TENANT, now=23 * HOUR) is None
+    assert engine.evaluate(TENANT, now=25 * HOUR).kind == HYPERTENSION
+
+
+def test_write_patches_window_and_back_in_range_resets(database, engine):
+    _register(database, 150, 95, 3)
+    assert engine.evaluate(TENANT, now=0).kind == HYPERTENSION
+
+    # A fourth, very low day brings the 4-day average to 125/80
+    days = _register(database, 75, 35, 1, end=END + timedelta(days=1))
+    assert engine.evaluate(TENANT, days, now=HOUR) is None
+    assert len(engine._windows[TENANT].days) == 4
+
+    # The window is full, so a day older than all of it can't change the average
+    old = _register(database, 60, 40, 1, end=END - timedelta(days=30))
+    assert engine.evaluate(TENANT, old, now=2 * HOUR) is None
+    assert '2025-03-01' not in engine._windows[TENANT].days
+
+    # Out of range again after being back in range: alerts at once, without waiting for repeat_hours
+    days = _register(database, 200, 120, 1, end=END + timedelta(days=1))
+    assert engine.evaluate(TENANT, days, now=3 * HOUR).kind == HYPERTENSION
+
+
+def test_emptied_day_reloads_an_older_one(database, engine):
+    _register(database, 80, 50, 4, end=END - timedelta(days=1))
+    record_id, _, _ = database.save_data(TENANT, END, 'morning', 80, 50)
+    assert engine.evaluate(TENANT, now=0).kind == HYPOTENSION
+    database.delete_record(TENANT, record_id)
+    engine.evaluate(TENANT, {'2025-03-31'}, now=HOUR)
+    assert sorted(engine._windows[TENANT].days) == ['2025-03-27', '2025-03-28', '2025-03-29', '2025-03-30']
+
+
+def test_reload_does_not_overwrite_a_newer_patch(database, engine, monkeypatch):
+    # Regression: check_all's reload, read before a write, used to replace the window the write had patched
+    _register(database, 120, 80, 3)
+    engine.evaluate(TENANT, now=0)
+    loaded, release = threading.Event(), threading.Event()
+    recent_daily_sums = database.recent_daily_sums
+
+    def slow_recent_daily_sums(tenant, limit):
+        rows = recent_daily_sums(tenant, limit)
+        loaded.set()
+        release.wait(5)
+        return rows
+
+    monkeypatch.setattr(database, 'recent_daily_sums', slow_recent_daily_sums)
+    reload = threading.Thread(target=engine.evaluate, args=(TENANT,), kwargs={'now': 0})
+    reload.start()
+    assert loaded.wait(5)
+    days = _register(database, 120, 80, 1, end=END + timedelta(days=1))
+    patch = threading.Thread(target=engine.evaluate, args=(TENANT, days), kwargs={'now': 0})
+    patch.start()
+    patch.join(0.2)
+    assert patch.is_alive()  # Waits for the reload instead of racing it
+
+    release.set()
+    reload.join(5)
+    patch.join(5)
+    assert '2025-04-01' in engine._windows[TENANT].days
+
+
+class _Member:
+    def __init__(self, status=None):
+        self.sent = []
+        self.status = status
+
+    async def send(self, content=None, *, file=None):
+        if self.status:
+            raise discord.HTTPException(SimpleNamespace(status=self.status, reason='refused'), 'refused')
+        self.sent.append(content)
+
+
+class _Guild:
+    def __init__(self, members):
+        self.members = members
+
+    def get_member(self, user_id):
+        return None  # Not cached, as without the members intent
+
+    async def fetch_member(self, user_id):
+        return self.members[user_id]
+
+
+def _alert(user_id):
+    return Alert((1, user_id), HYPERTENSION, 150.0, 95.0, ['2025-03-31'], [150.0], [95.0])
+
+
+def test_alerts_go_to_the_user_by_direct_message(monkeypatch):
+    async def render(spec):
+        return b'png'
+
+    monkeypatch.setattr(alerts, 'render', render)
+    member, closed = _Member(), _Member(status=403)
+    queue = AlertQueue(_Guild({100: member, 200: closed}))
+
+    asyncio.run(queue._deliver(_alert(100)))
+    asyncio.run(queue._deliver(_alert(200)))
+    assert len(member.sent) == 1
+    assert '150.0/95.0' in member.sent[0] and '<@' not in member.sent[0]
+    assert closed.sent == []
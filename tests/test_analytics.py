@@ -0,0 +1,84 @@
+# tests/test_analytics.py
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from analytics import AnalyticsEngine
+from conftest import TENANT
+
+END = date(2025, 3, 31)
+
+
+@pytest.fixture
+def engine(database, monkeypatch):
+    engine = AnalyticsEngine()
+    monkeypatch.setattr(database, '_write_listeners', [engine.invalidate_days])
+    return engine
+
+
+def test_window_statistics(database, engine):
+    # Last 7 days: daily means 120/80, 124/82 and 128/84 (morning 130/86 and night 126/82 on the 31st)
+    database.save_data(TENANT, END - timedelta(days=4), 'morning', 120, 80)
+    database.save_data(TENANT, END - timedelta(days=2), 'morning', 124, 82)
+    database.save_data(TENANT, END, 'morning', 130, 86)
+    database.save_data(TENANT, END, 'night', 126, 82)
+    # Previous 7 days: one reading
+    database.save_data(TENANT, END - timedelta(days=10), 'afternoon', 140, 90)
+
+    report = engine.report(TENANT, END)
+    current, previous = report[7]
+    assert (current.days, current.readings) == (3, 4)
+    np.testing.assert_allclose(current.mean, [124, 82])
+    np.testing.assert_allclose(current.sd, [4, 2])
+    np.testing.assert_allclose(current.arv, [4, 2])
+    np.testing.assert_allclose(current.morning_night, [4, 4])
+    assert (previous.days, previous.readings) == (1, 1)
+    assert np.isnan(previous.sd).all() and np.isnan(previous.morning_night).all()
+
+    current, previous = report[30]
+    assert current.days == 4 and previous is None
+    assert engine.report((1, 200), END)[7] == (None, None)
+
+
+def test_writes_are_patched_in(database, engine):
+    database.save_data(TENANT, END, 'morning', 120, 80)
+    engine.report(TENANT, END)
+
+    database.save_data(TENANT, END, 'night', 140, 90)
+    # Before the loaded origin, so the series is reloaded rather than patched
+    database.save_data(TENANT, END - timedelta(days=3), 'morning', 100, 70)
+    current, _ = engine.report(TENANT, END)[7]
+    assert (current.days, current.readings) == (2, 3)
+    np.testing.assert_allclose(current.mean, [115, 77.5])
+
+
+def test_concurrent_report_waits_for_the_patch(database, engine, monkeypatch):
+    # Regression: a second report used to find the dirty days already taken and use the unpatched series
+    database.save_data(TENANT, END, 'morning', 120, 80)
+    engine.report(TENANT, END)
+    database.update_data(TENANT, END, 'morning', 150, 95)
+
+    patching, release = threading.Event(), threading.Event()
+    daily_slot_sums = database.daily_slot_sums
+
+    def slow_daily_slot_sums(tenant, days=None):
+        patching.set()
+        release.wait(5)
+        return daily_slot_sums(tenant, days)
+
+    monkeypatch.setattr(database, 'daily_slot_sums', slow_daily_slot_sums)
+    results = []
+    first = threading.Thread(target=lambda: results.append(engine.report(TENANT, END)))
+    first.start()
+    assert patching.wait(5)
+    second = threading.Thread(target=lambda: results.append(engine.report(TENANT, END)))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()
+
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert [report[7][0].mean.tolist() for report in results] == [[150, 95]] * 2
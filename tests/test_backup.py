@@ -0,0 +1,55 @@
+# tests/test_backup.py
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import backup
+from conftest import TENANT
+
+
+def _name(stamp):
+    return f"backup_{stamp.strftime('%Y%m%d_%H%M%S')}.db.gz"
+
+
+def test_backup_verifies_and_restores(database, tmp_path):
+    database.save_data(TENANT, date(2025, 3, 10), 'morning', 120, 80)
+    path = backup.create_backup(str(tmp_path / 'backups'))
+    assert path is not None and os.path.exists(f"{path}.sha256")
+    assert backup.latest_backup(str(tmp_path / 'backups')) == path
+    assert backup.verify_backup(path) == (True, f"schema v{database.SCHEMA_VERSION}, 1 records")
+
+    target = str(tmp_path / 'restored.db')
+    assert backup.restore_backup(path, target)[0]
+    conn = sqlite3.connect(target)
+    assert conn.execute("SELECT systolic, diastolic FROM records").fetchall() == [(120, 80)]
+    conn.close()
+    assert backup.restore_backup(path, target) == (False, f"{target} already exists")
+
+
+def test_corrupted_or_unchecked_backup_fails_verification(database, tmp_path):
+    path = backup.create_backup(str(tmp_path))
+    with open(path, 'r+b') as f:
+        f.seek(20)
+        f.write(b'\x00\x00')
+    assert backup.verify_backup(path) == (False, "checksum mismatch")
+
+    os.remove(f"{path}.sha256")
+    assert backup.verify_backup(path) == (False, "checksum file missing")
+
+
+def test_retention_keeps_newest_per_day_week_and_month():
+    now = datetime(2025, 3, 31, 3, 0)
+    names = [_name(now - timedelta(days=days)) for days in range(120)]
+    names.append(_name(now - timedelta(hours=2)))  # An older backup of the same day
+    names.append('notes.txt')
+
+    # Mar 31 is a Monday, so the weekly tier only adds Mar 23, the newest of the week before last
+    expired = backup.expired_backups(names, keep_daily=2, keep_weekly=3, keep_monthly=3)
+    kept = sorted(set(names) - set(expired) - {'notes.txt'})
+    assert 'notes.txt' not in expired and _name(now - timedelta(hours=2)) in expired
+    assert kept == sorted(_name(datetime(2025, month, day, 3, 0))
+                          for month, day in ((3, 31), (3, 30), (3, 23), (2, 28), (1, 31)))
+
+
+def test_latest_backup_without_directory(tmp_path):
+    assert backup.latest_backup(str(tmp_path / 'missing')) is None
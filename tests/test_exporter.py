@@ -0,0 +1,78 @@
+# tests/test_exporter.py
+import gzip
+from datetime import date, timedelta
+
+import pytest
+
+import exporter
+from conftest import TENANT
+from exporter import CSV_HEADER, export_records
+from importer import CsvImport
+
+START = date(2025, 1, 1)
+
+
+def _register(database, days):
+    for offset in range(days):
+        database.save_data(TENANT, START + timedelta(days=offset), 'morning', 120 + offset % 20, 80)
+        database.save_data(TENANT, START + timedelta(days=offset), 'night', 130, 85)
+
+
+def _read(result, index=0):
+    _, file = result.parts[index]
+    return file.read()
+
+
+def test_csv_round_trips_through_import(database):
+    _register(database, 3)
+    result = export_records(TENANT, 'bp')
+    assert ([name for name, _ in result.parts], result.rows) == (['bp.csv'], 6)
+    assert (result.first_day, result.last_day) == ('2025-01-01', '2025-01-03')
+
+    data = _read(result)
+    result.close()
+    assert data.decode('utf-8').splitlines()[0] == ','.join(CSV_HEADER)
+    rows = CsvImport(data).next_batch()
+    assert [row[:4] for row in rows] == [(START + timedelta(days=offset), slot, sys, dia)
+                                        for offset in range(3)
+                                        for slot, sys, dia in (('morning', 120 + offset, 80), ('night', 130, 85))]
+
+
+def test_filters_and_gzip(database):
+    _register(database, 10)
+    result = export_records(TENANT, 'bp', compress=True, start=START + timedelta(days=2),
+                            end=START + timedelta(days=4), slot='night')
+    assert [name for name, _ in result.parts] == ['bp.csv.gz']
+    lines = gzip.decompress(_read(result)).decode('utf-8').splitlines()
+    result.close()
+    assert [line.rsplit(',', 1)[0] for line in lines[1:]] == [f"0{day}-01-25,n,130,85" for day in (3, 4, 5)]
+
+
+def test_large_export_is_split_into_complete_parts(database, monkeypatch):
+    _register(database, 100)
+    monkeypatch.setattr(exporter, 'PART_HEADROOM', 0)
+    monkeypatch.setattr(exporter, 'CHUNK_ROWS', {'csv': 20, 'parquet': 20})
+    result = export_records(TENANT, 'bp', part_bytes=2048)
+    names = [name for name, _ in result.parts]
+    assert len(names) > 1 and names[0] == 'bp_part1.csv'
+
+    imported = []
+    for index in range(len(names)):
+        imported += CsvImport(_read(result, index), batch_size=1000).next_batch()
+    result.close()
+    assert len(imported) == result.rows == 200
+
+
+def test_parquet(database):
+    pq = pytest.importorskip('pyarrow.parquet')
+    _register(database, 3)
+    result = export_records(TENANT, 'bp', fmt='parquet')
+    table = pq.read_table(result.parts[0][1])
+    result.close()
+    assert table.column_names == ['day', 'time_slot', 'systolic', 'diastolic', 'record_date']
+    assert table.column('systolic').to_pylist() == [120, 130, 121, 130, 122, 130]
+
+
+def test_unknown_format_is_refused(database):
+    with pytest.raises(ValueError):
+        export_records(TENANT, 'bp', fmt='xlsx')
@@ -0,0 +1,45 @@
+# tests/test_graph_cache.py
+from datetime import date
+
+from graph_cache import GraphCache, make_key
+
+TENANT = (1, 100)
+START, END = date(2025, 3, 1), date(2025, 3, 31)
+KEY = make_key(TENANT, 'graph_month', START, END, None, 'March')
+
+
+def test_hit_returns_png_and_caption(tmp_path):
+    cache = GraphCache(1024 * 1024, str(tmp_path), 1024 * 1024)
+    cache.put(TENANT, KEY, START, END, b'png', 'caption', cache.version(TENANT))
+    assert cache.get(TENANT, KEY, START, END) == (b'png', 'caption')
+
+    # A new instance finds the chart on disk
+    assert GraphCache(1024 * 1024, str(tmp_path), 1024 * 1024).get(TENANT, KEY, START, END) == (b'png', 'caption')
+
+
+def test_write_in_period_drops_entry(tmp_path):
+    cache = GraphCache(1024 * 1024, str(tmp_path), 1024 * 1024)
+    cache.put(TENANT, KEY, START, END, b'png', 'caption', cache.version(TENANT))
+    cache.invalidate_days(TENANT, {'2025-04-02'})
+    assert cache.get(TENANT, KEY, START, END) is not None
+    cache.invalidate_days(TENANT, {'2025-03-15'})
+    assert cache.get(TENANT, KEY, START, END) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_chart_rendered_across_a_write_is_not_stored(tmp_path):
+    cache = GraphCache(1024 * 1024, str(tmp_path), 1024 * 1024)
+    version = cache.version(TENANT)
+    cache.invalidate_days(TENANT, {'2025-03-15'})  # Lands while the chart is being drawn
+    cache.put(TENANT, KEY, START, END, b'old data', 'caption', version)
+    assert cache.get(TENANT, KEY, START, END) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_old_disk_formats_are_removed(tmp_path):
+    digest = 'a' * 64
+    old = [f"2025-03-01_2025-03-31_{digest}.png", f"1_100_2025-03-01_2025-03-31_{digest}.png"]
+    for name in old + ['unrelated.png']:
+        (tmp_path / name).write_bytes(b'x')
+    GraphCache(1024 * 1024, str(tmp_path), 1024 * 1024)
+    assert [path.name for path in tmp_path.iterdir()] == ['unrelated.png']
@@ -0,0 +1,60 @@
+# tests/test_history.py
+from datetime import date, timedelta
+
+from conftest import TENANT
+
+START = date(2025, 1, 1)
+
+
+def _fill(database, count):
+    """Registers one morning reading a day; returns their (record_date, id) cursors, newest first."""
+    rows = [(START + timedelta(days=i), 'morning', 110 + i, 70, f"{START + timedelta(days=i)} 08:00:00")
+            for i in range(count)]
+    assert database.insert_records(TENANT, rows, policy='samples') == count
+    page, _ = database.history_page(TENANT, count)
+    return [(row[5], row[0]) for row in page]
+
+
+def test_first_page_is_newest_first(database):
+    cursors = _fill(database, 5)
+    page, more = database.history_page(TENANT, 3)
+    assert [(row[5], row[0]) for row in page] == cursors[:3]
+    assert [row[3] for row in page] == [114, 113, 112]
+    assert more
+
+
+def test_walk_older_then_newer(database):
+    cursors = _fill(database, 5)
+    page, more = database.history_page(TENANT, 3, before=cursors[2])
+    assert [(row[5], row[0]) for row in page] == cursors[3:]
+    assert not more
+
+    # Going back from the oldest page returns the rows just above it, still newest first
+    page, more = database.history_page(TENANT, 2, after=cursors[3])
+    assert [(row[5], row[0]) for row in page] == cursors[1:3]
+    assert more
+    page, more = database.history_page(TENANT, 2, after=cursors[1])
+    assert [(row[5], row[0]) for row in page] == cursors[:1]
+    assert not more
+
+
+def test_exact_fit_has_no_more(database):
+    _fill(database, 4)
+    page, more = database.history_page(TENANT, 4)
+    assert len(page) == 4 and not more
+
+
+def test_ties_on_record_date_are_ordered_by_id(database):
+    rows = [(START, slot, 120, 80, f"{START} 08:00:00") for slot in ('morning', 'afternoon', 'night')]
+    database.insert_records(TENANT, rows, policy='samples')
+    first, more = database.history_page(TENANT, 2)
+    assert more
+    rest, more = database.history_page(TENANT, 2, before=(first[-1][5], first[-1][0]))
+    assert not more
+    ids = [row[0] for row in first + rest]
+    assert ids == sorted(ids, reverse=True)
+
+
+def test_other_tenants_are_not_listed(database):
+    _fill(database, 2)
+    assert database.history_page((1, 200), 10) == ([], False)
@@ -0,0 +1,76 @@
+# tests/test_importer.py
+from datetime import date
+
+import pytest
+
+from importer import CsvImport, MAX_REPORTED_ERRORS
+
+HEADER = 'Date,Time_Slot,Systolic,Diastolic,Time_of_Record\n'
+
+
+def _csv(*lines, header=HEADER):
+    return (header + ''.join(f"{line}\n" for line in lines)).encode('utf-8')
+
+
+def test_parses_rows_and_slot_names():
+    reader = CsvImport(_csv('10-03-25,m,120,80,08:15:00', '1-3-25,Afternoon,125,82,', '10-03-25,n,118,79,21:30'))
+    assert reader.next_batch() == [
+        (date(2025, 3, 10), 'morning', 120, 80, '2025-03-10 08:15:00'),
+        (date(2025, 3, 1), 'afternoon', 125, 82, '2025-03-01 00:00:00'),
+        (date(2025, 3, 10), 'night', 118, 79, '2025-03-10 21:30:00'),
+    ]
+    assert reader.next_batch() == []
+    assert reader.rejected == 0
+
+
+def test_time_of_record_column_is_optional():
+    reader = CsvImport(_csv('10-03-25,m,120,80', header='Date,Time_Slot,Systolic,Diastolic\n'))
+    assert reader.next_batch() == [(date(2025, 3, 10), 'morning', 120, 80, '2025-03-10 00:00:00')]
+
+
+def test_byte_order_mark_is_ignored():
+    reader = CsvImport(b'\xef\xbb\xbf' + _csv('10-03-25,m,120,80,'))
+    assert len(reader.next_batch()) == 1
+
+
+def test_missing_columns_raise():
+    with pytest.raises(ValueError, match='Systolic, Diastolic'):
+        CsvImport(_csv('10-03-25,m', header='Date,Time_Slot\n'))
+    with pytest.raises(ValueError):
+        CsvImport(b'')
+
+
+def test_invalid_rows_are_counted_and_reported_by_line():
+    reader = CsvImport(_csv('10-03-25,m,120,80,', '31-02-25,m,120,80,', '10-03-25,x,120,80,',
+                            '10-03-25,m,abc,80,', '10-03-25,m,300,80,', '10-03-25,m,120,80,25:00:00'))
+    assert len(reader.next_batch()) == 1
+    assert reader.rejected == 5
+    assert [line for line, _ in reader.errors] == [3, 4, 5, 6, 7]
+    assert 'date' in reader.errors[0][1] and 'slot' in reader.errors[1][1]
+    assert 'out of range' in reader.errors[3][1] and 'time of record' in reader.errors[4][1]
+
+
+def test_reported_errors_are_capped():
+    reader = CsvImport(_csv(*['bad,m,120,80,'] * (MAX_REPORTED_ERRORS + 5)))
+    assert reader.next_batch() == []
+    assert reader.rejected == MAX_REPORTED_ERRORS + 5
+    assert len(reader.errors) == MAX_REPORTED_ERRORS
+
+
+def test_batches_respect_batch_size():
+    reader = CsvImport(_csv(*[f"{day:02d}-03-25,m,120,80," for day in range(1, 8)]), batch_size=3)
+    assert [len(reader.next_batch()) for _ in range(4)] == [3, 3, 1, 0]
+
+
+def test_non_utf8_file_is_rejected_before_any_row():
+    with pytest.raises(ValueError, match='line 3'):
+        CsvImport(_csv('10-03-25,m,120,80,') + b'10-03-25,a,\xff,80,\n')
+
+
+def test_malformed_csv_line_stops_reading():
+    oversized = '"' + 'a' * 200_000 + '"'
+    reader = CsvImport(_csv('10-03-25,m,120,80,', '11-03-25,m,120,80,', oversized, '12-03-25,m,120,80,'))
+    assert len(reader.next_batch()) == 2
+    line, reason = reader.stopped
+    assert line == 4 and 'field limit' in reason
+    assert reader.next_batch() == []
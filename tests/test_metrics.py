@@ -0,0 +1,57 @@
+# tests/test_metrics.py
+from datetime import date
+
+import pytest
+
+import metrics
+from conftest import TENANT
+from metrics import Histogram, Registry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = Registry()
+    monkeypatch.setattr(metrics, 'registry', registry)
+    monkeypatch.setattr(metrics, 'inc', registry.inc)
+    monkeypatch.setattr(metrics, 'observe', registry.observe)
+    return registry
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 0]
+    assert histogram.quantile(0.5) == 1.5  # Rank 2 of 4: halfway through the (1, 2] bucket
+    assert histogram.quantile(1.0) == 3.0  # Capped at the largest observation
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_summary_and_prometheus_text(registry):
+    registry.inc('commands_total', command='graph', outcome='ok')
+    registry.inc('commands_total', 2, command='graph', outcome='ok')
+    registry.inc('alerts_total', kind='say "hi"')
+    registry.observe('render_duration_seconds', 0.003)
+
+    histograms, counters = registry.summary()
+    assert counters == [('alerts_total', {'kind': 'say "hi"'}, 1),
+                        ('commands_total', {'command': 'graph', 'outcome': 'ok'}, 3)]
+    assert [(name, count) for name, _, count, *_ in histograms] == [('render_duration_seconds', 1)]
+
+    lines = registry.prometheus_text().splitlines()
+    assert '# TYPE render_duration_seconds histogram' in lines
+    assert 'render_duration_seconds_bucket{le="0.0025"} 0' in lines
+    assert 'render_duration_seconds_bucket{le="0.005"} 1' in lines
+    assert 'render_duration_seconds_bucket{le="+Inf"} 1' in lines
+    assert 'commands_total{command="graph",outcome="ok"} 3' in lines
+    assert 'alerts_total{kind="say \\"hi\\""} 1' in lines
+
+
+def test_database_calls_are_timed_and_counted(database, registry):
+    database.save_data(TENANT, date(2025, 3, 10), 'morning', 120, 80)
+    database.monthly_slot_sums(TENANT)
+
+    histograms, counters = registry.summary()
+    timed = {labels['operation']: count for name, labels, count, *_ in histograms if name == 'db_duration_seconds'}
+    assert timed['save_data'] == 1 and timed['monthly_slot_sums'] == 1
+    assert ('db_rows_read_total', {'operation': 'monthly_slot_sums'}, 1) in counters
@@ -0,0 +1,66 @@
+# tests/test_migrations.py
+import sqlite3
+
+import pytest
+
+import db
+
+LEGACY_ROWS = [('05-03-25', 'morning', 120, 80, '2025-03-05 08:00:00'),
+               ('05-03-25', 'morning', 125, 82, '2025-03-05 08:05:00'),
+               ('06-03-25', 'night', 130, 85, '2025-03-06 22:00:00')]
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A database in the layout from before any schema migration, holding LEGACY_ROWS."""
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE records (id INTEGER PRIMARY KEY AUTOINCREMENT, day TEXT, time_slot TEXT, "
+                 "systolic INTEGER, diastolic INTEGER, record_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.executemany("INSERT INTO records (day, time_slot, systolic, diastolic, record_date) VALUES (?, ?, ?, ?, ?)",
+                     LEGACY_ROWS)
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db, 'DB_NAME', path)
+    yield path
+    db.close_connections()
+
+
+def _version():
+    with db.connections().read() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def test_upgrade_without_legacy_owner_is_refused(legacy_db, monkeypatch):
+    monkeypatch.setattr(db, 'LEGACY_USER_ID', 0)
+    assert db.setup_db() is False
+    # Stopped before v3: the tenant columns were not added
+    assert _version() == 2
+    with db.connections().read() as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(records)")]
+    assert 'user_id' not in columns
+
+
+def test_upgrade_assigns_legacy_owner(legacy_db, monkeypatch):
+    monkeypatch.setattr(db, 'LEGACY_GUILD_ID', 7)
+    monkeypatch.setattr(db, 'LEGACY_USER_ID', 42)
+    assert db.setup_db() is True
+    assert _version() == db.SCHEMA_VERSION
+    with db.connections().read() as conn:
+        rows = conn.execute("SELECT guild_id, user_id, day, time_slot, sample FROM records ORDER BY id").fetchall()
+    assert rows == [(7, 42, '2025-03-05', 'morning', 0), (7, 42, '2025-03-05', 'morning', 1),
+                    (7, 42, '2025-03-06', 'night', 0)]
+    # v7 backfills the pressure histogram from the existing readings
+    assert db.pressure_histogram((7, 42)) == [('morning', 'dia', 80, 1), ('morning', 'dia', 82, 1),
+                                              ('morning', 'sys', 120, 1), ('morning', 'sys', 125, 1),
+                                              ('night', 'dia', 85, 1), ('night', 'sys', 130, 1)]
+
+
+def test_empty_database_upgrades_without_legacy_owner(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_NAME', str(tmp_path / 'new.db'))
+    monkeypatch.setattr(db, 'LEGACY_USER_ID', 0)
+    try:
+        assert db.setup_db() is True
+        assert _version() == db.SCHEMA_VERSION
+    finally:
+        db.close_connections()
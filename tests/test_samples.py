@@ -0,0 +1,39 @@
+# tests/test_samples.py
+from datetime import date
+
+from conftest import TENANT
+
+DAY = date(2025, 3, 10)
+
+
+def test_replace_overwrites_only_sample(database):
+    database.save_data(TENANT, DAY, 'morning', 120, 80, policy='replace')
+    record_id, sample, previous = database.save_data(TENANT, DAY, 'morning', 130, 85, policy='replace')
+
+    assert sample == 0
+    assert previous == (120, 80)
+    assert database.get_record(TENANT, DAY, 'morning') == (130, 85)
+
+
+def test_samples_policy_numbers_readings(database):
+    samples = [database.save_data(TENANT, DAY, 'night', 120 + i, 80, policy='samples')[1] for i in range(3)]
+    assert samples == [0, 1, 2]
+
+
+def test_register_edit_and_lookup_share_the_current_sample(database):
+    # Two samples left behind by the 'samples' policy, then the policy switches to 'replace'
+    database.save_data(TENANT, DAY, 'morning', 120, 80, policy='samples')
+    database.save_data(TENANT, DAY, 'morning', 130, 85, policy='samples')
+
+    _, sample, previous = database.save_data(TENANT, DAY, 'morning', 140, 90, policy='replace')
+    assert (sample, previous) == (1, (130, 85))
+    assert database.get_record(TENANT, DAY, 'morning') == (140, 90)
+
+    assert database.update_data(TENANT, DAY, 'morning', 150, 95) == (140, 90)
+    assert database.get_record(TENANT, DAY, 'morning') == (150, 95)
+
+    database.insert_records(TENANT, [(DAY, 'morning', 111, 71, '2025-03-10 08:00:00')], policy='replace')
+    assert database.get_record(TENANT, DAY, 'morning') == (111, 71)
+    with database.connections().read() as conn:
+        rows = conn.execute("SELECT sample, systolic FROM records ORDER BY sample").fetchall()
+    assert rows == [(0, 120), (1, 111)]
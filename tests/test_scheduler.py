@@ -0,0 +1,69 @@
+# tests/test_scheduler.py
+import asyncio
+import time
+from datetime import datetime
+
+import pytz
+
+from conftest import TENANT
+from scheduler import Scheduler, next_run_after
+
+MADRID = 'Europe/Madrid'
+
+
+def _at(timezone, *fields):
+    tz = pytz.timezone(timezone)
+    return tz.normalize(tz.localize(datetime(*fields))).timestamp()
+
+
+def test_next_run_daily_weekly_and_across_dst():
+    after = _at(MADRID, 2025, 3, 10, 9, 0)  # A Monday
+    assert next_run_after('08:00', None, MADRID, after) == _at(MADRID, 2025, 3, 11, 8, 0)
+    assert next_run_after('10:00', None, MADRID, after) == _at(MADRID, 2025, 3, 10, 10, 0)
+    assert next_run_after('08:00', 4, MADRID, after) == _at(MADRID, 2025, 3, 14, 8, 0)
+    # 02:30 doesn't exist on the day clocks go forward: the job runs when the clock jumps past it
+    spring = next_run_after('02:30', None, MADRID, _at(MADRID, 2025, 3, 29, 12, 0))
+    assert datetime.fromtimestamp(spring, pytz.timezone(MADRID)).strftime('%d %H:%M') == '30 03:30'
+
+
+async def _run_scheduler(scheduler, seconds=0.2):
+    await scheduler.start()
+    await asyncio.sleep(seconds)
+    scheduler._task.cancel()
+
+
+def test_jobs_persist_across_restarts(database):
+    async def schedule():
+        scheduler = Scheduler()
+        await scheduler.start()
+        job = await scheduler.schedule('reminder', TENANT, '08:00', MADRID, key='morning', channel_id=5)
+        scheduler._task.cancel()
+        return job
+
+    job = asyncio.run(schedule())
+    restarted = Scheduler()
+    asyncio.run(_run_scheduler(restarted, 0))
+    [loaded] = restarted.jobs_of(TENANT)
+    assert (loaded.id, loaded.kind, loaded.key, loaded.channel_id, loaded.next_run) == \
+           (job.id, 'reminder', 'morning', 5, job.next_run)
+
+
+def test_missed_runs_fire_once_unless_past_their_grace(database):
+    two_hours_ago = int(time.time()) - 7200
+    for kind in ('reminder', 'summary'):
+        database.save_job(kind, TENANT, '', None, MADRID, '08:00', None, two_hours_ago)
+    fired = []
+
+    async def handler(job):
+        fired.append(job.kind)
+
+    scheduler = Scheduler()
+    scheduler.register('reminder', handler, misfire_grace=3600)
+    scheduler.register('summary', handler)
+    asyncio.run(_run_scheduler(scheduler))
+
+    assert fired == ['summary']
+    # Both runs are consumed and the next one is stored, so a restart doesn't fire them again
+    for row in database.load_jobs():
+        job = dict(zip(database.JOB_COLUMNS, row))
+        assert job['next_run'] > time.time() and job['last_run'] >= two_hours_ago
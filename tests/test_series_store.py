@@ -0,0 +1,90 @@
+# tests/test_series_store.py
+import threading
+from datetime import date
+
+import pytest
+
+from conftest import TENANT
+from series_store import SeriesStore
+
+DAY = date(2025, 3, 10)
+
+
+@pytest.fixture
+def store(database, monkeypatch):
+    store = SeriesStore()
+    monkeypatch.setattr(database, '_write_listeners', [store.invalidate_days])
+    return store
+
+
+def _values(readings):
+    return list(zip(readings.dates(), readings.systolic.tolist(), readings.diastolic.tolist()))
+
+
+def test_loads_and_slices(database, store):
+    database.save_data(TENANT, date(2025, 3, 9), 'night', 118, 76)
+    database.save_data(TENANT, DAY, 'morning', 120, 80)
+    database.save_data(TENANT, DAY, 'night', 130, 90)
+
+    assert _values(store.readings(TENANT, DAY, DAY)) == [(DAY, 120, 80), (DAY, 130, 90)]
+    assert _values(store.readings(TENANT, slot='night')) == [(date(2025, 3, 9), 118, 76), (DAY, 130, 90)]
+    daily = store.daily(TENANT)
+    assert _values(daily) == [(date(2025, 3, 9), 118.0, 76.0), (DAY, 125.0, 85.0)]
+    assert daily.readings.tolist() == [1, 2]
+    assert store.readings((1, 200)).empty
+
+
+def test_writes_are_patched_in(database, store):
+    record_id, _, _ = database.save_data(TENANT, DAY, 'morning', 120, 80)
+    database.save_data(TENANT, date(2025, 3, 12), 'morning', 125, 82)
+    store.readings(TENANT)
+
+    database.save_data(TENANT, date(2025, 3, 11), 'night', 140, 95)
+    database.update_data(TENANT, DAY, 'morning', 122, 81)
+    assert _values(store.readings(TENANT)) == [(DAY, 122, 81), (date(2025, 3, 11), 140, 95),
+                                               (date(2025, 3, 12), 125, 82)]
+
+    database.delete_record(TENANT, record_id)
+    assert [day for day, _, _ in _values(store.readings(TENANT))] == [date(2025, 3, 11), date(2025, 3, 12)]
+
+
+def test_concurrent_reads_wait_for_the_patch(database, store, monkeypatch):
+    # Regression: a second request used to find the dirty days already taken and return the old arrays
+    database.save_data(TENANT, DAY, 'morning', 120, 80)
+    store.readings(TENANT)
+    database.update_data(TENANT, DAY, 'morning', 150, 95)
+
+    patching, release = threading.Event(), threading.Event()
+    tenant_readings = database.tenant_readings
+
+    def slow_tenant_readings(tenant, days=None):
+        patching.set()
+        release.wait(5)
+        return tenant_readings(tenant, days)
+
+    monkeypatch.setattr(database, 'tenant_readings', slow_tenant_readings)
+    results = []
+    first = threading.Thread(target=lambda: results.append(store.readings(TENANT)))
+    first.start()
+    assert patching.wait(5)
+    second = threading.Thread(target=lambda: results.append(store.readings(TENANT)))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()  # Waiting on the in-flight patch instead of serving the old arrays
+
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert [_values(readings) for readings in results] == [[(DAY, 150, 95)]] * 2
+
+
+def test_failed_refresh_keeps_days_dirty(database, store, monkeypatch):
+    database.save_data(TENANT, DAY, 'morning', 120, 80)
+    store.readings(TENANT)
+    database.update_data(TENANT, DAY, 'morning', 150, 95)
+
+    tenant_readings = database.tenant_readings
+    monkeypatch.setattr(database, 'tenant_readings', lambda tenant, days=None: None)
+    assert store.readings(TENANT) is None
+    monkeypatch.setattr(database, 'tenant_readings', tenant_readings)
+    assert _values(store.readings(TENANT)) == [(DAY, 150, 95)]
@@ -0,0 +1,47 @@
+# tests/test_tables.py
+from datetime import date
+
+import numpy as np
+
+import tables
+
+
+def test_format_days_accepts_dates_and_strings():
+    days = [date(2025, 3, 1), date(1999, 12, 31)]
+    assert tables.format_days(days).tolist() == ['01-03-25', '31-12-99']
+    assert tables.format_days(np.array(['2025-03-01'], dtype='datetime64[D]'), sep='/').tolist() == ['01/03/25']
+    assert tables.format_days(['2024-02-29']).tolist() == ['29-02-24']
+    assert tables.format_days([]).tolist() == []
+
+
+def test_format_decimal_matches_round():
+    values = [120.0, 119.96, 80.04, 0.25, 7.0]
+    assert tables.format_decimal(values).tolist() == [str(round(value, 1)) for value in values]
+    assert tables.format_decimal([3.14159], decimals=2).tolist() == ['3.14']
+    assert tables.format_decimal([1.05], decimals=2).tolist() == ['1.05']
+
+
+def test_format_int_and_concat():
+    assert tables.format_int([120.0, 80]).tolist() == ['120', '80']
+    column = tables.concat(tables.left(np.array(['a', 'bc']), 3), '|', tables.right(np.array(['1', '22']), 3))
+    assert column.tolist() == ['a  |  1', 'bc | 22']
+
+
+def test_paginate_single_page_keeps_plain_title():
+    assert tables.paginate('Title', ['row 1', 'row 2'], header=['head'], footer=['foot']) == \
+        ('Title\nhead\nrow 1\nrow 2\nfoot',)
+    assert tables.paginate('Title', []) == ('Title',)
+
+
+def test_paginate_splits_under_limit_and_repeats_header_and_footer():
+    lines = [f"row {i:03d}" for i in range(100)]
+    pages = tables.paginate('Title', lines, header=['head'], footer=['foot'], limit=200)
+
+    assert len(pages) > 1
+    assert all(len(page) <= 200 for page in pages)
+    for number, page in enumerate(pages, 1):
+        page_lines = page.split('\n')
+        assert page_lines[0] == f"Title (page {number}/{len(pages)})"
+        assert page_lines[1] == 'head' and page_lines[-1] == 'foot'
+    rows = [line for page in pages for line in page.split('\n')[2:-1]]
+    assert rows == lines
@@ -0,0 +1,46 @@
+# tests/test_total.py
+from datetime import date
+
+import numpy as np
+
+from commands.data_commands import DataCommands, PERCENTILES
+from conftest import TENANT
+
+
+def _histogram(database):
+    with database.connections().read() as conn:
+        return conn.execute("SELECT guild_id, user_id, month, time_slot, measure, value, readings "
+                            "FROM pressure_histogram ORDER BY 1, 2, 3, 4, 5, 6").fetchall()
+
+
+def test_histogram_follows_writes(database):
+    record_id, _, _ = database.save_data(TENANT, date(2025, 3, 5), 'morning', 120, 80)
+    database.save_data(TENANT, date(2025, 3, 6), 'morning', 120, 82)
+    database.save_data(TENANT, date(2025, 4, 1), 'night', 130, 85)
+    assert database.pressure_histogram(TENANT, date(2025, 3, 1), date(2025, 3, 31)) == [
+        ('morning', 'dia', 80, 1), ('morning', 'dia', 82, 1), ('morning', 'sys', 120, 2)]
+
+    database.update_data(TENANT, date(2025, 3, 6), 'morning', 124, 82)
+    database.delete_record(TENANT, record_id)
+    assert database.pressure_histogram(TENANT, date(2025, 3, 1), date(2025, 3, 31)) == [
+        ('morning', 'dia', 82, 1), ('morning', 'sys', 124, 1)]
+    assert database.pressure_histogram(TENANT, date(2025, 4, 1)) == [('night', 'dia', 85, 1), ('night', 'sys', 130, 1)]
+
+    maintained = _histogram(database)
+    database.rebuild_daily_stats()
+    assert _histogram(database) == maintained
+
+
+def test_percentiles_match_numpy(database):
+    rng = np.random.default_rng(7)
+    systolic = rng.integers(100, 160, 84)
+    diastolic = rng.integers(60, 100, 84)
+    for i, (sys, dia) in enumerate(zip(systolic.tolist(), diastolic.tolist())):
+        database.save_data(TENANT, date(2025, 1 + i // 28, 1 + i % 28), 'morning', sys, dia)
+
+    percentiles = DataCommands._slot_percentiles(database.pressure_histogram(TENANT))
+    assert list(percentiles) == ['morning']
+    np.testing.assert_allclose(percentiles['morning'], list(zip(np.percentile(systolic, PERCENTILES),
+                                                                np.percentile(diastolic, PERCENTILES))))
+    one = DataCommands._slot_percentiles([('night', 'dia', 80, 1), ('night', 'sys', 120, 1)])
+    assert one == {'night': [(120, 80)] * 3}
@@ -0,0 +1,122 @@
+# tests/test_undo.py
+from datetime import date
+
+from conftest import TENANT
+
+DAY = date(2025, 3, 10)
+
+
+def _readings(database):
+    with database.connections().read() as conn:
+        return conn.execute("SELECT day, time_slot, sample, systolic, diastolic FROM records "
+                            "ORDER BY day, time_slot, sample").fetchall()
+
+
+def test_nothing_to_undo(database):
+    assert database.undo_last(TENANT) is None
+
+
+def test_undo_delete_restores_row_and_id(database):
+    record_id, _, _ = database.save_data(TENANT, DAY, 'morning', 120, 80)
+    assert database.delete_record(TENANT, record_id)
+
+    assert database.undo_last(TENANT) == ('delete', [('2025-03-10', 'morning', 120, 80)], 0, 0, [])
+    with database.connections().read() as conn:
+        assert conn.execute("SELECT id FROM records").fetchall() == [(record_id,)]
+    assert database.undo_last(TENANT) is None
+
+
+def test_undo_edit_and_replaced_register(database):
+    database.save_data(TENANT, DAY, 'morning', 120, 80, policy='replace')
+    database.save_data(TENANT, DAY, 'morning', 130, 85, policy='replace')
+    database.update_data(TENANT, DAY, 'morning', 140, 90)
+
+    assert database.undo_last(TENANT)[1] == [('2025-03-10', 'morning', 130, 85)]
+    assert database.undo_last(TENANT)[1] == [('2025-03-10', 'morning', 120, 80)]
+    assert _readings(database) == [('2025-03-10', 'morning', 0, 120, 80)]
+
+
+def test_undo_delete_after_slot_registered_again(database):
+    # Regression: the restored row used to collide with the new one on (tenant, day, slot, sample)
+    record_id, _, _ = database.save_data(TENANT, DAY, 'morning', 120, 80, policy='samples')
+    database.delete_record(TENANT, record_id)
+    database.save_data(TENANT, DAY, 'morning', 135, 88, policy='samples')
+
+    assert database.undo_last(TENANT, policy='samples') == ('delete', [('2025-03-10', 'morning', 120, 80)], 1, 0, [])
+    assert _readings(database) == [('2025-03-10', 'morning', 0, 135, 88), ('2025-03-10', 'morning', 1, 120, 80)]
+    # The operation is consumed, so older journal entries stay reachable
+    assert database.undo_last(TENANT, policy='samples') is None
+
+
+def test_undo_under_replace_keeps_the_newer_reading(database):
+    # Regression: the old reading came back as a higher sample, so it became the slot's current one
+    record_id, _, _ = database.save_data(TENANT, DAY, 'morning', 120, 80, policy='replace')
+    database.delete_record(TENANT, record_id)
+    database.save_data(TENANT, DAY, 'morning', 135, 88, policy='replace')
+
+    assert database.undo_last(TENANT, policy='replace') == ('delete', [], 0, 0,
+                                                            [('2025-03-10', 'morning', 120, 80)])
+    assert _readings(database) == [('2025-03-10', 'morning', 0, 135, 88)]
+    assert database.undo_last(TENANT, policy='replace') is None
+
+
+def test_undo_under_replace_restores_below_the_current_sample(database):
+    database.save_data(TENANT, DAY, 'morning', 120, 80, policy='samples')
+    record_id, _, _ = database.save_data(TENANT, DAY, 'morning', 125, 82, policy='samples')
+    database.save_data(TENANT, DAY, 'morning', 130, 85, policy='samples')
+    database.delete_record(TENANT, record_id)
+    # The top sample stays current, and an edit of it is undone in place
+    database.update_data(TENANT, DAY, 'morning', 140, 90)
+
+    assert database.undo_last(TENANT, policy='replace')[1:] == ([('2025-03-10', 'morning', 130, 85)], 0, 0, [])
+    assert database.undo_last(TENANT, policy='replace')[1:] == ([('2025-03-10', 'morning', 125, 82)], 0, 0, [])
+    assert database.get_record(TENANT, DAY, 'morning') == (130, 85)
+    assert [sample for _, _, sample, _, _ in _readings(database)] == [0, 1, 2]
+
+    # Nothing was registered since this delete, so the top sample comes back as the current reading
+    database.delete_record(TENANT, database.save_data(TENANT, DAY, 'morning', 150, 95, policy='samples')[0])
+    assert database.undo_last(TENANT, policy='replace')[1] == [('2025-03-10', 'morning', 150, 95)]
+    assert database.get_record(TENANT, DAY, 'morning') == (150, 95)
+
+
+def test_undo_depth_is_bounded(database):
+    for i in range(database.UNDO_DEPTH + 5):
+        database.save_data(TENANT, DAY, 'night', 100 + i, 70, policy='replace')
+    undone = 0
+    while database.undo_last(TENANT):
+        undone += 1
+    assert undone == database.UNDO_DEPTH
+
+
+def test_undo_import_restores_overwritten_and_removes_added_readings(database):
+    database.save_data(TENANT, DAY, 'morning', 120, 80, policy='replace')
+    database.save_data(TENANT, DAY, 'night', 125, 82, policy='replace')
+    rows = [(DAY, 'morning', 140, 90, '2025-03-10 08:00:00'),
+            (date(2025, 3, 11), 'morning', 118, 76, '2025-03-11 08:00:00')]
+    assert database.insert_records(TENANT, rows, policy='replace') == 2
+
+    assert database.undo_last(TENANT) == ('import', [('2025-03-10', 'morning', 120, 80)], 0, 1, [])
+    assert _readings(database) == [('2025-03-10', 'morning', 0, 120, 80), ('2025-03-10', 'night', 0, 125, 82)]
+    with database.connections().read() as conn:
+        assert conn.execute("SELECT day, time_slot, readings FROM daily_stats ORDER BY day, time_slot").fetchall() \
+            == [('2025-03-10', 'morning', 1), ('2025-03-10', 'night', 1)]
+
+
+def test_import_without_overwrites_is_still_an_undo_step(database):
+    # Regression: the import used to leave no journal entry, so !undo reverted an older change instead
+    record_id, _, _ = database.save_data(TENANT, DAY, 'night', 125, 82)
+    database.delete_record(TENANT, record_id)
+    database.insert_records(TENANT, [(DAY, 'morning', 140, 90, '2025-03-10 08:00:00')], policy='replace')
+
+    assert database.undo_last(TENANT) == ('import', [], 0, 1, [])
+    assert _readings(database) == []
+    assert database.undo_last(TENANT)[0] == 'delete'
+
+
+def test_undo_import_in_samples_mode(database):
+    database.save_data(TENANT, DAY, 'morning', 120, 80, policy='samples')
+    rows = [(DAY, 'morning', 140, 90, '2025-03-10 08:00:00')] * 3
+    database.insert_records(TENANT, rows, policy='samples')
+
+    assert database.undo_last(TENANT) == ('import', [], 0, 3, [])
+    assert _readings(database) == [('2025-03-10', 'morning', 0, 120, 80)]
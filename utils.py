@@ -1,11 +1,11 @@
 import logging
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import pytz
-from config import TIMEZONE, LOG_FILE
+from config import TIMEZONE
 
-# --- LOGGING SETUP ---
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
-                    datefmt='%d-%m-%Y %H:%M:%S')
+# --- LOGGING ---
+# Handlers are installed by the bot's entry point (log_pipeline.setup_logging), not on import, so processes
+# that only import these modules (e.g. chart render workers) never open or rotate the log file
 logger = logging.getLogger('BloodPressureBot')
 
 def get_local_time():
@@ -32,5 +32,60 @@ def get_local_time():
         return datetime.now()
 
 
+def parse_flexible_date(date_str):
+    """Parse dates with flexible formatting (allows single-digit days/months)"""
+    try:
+        # Primero intentar con el formato estándar
+        return datetime.strptime(date_str, '%d-%m-%y')
+    except ValueError:
+        # Si falla, intentar con formato flexible
+        parts = date_str.split('-')
+        if len(parts) == 3:
+            day, month, year = parts
+            # Añadir ceros a la izquierda si es necesario
+            day = day.zfill(2)
+            month = month.zfill(2)
+            # Asegurar formato de año de 2 dígitos
+            if len(year) == 2:
+                year = year
+            elif len(year) == 4:
+                year = year[2:]
+            else:
+                raise ValueError("Invalid year format")
+
+            normalized_date = f"{day}-{month}-{year}"
+            return datetime.strptime(normalized_date, '%d-%m-%y')
+        else:
+            raise ValueError("Invalid date format")
+
+
+def tenant_of(ctx):
+    """Returns the (guild_id, user_id) pair a command's readings belong to; guild 0 means direct messages."""
+    return (ctx.guild.id if ctx.guild else 0, ctx.author.id)
+
+
+def parse_period(period_type, period_str):
+    """Parses 'MM-YY' (month) or 'YY' (year) into inclusive (start, end) dates and a display title.
+
+    Raises ValueError on malformed input.
+    """
+    if period_type == 'month':
+        month, year_short = period_str.split('-')
+        year_full = int(f"20{year_short}" if len(year_short) == 2 else year_short)
+        start = date(year_full, int(month), 1)
+        end = date(year_full + 1, 1, 1) if start.month == 12 else date(year_full, start.month + 1, 1)
+        return start, end - timedelta(days=1), f"{month}/{year_short}"
+
+    year_short = period_str
+    year_full = int(f"20{year_short}" if len(year_short) == 2 else year_short)
+    return date(year_full, 1, 1), date(year_full, 12, 31), year_short
+
+
+def days_window(days):
+    """Returns the first date included in a 'last N days' window ending today."""
+    # Days are stored at midnight, so 'day >= now - N days' matches exactly the N most recent dates (today included)
+    return (get_local_time() - timedelta(days=days - 1)).date()
+
+
 # Need to import sys to check for pytz
 import sys
\ No newline at end of file